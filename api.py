@@ -0,0 +1,111 @@
+"""uapis.cn 接口请求与响应格式化"""
+from urllib.parse import urlsplit
+
+import requests
+
+import metrics
+import ratelimit
+import records
+from http_pool import shared_pool
+
+API_BASE = "https://uapis.cn/api/v1/game/minecraft"
+SERVER_STATUS_URL = f"{API_BASE}/serverstatus"
+USER_INFO_URL = f"{API_BASE}/userinfo"
+API_HOST = "uapis.cn"
+# 对接口的每秒请求数上限；被限流时自动降低，之后逐渐恢复到这个值
+API_RATE = 20.0
+# 连接错误可以安全重试；读取超时不重试，否则一次慢请求会拖成好几倍
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError,)
+
+
+def set_base(base):
+    """把接口地址指向其他服务器（例如基准测试中的本地模拟接口）"""
+    global API_BASE, SERVER_STATUS_URL, USER_INFO_URL, API_HOST
+    API_BASE = base.rstrip("/")
+    SERVER_STATUS_URL = f"{API_BASE}/serverstatus"
+    USER_INFO_URL = f"{API_BASE}/userinfo"
+    API_HOST = urlsplit(API_BASE).hostname
+    configure_limits()
+
+
+def configure_limits(rate=None, **kwargs):
+    """设置接口主机的限流与重试参数，rate 为None时使用 API_RATE，为0时不限流"""
+    return ratelimit.configure(API_HOST, rate=API_RATE if rate is None else rate or None, **kwargs)
+
+
+class APIError(Exception):
+    """接口返回了非200状态码"""
+
+    def __init__(self, status_code):
+        super().__init__(f"API请求失败: {status_code}")
+        self.status_code = status_code
+
+
+def format_response(data):
+    """转换API响应格式以匹配前端期望的格式"""
+    return {
+        "success": True,
+        "data": data
+    }
+
+
+def server_status_url(server_address, base=None):
+    """base 为None时使用 API_BASE，否则指向与之兼容的镜像"""
+    url = f"{base.rstrip('/')}/serverstatus" if base else SERVER_STATUS_URL
+    return f"{url}?server={server_address}"
+
+
+def user_info_url(username):
+    return f"{USER_INFO_URL}?username={username}"
+
+
+def get(url, timeout=None, **kwargs):
+    """经过所在主机的限流、重试和熔断发送GET请求，熔断期间抛出 ratelimit.CircuitOpenError"""
+    host_guard = ratelimit.guard(urlsplit(url).hostname)
+    return host_guard.call(lambda: shared_pool().get(url, timeout=timeout, **kwargs), RETRY_EXCEPTIONS)
+
+
+def get_json(url, timeout=None, decode=None):
+    """请求接口并解析JSON，非200时抛出 APIError；decode 不为None时用它把JSON转换成记录"""
+    response = get(url, timeout=timeout)
+    if response.status_code != 200:
+        raise APIError(response.status_code)
+    with metrics.phase("json"):
+        data = response.json()
+        return data if decode is None else decode(data)
+
+
+def get_bytes(url, timeout=None):
+    """下载二进制内容（例如皮肤图片），非200时抛出 APIError"""
+    response = get(url, timeout=timeout)
+    if response.status_code != 200:
+        raise APIError(response.status_code)
+    return response.content
+
+
+def get_bytes_conditional(url, etag=None, last_modified=None, timeout=None):
+    """条件请求：内容未变化（304）时返回 (None, etag, last_modified)，否则返回新的内容和验证信息"""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    response = get(url, timeout=timeout, headers=headers)
+    if response.status_code == 304:
+        return None, response.headers.get("ETag", etag), response.headers.get("Last-Modified", last_modified)
+    if response.status_code != 200:
+        raise APIError(response.status_code)
+    return response.content, response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+
+def fetch_server_status(server_address, timeout=None, base=None):
+    """查询服务器状态，返回格式化后的结果，data 为 records.ServerStatus"""
+    return format_response(get_json(server_status_url(server_address, base), timeout, records.ServerStatus.decode))
+
+
+def fetch_player_info(username, timeout=None):
+    """查询玩家信息，返回格式化后的结果，data 为 records.PlayerInfo"""
+    return format_response(get_json(user_info_url(username), timeout, records.PlayerInfo.decode))
+
+
+configure_limits()
@@ -0,0 +1,232 @@
+"""可插拔的服务器状态后端与对冲请求
+
+后端按顺序排列：先请求第一个，如果它在“对冲延迟”内还没有返回，就同时启动下一个，
+哪个先成功就用哪个；某个后端失败时立即启动下一个。对冲延迟取该后端最近总耗时的p95
+（来自 metrics 的直方图），样本不足时使用默认值，因此会随实际延迟自动调整。
+
+报告“离线”的结果不一定可靠（例如本机网络屏蔽了直连），只有在没有任何后端报告在线时才采用。
+
+后端用逗号分隔的字符串配置：
+
+    api                         uapis.cn
+    direct                      Server List Ping 直连
+    query                       GameSpy4 Query（UDP，需要服务器开启 enable-query）
+    bedrock                     基岩版 RakNet Unconnected Ping（UDP）
+    mirror=https://example.com/api/v1/game/minecraft   与uapis.cn接口兼容的镜像
+"""
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import core
+import logs
+import metrics
+
+DEFAULT_SPEC = "api,direct"
+DEFAULT_HEDGE_DELAY = 1.0
+MIN_HEDGE_DELAY = 0.05
+MAX_HEDGE_DELAY = 3.0
+HEDGE_QUANTILE = 0.95
+# 直方图中至少有这么多样本时才用p95作为对冲延迟
+MIN_SAMPLES = 20
+DEFAULT_WORKERS = 32
+
+logger = logs.get_logger("backends")
+
+
+class StatusBackend:
+    """状态后端：fetch 返回 {"success": True, "data": {...}}，失败时抛出 core.FetchError"""
+    name = ""
+    metrics_kind = ""
+
+    def fetch(self, server_address, timeout=None):
+        raise NotImplementedError
+
+
+class APIBackend(StatusBackend):
+    """uapis.cn 或与之兼容的镜像，base 为None时使用 api.API_BASE"""
+
+    def __init__(self, base=None, name=None):
+        self.base = base.rstrip("/") if base else None
+        self.name = name or (urlsplit(self.base).hostname if self.base else "api")
+        self.metrics_kind = f"status_mirror:{self.name}" if self.base else "status"
+
+    def fetch(self, server_address, timeout=None):
+        return core.fetch_status_api(server_address, timeout, self.base, self.metrics_kind)
+
+
+class DirectBackend(StatusBackend):
+    """Server List Ping 直连"""
+    name = "direct"
+    metrics_kind = "status_direct"
+
+    def fetch(self, server_address, timeout=None):
+        return core.fetch_status_direct(server_address, timeout or 5)
+
+
+class UDPBackend(StatusBackend):
+    """udp_probe 中的UDP探测，protocol 为 query 或 bedrock"""
+
+    def __init__(self, protocol):
+        self.name = protocol
+        self.metrics_kind = f"status_{protocol}"
+
+    def fetch(self, server_address, timeout=None):
+        return core.fetch_status_udp(server_address, self.name, timeout)
+
+
+def parse_spec(spec):
+    """把配置字符串解析成后端列表"""
+    result = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, value = part.partition("=")
+        if name == "api" and not value:
+            result.append(APIBackend())
+        elif name == "direct" and not value:
+            result.append(DirectBackend())
+        elif name in core.UDP_MODES and not value:
+            result.append(UDPBackend(name))
+        elif name == "mirror" and value:
+            result.append(APIBackend(value.strip()))
+        else:
+            raise ValueError(f"无法识别的后端: {part}")
+    if not result:
+        raise ValueError("至少需要一个后端")
+    return result
+
+
+class HedgedFetcher:
+    """按顺序对冲请求多个后端
+
+    hedge 为False时不并发，只在前一个后端失败后依次尝试下一个。
+    """
+
+    def __init__(self, backends, hedge=True, default_delay=DEFAULT_HEDGE_DELAY,
+                 min_delay=MIN_HEDGE_DELAY, max_delay=MAX_HEDGE_DELAY, max_workers=DEFAULT_WORKERS):
+        self.backends = list(backends)
+        self.hedge = hedge
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_workers = max_workers
+        self.hedges = 0
+        self.wins = {backend.name: 0 for backend in self.backends}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def hedge_delay(self, backend):
+        """启动下一个后端之前等待的秒数"""
+        p95 = metrics.registry().quantile(backend.metrics_kind, "total", HEDGE_QUANTILE, MIN_SAMPLES)
+        if p95 is None:
+            return self.default_delay
+        return min(self.max_delay, max(self.min_delay, p95 / 1000))
+
+    def _submit(self, backend, server_address, timeout):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="hedge")
+        return self._executor.submit(backend.fetch, server_address, timeout)
+
+    def _won(self, backend, result):
+        with self._lock:
+            self.wins[backend.name] = self.wins.get(backend.name, 0) + 1
+        result = dict(result)
+        result["backend"] = backend.name
+        return result
+
+    def fetch(self, server_address, timeout=None):
+        """返回第一个报告在线的结果；都不在线时返回离线结果，全部失败时抛出最后一个错误"""
+        if len(self.backends) == 1 or not self.hedge:
+            return self._fetch_sequential(server_address, timeout)
+        remaining = list(self.backends)
+        pending = {}
+        offline = None
+        last_error = None
+        current = remaining.pop(0)
+        pending[self._submit(current, server_address, timeout)] = current
+        while pending:
+            delay = self.hedge_delay(current) if remaining else None
+            done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            start_next = not done
+            if start_next:
+                self.hedges += 1
+                logger.info("%s 在 %.0f ms 内没有返回，同时请求 %s", current.name, delay * 1000, remaining[0].name)
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    result = future.result()
+                except core.FetchError as e:
+                    last_error = e
+                    start_next = True
+                    continue
+                if (result.get("data") or {}).get("online", True):
+                    return self._won(backend, result)
+                if offline is None:
+                    offline = self._won(backend, result)
+                start_next = True
+            if start_next and remaining:
+                current = remaining.pop(0)
+                pending[self._submit(current, server_address, timeout)] = current
+        if offline is not None:
+            return offline
+        raise last_error
+
+    def _fetch_sequential(self, server_address, timeout):
+        offline = None
+        last_error = None
+        for backend in self.backends:
+            try:
+                result = backend.fetch(server_address, timeout)
+            except core.FetchError as e:
+                last_error = e
+                continue
+            if (result.get("data") or {}).get("online", True):
+                return self._won(backend, result)
+            if offline is None:
+                offline = self._won(backend, result)
+        if offline is not None:
+            return offline
+        raise last_error
+
+    def as_dict(self):
+        return {
+            "backends": [backend.name for backend in self.backends],
+            "hedge": self.hedge,
+            "hedges": self.hedges,
+            "wins": dict(self.wins),
+            "delays_ms": {backend.name: round(self.hedge_delay(backend) * 1000, 1) for backend in self.backends},
+        }
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def status_fetcher():
+    """进程内共用的状态查询器，首次调用时按 DEFAULT_SPEC 创建"""
+    global _fetcher
+    if _fetcher is None:
+        with _fetcher_lock:
+            if _fetcher is None:
+                _fetcher = HedgedFetcher(parse_spec(DEFAULT_SPEC))
+    return _fetcher
+
+
+def configure(spec=DEFAULT_SPEC, hedge=True):
+    """按配置字符串重建共用的状态查询器，配置无效时抛出 ValueError"""
+    global _fetcher
+    fetcher = HedgedFetcher(parse_spec(spec), hedge)
+    with _fetcher_lock:
+        old, _fetcher = _fetcher, fetcher
+    if old is not None:
+        old.close()
+    return fetcher
@@ -0,0 +1,487 @@
+"""查询路径的本地基准测试
+
+启动模拟的 uapis.cn 接口（serverstatus / userinfo）、皮肤图片服务器和 Minecraft 服务器，
+延迟和失败率都可以配置，然后在不访问外网的情况下测量吞吐量、延迟分位数和内存占用：
+
+    python benchmark.py
+    python benchmark.py single batch --requests 500 --latency 20 --failure-rate 0.05
+    python benchmark.py polling --duration 10 --json
+    python benchmark.py single --upstream-limit 100 --api-rate 150
+    python benchmark.py single --latency 10 --slow-rate 0.03 --slow-latency 500
+    python benchmark.py memory --results 100000
+
+直连场景另外通过模拟的DNS服务器解析 mcN.bench.local：先查 _minecraft._tcp SRV 记录，
+目标主机 localhost 交给 getaddrinfo 解析，dns_queries 列是实际发出的SRV查询数。bedrock/query 场景向模拟的
+UDP服务器发送基岩版 Unconnected Ping 和 GameSpy4 Query（udp_probe）。
+
+single 场景依次调用GUI后台任务使用的 core.fetch_status / fetch_player / fetch_skin，
+batch 场景使用 scanner.BatchScanner，polling 场景使用 scheduler.AdaptiveScheduler，
+memory 场景比较把响应保存为字典和保存为 records 记录时每条结果占用的内存。
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import struct
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import api
+import backends
+import core
+import http_pool
+import logs
+import metrics
+import ratelimit
+import records
+import resolver
+import scanner
+import scheduler
+import skins
+import slp
+from fake_servers import FakeDNSServer, FakeMinecraftServer, FakeUDPServer, FaultProfile
+
+WORKLOADS = ("single", "batch", "polling", "memory")
+
+
+def make_skin_png(width=64, height=64):
+    """生成一张纯色的RGBA皮肤PNG，不依赖任何图片库"""
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    row = b"\x00" + b"\x8b\x5a\x2b\xff" * width
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(row * height))
+            + chunk(b"IEND", b""))
+
+
+def fake_server_status(server_address):
+    """模拟 serverstatus 接口的返回内容"""
+    host, port = slp.split_address(server_address)
+    players = int(hashlib.md5(server_address.encode()).hexdigest()[:4], 16) % 200
+    return {
+        "online": True,
+        "ip": host,
+        "port": port,
+        "players": players,
+        "max_players": 200,
+        "version": "1.20.1",
+        "motd_clean": "A Minecraft Server",
+        "motd_html": "<span style='color: #55ff55;'>A Minecraft Server</span>",
+    }
+
+
+def fake_user_info(username, skin_base):
+    return {
+        "username": username,
+        "uuid": hashlib.md5(username.lower().encode()).hexdigest(),
+        "skin_url": f"{skin_base}/skins/{username}.png",
+    }
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 默认的监听队列只有5，高并发时连接会被丢弃并在1秒后重试，干扰延迟数据
+    request_queue_size = 1024
+
+
+class FakeHTTPServer:
+    """模拟的 uapis.cn 接口和皮肤服务器，运行在后台线程中"""
+
+    def __init__(self, profile, host="127.0.0.1", port=0, rate_limit=None):
+        self.profile = profile
+        self.skin = make_skin_png()
+        self.requests = 0
+        # 模拟接口的限流：超过每秒 rate_limit 个请求时返回429
+        self.limiter = ratelimit.TokenBucket(rate_limit) if rate_limit else None
+        self._server = _HTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_base(self):
+        return f"{self.base}/api/v1/game/minecraft"
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # 保持长连接，这样连接池的复用才会生效
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, code, body, content_type, headers=()):
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_json(self, code, data):
+                self._send(code, json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json")
+
+            def do_GET(self):
+                fake.requests += 1
+                if fake.limiter is not None and not fake.limiter.try_acquire():
+                    body = json.dumps({"code": 429, "message": "请求过于频繁"}).encode("utf-8")
+                    self._send(429, body, "application/json", [("Retry-After", "1")])
+                    return
+                time.sleep(fake.profile.delay())
+                if fake.profile.fails():
+                    self._send_json(500, {"code": 500, "message": "模拟的服务器错误"})
+                    return
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+                if url.path.endswith("/serverstatus"):
+                    try:
+                        self._send_json(200, fake_server_status(query.get("server", [""])[0]))
+                    except ValueError:
+                        self._send_json(400, {"code": 400, "message": "地址错误"})
+                elif url.path.endswith("/userinfo"):
+                    self._send_json(200, fake_user_info(query.get("username", [""])[0], fake.base))
+                elif url.path.startswith("/skins/"):
+                    etag = f'"{len(fake.skin):x}-skin"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self._send(304, b"", "image/png", [("ETag", etag)])
+                    else:
+                        self._send(200, fake.skin, "image/png", [("ETag", etag)])
+                else:
+                    self._send_json(404, {"code": 404, "message": "not found"})
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def percentile(sorted_values, q):
+    """最近秩法分位数，sorted_values 需已升序排列"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(q / 100 * len(sorted_values)) - 1)]
+
+
+def _max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Measurement:
+    """一个场景的测量结果"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.seconds = 0.0
+        self.peak_kb = None
+        self.rss_mb = None
+        self.new_connections = 0
+        self.retries = 0
+        self.bytes_per_result = None
+        self.dns_queries = 0
+
+    def add(self, elapsed_ms, ok=True):
+        if ok:
+            self.latencies.append(elapsed_ms)
+        else:
+            self.errors += 1
+
+    def as_dict(self):
+        latencies = sorted(self.latencies)
+        total = len(latencies) + self.errors
+
+        def rounded(value):
+            return None if value is None else round(value, 2)
+
+        return {
+            "workload": self.name,
+            "requests": total,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "rps": round(total / self.seconds, 1) if self.seconds else None,
+            "p50_ms": rounded(percentile(latencies, 50)),
+            "p95_ms": rounded(percentile(latencies, 95)),
+            "p99_ms": rounded(percentile(latencies, 99)),
+            "new_conns": self.new_connections,
+            "retries": self.retries,
+            "peak_kb": self.peak_kb,
+            "rss_mb": self.rss_mb,
+            "bytes_each": self.bytes_per_result,
+            "dns_queries": self.dns_queries,
+        }
+
+
+def measure(name, trace_memory, run):
+    """运行一个场景，run(measurement) 负责发出请求并记录每次的耗时"""
+    measurement = Measurement(name)
+    misses_before = http_pool.shared_pool().stats.misses
+    retries_before = ratelimit.guard(api.API_HOST).retries
+    dns_before = resolver.shared_resolver().queries
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        run(measurement)
+    finally:
+        measurement.seconds = time.perf_counter() - started
+        if trace_memory:
+            measurement.peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            tracemalloc.stop()
+    measurement.new_connections = http_pool.shared_pool().stats.misses - misses_before
+    measurement.retries = ratelimit.guard(api.API_HOST).retries - retries_before
+    measurement.dns_queries = resolver.shared_resolver().queries - dns_before
+    measurement.rss_mb = _max_rss_mb()
+    return measurement
+
+
+def _timed_calls(fetch, targets):
+    def run(measurement):
+        for target in targets:
+            started = time.perf_counter()
+            try:
+                fetch(target)
+            except core.FetchError:
+                measurement.add(0, ok=False)
+                continue
+            measurement.add((time.perf_counter() - started) * 1000)
+    return run
+
+
+def single_workloads(args, http_server, game_server, dns_server, udp_server):
+    """逐个发出请求，对应GUI中单次查询的路径"""
+    count = args.requests
+    servers = [f"server{i}.bench.local" for i in range(count)]
+    players = [f"Player{i}" for i in range(count)]
+    skin_urls = [f"{http_server.base}/skins/Player{i}.png" for i in range(count)]
+    hedged = backends.HedgedFetcher(backends.parse_spec("api,direct"))
+    # 每次都重新验证，第二轮全部得到304
+    skin_cache = skins.SkinCache(revalidate_after=0)
+    return [
+        measure("single/status", args.trace_memory,
+                _timed_calls(lambda address: core.fetch_status(address, timeout=args.timeout), servers)),
+        measure("single/status-direct", args.trace_memory,
+                _timed_calls(lambda address: core.fetch_status(address, True, args.timeout),
+                             [game_server.address] * count)),
+        measure("single/status-srv", args.trace_memory,
+                _timed_calls(lambda address: core.fetch_status(address, True, args.timeout),
+                             [dns_server.names[i % len(dns_server.names)] for i in range(count)])),
+        measure("single/status-bedrock", args.trace_memory,
+                _timed_calls(lambda address: core.fetch_status(address, "bedrock", args.timeout),
+                             [udp_server.address] * count)),
+        measure("single/status-query", args.trace_memory,
+                _timed_calls(lambda address: core.fetch_status(address, "query", args.timeout),
+                             [udp_server.address] * count)),
+        measure("single/status-hedged", args.trace_memory,
+                _timed_calls(lambda address: hedged.fetch(address, args.timeout), [game_server.address] * count)),
+        measure("single/player", args.trace_memory,
+                _timed_calls(lambda username: core.fetch_player(username, args.timeout), players)),
+        measure("single/skin", args.trace_memory,
+                _timed_calls(lambda url: core.fetch_skin(url, args.timeout), skin_urls)),
+        measure("single/skin-revalidate", args.trace_memory,
+                _timed_calls(lambda url: skin_cache.fetch(url, args.timeout), skin_urls * 2)),
+    ]
+
+
+def _scan_run(addresses, direct, args):
+    def run(measurement):
+        batch = scanner.BatchScanner(concurrency=args.concurrency, per_host=args.concurrency,
+                                     timeout=args.timeout, direct=direct)
+
+        def record(item):
+            measurement.add(item["elapsed"], item["success"])
+
+        asyncio.run(batch.scan_all(addresses, record))
+    return run
+
+
+def batch_workloads(args, http_server, game_server, dns_server, udp_server):
+    """批量扫描，对应批量查询标签页和 scanner.py"""
+    count = args.requests
+    return [
+        measure("batch/api", args.trace_memory,
+                _scan_run([f"server{i}.bench.local" for i in range(count)], False, args)),
+        measure("batch/direct", args.trace_memory,
+                _scan_run([game_server.address] * count, True, args)),
+        measure("batch/bedrock", args.trace_memory,
+                _scan_run([udp_server.address] * count, "bedrock", args)),
+        measure("batch/query", args.trace_memory,
+                _scan_run([udp_server.address] * count, "query", args)),
+    ]
+
+
+def _polling_run(addresses, direct, args):
+    def run(measurement):
+        watch = scheduler.AdaptiveScheduler(base_interval=1, min_interval=0.5, max_interval=2,
+                                            offline_max_interval=4, rate=args.rate)
+        for address in addresses:
+            watch.add(address)
+        batch = scanner.BatchScanner(concurrency=args.concurrency, per_host=args.concurrency,
+                                     timeout=args.timeout, direct=direct)
+
+        async def main():
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            loop.call_later(args.duration, stop.set)
+
+            async def fetch(address):
+                return await batch.scan_one(address, loop, None)
+
+            await watch.run(fetch, lambda item: measurement.add(item["elapsed"], item["success"]),
+                            stop, args.concurrency)
+
+        asyncio.run(main())
+    return run
+
+
+def polling_workloads(args, http_server, game_server, dns_server, udp_server):
+    """监控轮询，对应监控标签页和 cli.py watch"""
+    count = args.servers
+    return [
+        measure("polling/api", args.trace_memory,
+                _polling_run([f"server{i}.bench.local" for i in range(count)], False, args)),
+        measure("polling/direct", args.trace_memory,
+                _polling_run(game_server.addresses[:count], True, args)),
+        measure("polling/direct-srv", args.trace_memory,
+                _polling_run(dns_server.names[:count], True, args)),
+    ]
+
+
+def _decode_run(payloads, decode, results):
+    def run(measurement):
+        started = time.perf_counter()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            for address, payload in payloads:
+                results.append({"address": address, "success": True, "data": decode(json.loads(payload)),
+                                "error": None, "elapsed": 1.0})
+            retained = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        # 解码速度按平均值记录，逐条计时的开销比解码本身还大
+        each_ms = (time.perf_counter() - started) * 1000 / max(1, len(payloads))
+        for _ in payloads:
+            measurement.add(each_ms)
+        measurement.bytes_per_result = round(retained / max(1, len(payloads)))
+    return run
+
+
+def memory_workloads(args, http_server, game_server, dns_server, udp_server):
+    """保存大量结果时的内存占用，对应批量查询标签页中的结果表格"""
+    count = args.results
+    payloads = [(f"server{i}.bench.local",
+                 json.dumps(fake_server_status(f"server{i}.bench.local:{25565 + i % 1000}")).encode())
+                for i in range(count)]
+    rows = []
+    for name, decode in (("memory/dicts", lambda data: data),
+                         ("memory/records", records.ServerStatus.decode)):
+        results = []
+        rows.append(measure(name, False, _decode_run(payloads, decode, results)))
+        del results
+    return rows
+
+
+def format_table(rows):
+    columns = ("workload", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms",
+               "new_conns", "retries", "peak_kb", "rss_mb", "bytes_each", "dns_queries")
+    lines = ["  ".join(f"{column:>10}" if i else f"{column:<22}" for i, column in enumerate(columns))]
+    for row in rows:
+        lines.append("  ".join(f"{'-' if row[column] is None else row[column]:>10}" if i else
+                               f"{row[column]:<22}" for i, column in enumerate(columns)))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="在本地模拟服务器上测量查询路径的性能")
+    parser.add_argument("workloads", nargs="*", help="要运行的场景：single、batch、polling、memory（默认全部）")
+    parser.add_argument("--requests", type=int, default=200, help="single/batch 场景的请求数")
+    parser.add_argument("--results", type=int, default=100000, help="memory 场景保存的结果条数")
+    parser.add_argument("--servers", type=int, default=50, help="polling 场景监控的服务器数")
+    parser.add_argument("--duration", type=float, default=5, help="polling 场景持续的秒数")
+    parser.add_argument("--rate", type=float, default=200, help="polling 场景的全局每秒请求数上限")
+    parser.add_argument("--concurrency", type=int, default=50, help="batch/polling 场景的并发数")
+    parser.add_argument("--timeout", type=float, default=5, help="单个请求的超时（秒）")
+    parser.add_argument("--latency", type=float, default=0, help="模拟服务器的响应延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0, help="响应延迟的随机浮动范围（毫秒）")
+    parser.add_argument("--failure-rate", type=float, default=0, help="模拟服务器返回错误的比例 0-1")
+    parser.add_argument("--slow-rate", type=float, default=0, help="模拟长尾：特别慢的响应所占的比例 0-1")
+    parser.add_argument("--slow-latency", type=float, default=1000, help="特别慢的响应额外的延迟（毫秒）")
+    parser.add_argument("--seed", type=int, help="随机数种子，便于复现")
+    parser.add_argument("--upstream-limit", type=float, help="模拟接口每秒最多接受的请求数，超过时返回429")
+    parser.add_argument("--api-rate", type=float, default=0,
+                        help="客户端对接口的每秒请求数上限（0表示不限，被429时自动降低）")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="用tracemalloc记录每个场景的内存峰值（会降低吞吐量）")
+    parser.add_argument("--json", action="store_true", help="每行输出一个JSON对象")
+    parser.add_argument("--log-level", default="WARNING",
+                        help="查询日志的级别，INFO/DEBUG 可用于测量日志本身的开销")
+    parser.add_argument("--log-file", metavar="PATH", help="把日志写入NDJSON文件而不是控制台")
+    parser.add_argument("--metrics-json", metavar="PATH", help="把各阶段耗时的直方图写入JSON文件")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.workloads if name not in WORKLOADS]
+    if unknown:
+        parser.error(f"未知的场景: {', '.join(unknown)}")
+
+    logs.setup(level=args.log_level, console=not args.log_file, log_file=args.log_file)
+    profile = FaultProfile(args.latency, args.jitter, args.failure_rate, args.seed,
+                           args.slow_rate, args.slow_latency)
+    http_server = FakeHTTPServer(profile, rate_limit=args.upstream_limit).start()
+    game_server = FakeMinecraftServer(profile, listeners=args.servers).start()
+    dns_server = FakeDNSServer(game_server).start()
+    udp_server = FakeUDPServer(profile).start()
+    resolver.configure(nameservers=[dns_server.address])
+    original_base = api.API_BASE
+    api.set_base(http_server.api_base)
+    api.configure_limits(args.api_rate)
+    runners = {"single": single_workloads, "batch": batch_workloads, "polling": polling_workloads,
+               "memory": memory_workloads}
+    rows = []
+    try:
+        for name in dict.fromkeys(args.workloads or WORKLOADS):
+            for measurement in runners[name](args, http_server, game_server, dns_server, udp_server):
+                row = measurement.as_dict()
+                rows.append(row)
+                if args.json:
+                    print(json.dumps(row, ensure_ascii=False), flush=True)
+    finally:
+        api.set_base(original_base)
+        http_server.stop()
+        game_server.stop()
+        dns_server.stop()
+        udp_server.stop()
+    if not args.json:
+        print(format_table(rows))
+    if args.metrics_json:
+        metrics.registry().dump_json(args.metrics_json)
+
+
+if __name__ == '__main__':
+    main()
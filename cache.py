@@ -0,0 +1,211 @@
+"""服务器状态查询结果缓存
+
+内存中按LRU淘汰，每条记录有各自的过期时间；离线服务器和查询失败使用更短的TTL。
+可选的SQLite持久层在程序重启后继续提供未过期的结果。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import records
+import resolver
+
+DEFAULT_TTL = 60
+DEFAULT_NEGATIVE_TTL = 15
+DEFAULT_MAX_ENTRIES = 1024
+# 持久层中超过该时长的记录在打开数据库时清理
+DEFAULT_RETENTION = 7 * 24 * 3600
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".mvpmc_motd_reader", "status_cache.db")
+
+
+def cache_key(address):
+    """规范化服务器地址：主机名小写，国际化域名转成punycode，补全默认端口
+
+    a.com 与 a.com:25565 是同一个key；没有写端口时是否查SRV记录由 resolver 根据原始地址决定，
+    所以需要查询时应使用原始地址（或 resolver.normalize(address).text）而不是key。
+    """
+    try:
+        server = resolver.normalize(address)
+    except ValueError:
+        return address.strip().lower()
+    return resolver.ServerAddress(server.host, server.port).text
+
+
+def entry_key(address, mode=False):
+    """缓存记录的key：不同查询方式（core.STATUS_MODES）的结果分开保存，uapis.cn 的结果沿用地址本身"""
+    key = cache_key(address)
+    if not mode:
+        return key
+    return f"{'java' if mode is True else mode}|{key}"
+
+
+def is_negative_result(data):
+    """查询失败或服务器离线的结果视为负面结果"""
+    if not data.get("success"):
+        return True
+    return not (data.get("data") or {}).get("online", False)
+
+
+class CacheEntry:
+    """一条缓存记录"""
+    __slots__ = ("value", "stored_at", "expires_at")
+
+    def __init__(self, value, stored_at, expires_at):
+        self.value = value
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+
+    @property
+    def age(self):
+        return time.time() - self.stored_at
+
+    @property
+    def fresh(self):
+        return time.time() < self.expires_at
+
+
+class CacheStats:
+    """缓存命中统计"""
+
+    def __init__(self):
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self):
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class ResultCache:
+    """带TTL和容量上限的LRU缓存，db_path不为None时启用SQLite持久层"""
+
+    def __init__(self, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES, db_path=None, retention=DEFAULT_RETENTION):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._open_db(db_path, retention)
+
+    def _open_db(self, db_path, retention):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("DELETE FROM results WHERE stored_at < ?", (time.time() - retention,))
+        self._db.commit()
+
+    def _load(self, key):
+        row = self._db.execute(
+            "SELECT value, stored_at, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(json.loads(row[0]), row[1], row[2])
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def get_entry(self, address, mode=False):
+        """返回缓存记录（可能已经过期），不存在时返回None，不计入统计"""
+        key = entry_key(address, mode)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                entry = self._load(key)
+                if entry is not None:
+                    self._remember(key, entry)
+            elif entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get(self, address, mode=False):
+        """返回未过期的缓存结果，没有时返回None；mode 为查询方式，见 entry_key"""
+        key = entry_key(address, mode)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.fresh:
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    return entry.value
+                # 过期记录保留在内存中，供需要旧数据的调用方使用
+                self.stats.expirations += 1
+            elif self._db is not None:
+                entry = self._load(key)
+                if entry is not None and entry.fresh:
+                    self._remember(key, entry)
+                    self.stats.hits += 1
+                    self.stats.disk_hits += 1
+                    return entry.value
+            self.stats.misses += 1
+            return None
+
+    def put(self, address, value, negative=None, mode=False):
+        """写入缓存；negative为None时根据结果内容自动判断"""
+        if negative is None:
+            negative = is_negative_result(value)
+        now = time.time()
+        entry = CacheEntry(value, now, now + (self.negative_ttl if negative else self.ttl))
+        key = entry_key(address, mode)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False, default=records.json_default), entry.stored_at, entry.expires_at))
+                self._db.commit()
+
+    def put_error(self, address, message, mode=False):
+        """缓存一次查询失败"""
+        self.put(address, {"success": False, "message": message}, negative=True, mode=mode)
+
+    def invalidate(self, address, mode=False):
+        key = entry_key(address, mode)
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
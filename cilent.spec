@@ -10,7 +10,9 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # 没有用到的大模块，减小onefile包体积，缩短每次启动时的解压时间
+    excludes=['tkinter', 'unittest', 'pydoc', 'PyQt5.QtWebEngineWidgets', 'PyQt5.QtWebEngineCore',
+              'PyQt5.QtQml', 'PyQt5.QtQuick', 'PyQt5.QtMultimedia', 'PyQt5.QtSql', 'PyQt5.QtTest'],
     noarchive=False,
     optimize=0,
 )
@@ -27,7 +29,8 @@ exe = EXE(
     bootloader_ignore_signals=False,
     strip=False,
     upx=True,
-    upx_exclude=[],
+    # UPX压缩过的Qt库每次启动都要先解压，不压缩反而更快
+    upx_exclude=['Qt5Core.dll', 'Qt5Gui.dll', 'Qt5Widgets.dll', 'qwindows.dll'],
     runtime_tmpdir=None,
     console=True,
     disable_windowed_traceback=False,
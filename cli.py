@@ -0,0 +1,249 @@
+"""命令行入口，不加载Qt
+
+    python cli.py status hypixel.net mc.example.com:25565 --json
+    python cli.py status 127.0.0.1 --direct
+    python cli.py status play.example.net --protocol bedrock
+    python cli.py player Notch
+    python cli.py scan servers.txt --direct --concurrency 500
+    python cli.py watch hypixel.net mc.example.com --rate 1
+    python cli.py --export players.csv player -f names.txt
+"""
+import argparse
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import core
+import logs
+import records
+
+
+def format_status(address, formatted_data):
+    """把一条服务器状态格式化为可读文本"""
+    result = formatted_data.get("data") or {}
+    if not result.get("online", False):
+        return f"{address}  离线"
+    line = (f"{address}  在线  {result.get('players', 0)}/{result.get('max_players', 0)}"
+            f"  {result.get('version', '未知')}")
+    if result.get("latency") is not None:
+        line += f"  延迟 {result['latency']} ms"
+    motd_clean = result.get("motd_clean")
+    if motd_clean:
+        line += "\n    " + motd_clean.replace("\n", "\n    ")
+    return line
+
+
+def format_player(username, formatted_data):
+    result = formatted_data.get("data") or {}
+    return (f"{result.get('username', username)}  UUID: {result.get('uuid', '未知')}"
+            f"\n    皮肤: {result.get('skin_url', '无')}")
+
+
+def _run_queries(targets, fetch, formatter, as_json, workers, exporter=None):
+    """并发执行查询，按输入顺序输出（exporter 不为None时同时导出），返回失败的数量"""
+    failures = 0
+
+    def query(target):
+        try:
+            return target, fetch(target), None
+        except core.FetchError as e:
+            return target, None, str(e)
+
+    with ThreadPoolExecutor(max(1, min(workers, len(targets)))) as executor:
+        for target, formatted_data, error in executor.map(query, targets):
+            if error is not None:
+                failures += 1
+            record = {"target": target, "success": error is None, "data": None, "error": error}
+            if formatted_data is not None:
+                record.update(formatted_data)
+            if exporter is not None:
+                exporter.write(record)
+            if as_json:
+                print(json.dumps(record, ensure_ascii=False, default=records.json_default), flush=True)
+            elif error is not None:
+                print(f"{target}  查询失败: {error}", flush=True)
+            else:
+                print(formatter(target, formatted_data), flush=True)
+    return failures
+
+
+def open_exporter(args, kind):
+    """按 --export 打开导出文件，没有指定时返回None"""
+    if not args.export:
+        return None
+    import export
+    return export.open_writer(args.export, kind, args.export_format)
+
+
+def cmd_status(args):
+    exporter = open_exporter(args, "status")
+    try:
+        failures = _run_queries(args.addresses,
+                                lambda address: core.fetch_status(address, args.direct, args.timeout),
+                                format_status, args.json, args.workers, exporter)
+    finally:
+        if exporter is not None:
+            exporter.close()
+    return 1 if failures else 0
+
+
+def cmd_player(args):
+    """批量查询玩家，结果按完成顺序输出；缓存命中的玩家不联网"""
+    import players
+    queries = list(args.usernames)
+    if args.file == "-":
+        queries.extend(sys.stdin)
+    elif args.file:
+        with open(args.file, encoding="utf-8") as f:
+            queries.extend(f)
+    if not queries:
+        print("没有要查询的玩家", file=sys.stderr)
+        return 2
+    player_cache = None if args.no_cache else players.PlayerCache(db_path=players.DEFAULT_DB_PATH)
+    resolver = players.PlayerResolver(player_cache, args.workers, args.timeout)
+    exporter = open_exporter(args, "player")
+    failures = 0
+    try:
+        for item in resolver.resolve(queries):
+            if exporter is not None:
+                exporter.write(item)
+            if not item["success"]:
+                failures += 1
+            if args.json:
+                print(json.dumps(item, ensure_ascii=False, default=records.json_default), flush=True)
+            elif item["success"]:
+                print(format_player(item["query"], item) + ("  (缓存)" if item["cached"] else ""), flush=True)
+            else:
+                print(f"{item['query']}  查询失败: {item['error']}", flush=True)
+    finally:
+        if exporter is not None:
+            exporter.close()
+        if player_cache is not None:
+            player_cache.close()
+    return 1 if failures else 0
+
+
+def cmd_scan(args):
+    import scanner
+    scanner.main(args.scan_args)
+    return 0
+
+
+def cmd_watch(args):
+    import asyncio
+    import scanner
+    import scheduler
+
+    watch = scheduler.AdaptiveScheduler(base_interval=args.interval, rate=args.rate)
+    for address in args.addresses:
+        watch.add(address)
+    batch = scanner.BatchScanner(timeout=args.timeout or 10, direct=args.direct)
+    executor = None if args.direct else ThreadPoolExecutor(batch.http_workers)
+
+    async def fetch(address):
+        return await batch.scan_one(address, asyncio.get_running_loop(), executor)
+
+    exporter = open_exporter(args, "status")
+
+    def output(item):
+        if exporter is not None:
+            exporter.write(item)
+        if args.json:
+            print(json.dumps(item, ensure_ascii=False, default=records.json_default), flush=True)
+        elif item.get("success"):
+            print(format_status(item["address"], item) + f"  (下次间隔 {int(item['interval'] or 0)}s)", flush=True)
+        else:
+            print(f"{item['address']}  查询失败: {item.get('error')}", flush=True)
+
+    try:
+        asyncio.run(watch.run(fetch, output))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if exporter is not None:
+            exporter.close()
+    return 0
+
+
+PROTOCOL_HELP = "查询方式：uapis.cn、Server List Ping、基岩版UDP探测或GameSpy4 Query（java 同 --direct）"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Minecraft服务器状态与玩家信息查询（命令行版）")
+    parser.add_argument("--metrics-json", metavar="PATH", help="结束时把各阶段耗时的直方图写入JSON文件")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="输出查询日志（-v），-vv 同时输出完整的响应内容")
+    parser.add_argument("--log-file", metavar="PATH", help="另外把日志写入滚动的NDJSON文件")
+    parser.add_argument("--export", metavar="PATH",
+                        help="把 status/player/watch 的结果逐条导出到文件（.ndjson、.csv 或列式 .colz）")
+    parser.add_argument("--export-format", choices=("ndjson", "csv", "columnar"), help="导出格式，默认按扩展名判断")
+    parser.add_argument("--backends", metavar="SPEC",
+                        help="状态查询的后端，按顺序对冲，例如 api,direct,mirror=URL（默认 api,direct）")
+    parser.add_argument("--no-hedge", action="store_true", help="不并发对冲，只在后端失败时换下一个")
+    parser.add_argument("--api-rate", type=float,
+                        help="对uapis.cn的每秒请求数上限（默认20，0表示不限），被限流时自动降低")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    status = subparsers.add_parser("status", help="查询一个或多个服务器的状态")
+    status.add_argument("addresses", nargs="+", help="服务器地址，例如 hypixel.net 或 mc.example.com:25565")
+    status.add_argument("--direct", action="store_true", help="直连服务器而不经过uapis.cn")
+    status.add_argument("--protocol", choices=tuple(core.STATUS_MODES), help=PROTOCOL_HELP)
+    status.add_argument("--json", action="store_true", help="每行输出一个JSON对象")
+    status.add_argument("--timeout", type=float, help="超时（秒）")
+    status.add_argument("--workers", type=int, default=8, help="同时进行的查询数")
+    status.set_defaults(func=cmd_status)
+
+    player = subparsers.add_parser("player", help="查询一个或多个玩家的信息")
+    player.add_argument("usernames", nargs="*", help="玩家名称或UUID")
+    player.add_argument("-f", "--file", help="从文件读取玩家列表（每行一个，- 表示标准输入）")
+    player.add_argument("--no-cache", action="store_true", help="不读写 玩家名↔UUID 缓存")
+    player.add_argument("--json", action="store_true", help="每行输出一个JSON对象")
+    player.add_argument("--timeout", type=float, help="超时（秒）")
+    player.add_argument("--workers", type=int, default=8, help="同时进行的查询数")
+    player.set_defaults(func=cmd_player)
+
+    scan = subparsers.add_parser("scan", help="批量扫描地址列表（参数同 scanner.py）", add_help=False)
+    scan.add_argument("scan_args", nargs=argparse.REMAINDER)
+    scan.set_defaults(func=cmd_scan)
+
+    watch = subparsers.add_parser("watch", help="持续监控服务器，按自适应间隔轮询")
+    watch.add_argument("addresses", nargs="+", help="服务器地址")
+    watch.add_argument("--direct", action="store_true", help="直连服务器而不经过uapis.cn")
+    watch.add_argument("--protocol", choices=tuple(core.STATUS_MODES), help=PROTOCOL_HELP)
+    watch.add_argument("--json", action="store_true", help="每行输出一个JSON对象")
+    watch.add_argument("--interval", type=float, default=60, help="基础轮询间隔（秒）")
+    watch.add_argument("--rate", type=float, default=2.0, help="全局每秒请求数上限")
+    watch.add_argument("--timeout", type=float, help="超时（秒）")
+    watch.set_defaults(func=cmd_watch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, "protocol", None):
+        args.direct = core.STATUS_MODES[args.protocol]
+    # 命令行默认只输出警告，结果本身写在标准输出
+    logs.setup(level=("WARNING", "INFO", "DEBUG")[min(args.verbose, 2)], log_file=args.log_file)
+    if args.api_rate is not None:
+        import api
+        api.configure_limits(args.api_rate)
+    if args.backends or args.no_hedge:
+        import backends
+        try:
+            backends.configure(args.backends or backends.DEFAULT_SPEC, not args.no_hedge)
+        except ValueError as e:
+            print(f"后端配置无效: {e}", file=sys.stderr)
+            return 2
+    try:
+        return args.func(args)
+    finally:
+        if args.metrics_json:
+            import metrics
+            metrics.registry().dump_json(args.metrics_json)
+
+
+if __name__ == '__main__':
+    # 打包后的 scan --processes 需要它来启动工作进程
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""不依赖Qt的查询核心
+
+GUI的后台任务和命令行都调用这里的函数。为了让命令行启动足够快，
+requests 和 uapis.cn 相关模块只在真正需要走API时才导入。
+"""
+import cache
+import logs
+import metrics
+import ratelimit
+import records
+import slp
+
+logger = logs.get_logger("core")
+
+# fetch_status 的 direct 参数：False 经过API，True 或 "java" 为Server List Ping直连，
+# "bedrock" 与 "query" 为 udp_probe 中的UDP探测
+STATUS_MODES = {"api": False, "java": "java", "bedrock": "bedrock", "query": "query"}
+UDP_MODES = ("bedrock", "query")
+
+
+class FetchError(Exception):
+    """查询失败，消息可以直接显示给用户；接口返回错误状态码时 status_code 为该状态码"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _failed(error_msg, status_code=None):
+    logger.warning(error_msg)
+    return FetchError(error_msg, status_code)
+
+
+def status_key(server_address, direct=False):
+    """用于合并相同请求的key"""
+    return ("status", cache.cache_key(server_address), "java" if direct is True else direct)
+
+
+def status_metrics_kind(direct=False):
+    """各种查询方式在 metrics 中的类别"""
+    if direct in UDP_MODES:
+        return f"status_{direct}"
+    return "status_direct" if direct else "status"
+
+
+def fetch_status(server_address, direct=False, timeout=None):
+    """查询服务器状态，返回 {"success": True, "data": {...}}，失败时抛出 FetchError
+
+    direct 为False时经过 backends 中配置的后端（默认uapis.cn，慢时对冲直连），取值见 STATUS_MODES。
+    """
+    if direct in UDP_MODES:
+        return fetch_status_udp(server_address, direct, timeout)
+    if direct:
+        return fetch_status_direct(server_address, timeout or 5)
+    import backends
+    fetcher = backends.status_fetcher()
+    if len(fetcher.backends) == 1:
+        return fetcher.fetch(server_address, timeout)
+    with metrics.timed("status_hedged"):
+        return fetcher.fetch(server_address, timeout)
+
+
+def fetch_status_api(server_address, timeout=None, base=None, kind="status"):
+    """通过uapis.cn（或 base 指向的兼容镜像）查询服务器状态"""
+    import requests
+    import api
+    try:
+        logger.info("正在请求: %s", api.server_status_url(server_address, base))
+        with metrics.timed(kind):
+            formatted_data = api.fetch_server_status(server_address, timeout, base)
+        logs.debug_payload(logger, "API响应", formatted_data)
+        return formatted_data
+    except api.APIError as e:
+        raise _failed(str(e), e.status_code)
+    except ratelimit.CircuitOpenError as e:
+        raise _failed(str(e))
+    except records.DecodeError as e:
+        raise _failed(f"响应格式错误: {str(e)}")
+    except requests.exceptions.RequestException as e:
+        raise _failed(f"网络错误: {str(e)}")
+    except Exception as e:
+        raise _failed(f"未知错误: {str(e)}")
+
+
+def fetch_status_direct(server_address, timeout=5):
+    """使用Server List Ping协议直接连接目标服务器"""
+    try:
+        logger.info("正在直连: %s", server_address)
+        with metrics.timed("status_direct"):
+            formatted_data = {"success": True, "data": slp.query_status(server_address, timeout)}
+        logs.debug_payload(logger, "直连响应", formatted_data)
+        return formatted_data
+    except records.DecodeError as e:
+        raise _failed(f"响应格式错误: {str(e)}")
+    except ValueError as e:
+        raise _failed(f"地址错误: {str(e)}")
+    except slp.SLPError as e:
+        raise _failed(f"协议错误: {str(e)}")
+    except Exception as e:
+        raise _failed(f"未知错误: {str(e)}")
+
+
+def fetch_status_udp(server_address, protocol, timeout=None):
+    """基岩版 Unconnected Ping（protocol="bedrock"）或 GameSpy4 Query（protocol="query"）"""
+    import udp_probe
+    probe = udp_probe.query_bedrock if protocol == "bedrock" else udp_probe.query_full_stat
+    try:
+        logger.info("正在探测(%s): %s", protocol, server_address)
+        with metrics.timed(f"status_{protocol}"):
+            formatted_data = {"success": True, "data": probe(server_address, timeout or udp_probe.DEFAULT_TIMEOUT)}
+        logs.debug_payload(logger, "UDP响应", formatted_data)
+        return formatted_data
+    except records.DecodeError as e:
+        raise _failed(f"响应格式错误: {str(e)}")
+    except ValueError as e:
+        raise _failed(f"地址错误: {str(e)}")
+    except slp.SLPError as e:
+        raise _failed(f"协议错误: {str(e)}")
+    except Exception as e:
+        raise _failed(f"未知错误: {str(e)}")
+
+
+def fetch_player(username, timeout=None):
+    """查询玩家信息，失败时抛出 FetchError"""
+    import requests
+    import api
+    try:
+        logger.info("正在请求: %s", api.user_info_url(username))
+        with metrics.timed("player"):
+            formatted_data = api.fetch_player_info(username, timeout)
+        logs.debug_payload(logger, "API响应", formatted_data)
+        return formatted_data
+    except api.APIError as e:
+        raise _failed(str(e), e.status_code)
+    except ratelimit.CircuitOpenError as e:
+        raise _failed(str(e))
+    except records.DecodeError as e:
+        raise _failed(f"响应格式错误: {str(e)}")
+    except requests.exceptions.RequestException as e:
+        raise _failed(f"网络错误: {str(e)}")
+    except Exception as e:
+        raise _failed(f"未知错误: {str(e)}")
+
+
+def fetch_skin(skin_url, timeout=None):
+    """下载皮肤图片，返回原始字节，失败时抛出 FetchError"""
+    import requests
+    import api
+    try:
+        logger.info("正在下载皮肤: %s", skin_url)
+        with metrics.timed("skin"):
+            return api.get_bytes(skin_url, timeout)
+    except api.APIError as e:
+        raise _failed(str(e), e.status_code)
+    except ratelimit.CircuitOpenError as e:
+        raise _failed(str(e))
+    except requests.exceptions.RequestException as e:
+        raise _failed(f"网络错误: {str(e)}")
+
+
+def revalidate_skin(skin_url, etag=None, last_modified=None, timeout=None):
+    """带 ETag/If-Modified-Since 的皮肤下载，返回 (内容或None, etag, last_modified)，内容为None表示未变化"""
+    import requests
+    import api
+    try:
+        logger.info("正在%s皮肤: %s", "验证" if etag or last_modified else "下载", skin_url)
+        with metrics.timed("skin"):
+            return api.get_bytes_conditional(skin_url, etag, last_modified, timeout)
+    except api.APIError as e:
+        raise _failed(str(e), e.status_code)
+    except ratelimit.CircuitOpenError as e:
+        raise _failed(str(e))
+    except requests.exceptions.RequestException as e:
+        raise _failed(f"网络错误: {str(e)}")
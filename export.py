@@ -0,0 +1,220 @@
+"""查询结果的流式导出
+
+服务器状态和玩家信息先被规范化成固定字段的平面记录，再逐条写入 NDJSON、CSV
+或列式文件。写入器只缓冲很少的数据并定时刷新，长时间的扫描可以一边运行一边用
+tail 查看或分析，内存占用与结果总数无关。
+
+列式格式（.colz）由若干长度前缀的 zlib 块组成：第一块是字段表，之后每块是一组行
+按列存放的值。每组行写完就刷新到磁盘，read_columnar 可以读取正在写入的文件。
+
+    with export.open_writer("scan.csv", "status") as writer:
+        writer.write(item)
+"""
+import csv
+import json
+import os
+import struct
+import time
+import zlib
+from datetime import datetime
+
+STATUS_FIELDS = ("address", "success", "online", "ip", "port", "players", "max_players", "version",
+                 "motd_clean", "latency", "backend", "error", "elapsed", "time")
+PLAYER_FIELDS = ("query", "success", "username", "uuid", "skin_url", "cached", "error", "elapsed", "time")
+FORMATS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv", ".colz": "columnar"}
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_ROW_GROUP_SIZE = 1024
+COLUMNAR_MAGIC = b"MVPCOL1\n"
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def normalize_status(item, address=None):
+    """把扫描结果或 {"success": ..., "data": {...}} 形式的查询结果转换成 STATUS_FIELDS 记录"""
+    data = item.get("data") or {}
+    error = item.get("error")
+    if error is None and not item.get("success", True):
+        error = item.get("message")
+    return {
+        "address": item.get("address") or item.get("target") or address,
+        "success": bool(item.get("success")) and error is None,
+        "online": data.get("online"),
+        "ip": data.get("ip"),
+        "port": data.get("port"),
+        "players": data.get("players"),
+        "max_players": data.get("max_players"),
+        "version": data.get("version"),
+        "motd_clean": data.get("motd_clean"),
+        "latency": data.get("latency"),
+        "backend": item.get("backend"),
+        "error": error,
+        "elapsed": item.get("elapsed"),
+        "time": item.get("time") or _now(),
+    }
+
+
+def normalize_player(item, query=None):
+    """把 players.PlayerResolver 的结果或单次玩家查询结果转换成 PLAYER_FIELDS 记录"""
+    data = item.get("data") or {}
+    error = item.get("error")
+    if error is None and not item.get("success", True):
+        error = item.get("message")
+    return {
+        "query": item.get("query") or item.get("target") or query,
+        "success": bool(item.get("success")) and error is None,
+        "username": data.get("username"),
+        "uuid": data.get("uuid"),
+        "skin_url": data.get("skin_url"),
+        "cached": item.get("cached"),
+        "error": error,
+        "elapsed": item.get("elapsed"),
+        "time": item.get("time") or _now(),
+    }
+
+
+KINDS = {
+    "status": (STATUS_FIELDS, normalize_status),
+    "player": (PLAYER_FIELDS, normalize_player),
+}
+
+
+def format_for_path(path):
+    """根据扩展名判断格式，无法判断时按NDJSON处理"""
+    return FORMATS.get(os.path.splitext(path)[1].lower(), "ndjson")
+
+
+class ResultWriter:
+    """逐条写入规范化记录，距离上次刷新超过 flush_interval 秒时刷新到磁盘"""
+
+    def __init__(self, path, kind="status", flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.kind = kind
+        self.fields, self._normalize = KINDS[kind]
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._flushed_at = time.monotonic()
+        self._file = self._open()
+
+    def _open(self):
+        return open(self.path, "w", encoding="utf-8", newline="")
+
+    def _write_row(self, row):
+        raise NotImplementedError
+
+    def write(self, item, **context):
+        """写入一条原始结果（扫描结果、查询结果或玩家结果），context 补充结果中缺少的地址或查询"""
+        self._write_row(self._normalize(item, **context))
+        self.count += 1
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def write_many(self, items):
+        for item in items:
+            self.write(item)
+
+    def flush(self):
+        self._file.flush()
+        self._flushed_at = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class NDJSONWriter(ResultWriter):
+    """每条记录一行JSON"""
+
+    def _write_row(self, row):
+        self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+class CSVWriter(ResultWriter):
+    """带表头的CSV，使用 utf-8-sig 编码以便Excel正确识别中文"""
+
+    def __init__(self, path, kind="status", flush_interval=DEFAULT_FLUSH_INTERVAL):
+        super().__init__(path, kind, flush_interval)
+        self._writer = csv.DictWriter(self._file, self.fields)
+        self._writer.writeheader()
+
+    def _open(self):
+        return open(self.path, "w", encoding="utf-8-sig", newline="")
+
+    def _write_row(self, row):
+        self._writer.writerow(row)
+
+
+class ColumnarWriter(ResultWriter):
+    """按行组列式存储，每组最多 row_group_size 行，写满或到刷新间隔时写出一块"""
+
+    def __init__(self, path, kind="status", flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        super().__init__(path, kind, flush_interval)
+        self.row_group_size = row_group_size
+        self._columns = [[] for _ in self.fields]
+        self._file.write(COLUMNAR_MAGIC)
+        self._write_block({"kind": kind, "fields": list(self.fields)})
+
+    def _open(self):
+        return open(self.path, "wb")
+
+    def _write_block(self, payload):
+        block = zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self._file.write(struct.pack(">I", len(block)) + block)
+
+    def _write_row(self, row):
+        for column, field in zip(self._columns, self.fields):
+            column.append(row[field])
+        if len(self._columns[0]) >= self.row_group_size:
+            self._write_group()
+
+    def _write_group(self):
+        if self._columns[0]:
+            self._write_block({"rows": len(self._columns[0]), "columns": self._columns})
+            self._columns = [[] for _ in self.fields]
+
+    def flush(self):
+        self._write_group()
+        super().flush()
+
+
+WRITERS = {"ndjson": NDJSONWriter, "csv": CSVWriter, "columnar": ColumnarWriter}
+
+
+def open_writer(path, kind="status", format=None, flush_interval=DEFAULT_FLUSH_INTERVAL):
+    """按格式（默认根据扩展名判断）创建写入器，kind 为 status 或 player"""
+    fmt = format or format_for_path(path)
+    if fmt not in WRITERS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    return WRITERS[fmt](path, kind, flush_interval)
+
+
+def read_columnar(path):
+    """逐行读取列式文件，返回字典的生成器；末尾尚未写完的块会被忽略"""
+    with open(path, "rb") as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"不是列式导出文件: {path}")
+        fields = None
+        while True:
+            header = f.read(4)
+            if len(header) < 4:
+                return
+            (length,) = struct.unpack(">I", header)
+            block = f.read(length)
+            if len(block) < length:
+                return
+            payload = json.loads(zlib.decompress(block))
+            if fields is None:
+                fields = payload["fields"]
+                continue
+            for values in zip(*payload["columns"]):
+                yield dict(zip(fields, values))
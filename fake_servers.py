@@ -0,0 +1,270 @@
+"""进程内的模拟服务器，供 benchmark.py 和 tests 使用，只依赖标准库和本项目的协议模块
+
+    profile = FaultProfile(latency=20, failure_rate=0.05)
+    server = FakeMinecraftServer(profile).start()
+    slp.query_status(server.address)
+    server.stop()
+"""
+import asyncio
+import json
+import random
+import socket
+import struct
+import threading
+import time
+
+import resolver
+import slp
+import udp_probe
+
+# 模拟DNS服务器中SRV记录的目标主机，由系统解析到本机
+SRV_TARGET = "localhost"
+
+
+class FaultProfile:
+    """模拟服务器的延迟与失败率"""
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=None, slow_rate=0.0, slow_latency=0.0):
+        self.latency = latency          # 毫秒
+        self.jitter = jitter            # 毫秒，在 latency 上下均匀浮动
+        self.failure_rate = failure_rate
+        # 长尾：slow_rate 比例的响应额外慢 slow_latency 毫秒
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """本次响应应当等待的秒数"""
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0
+            if self.slow_rate and self._random.random() < self.slow_rate:
+                jitter += self.slow_latency
+        return max(0.0, self.latency + jitter) / 1000
+
+    def fails(self):
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+
+class FakeMinecraftServer:
+    """模拟的Minecraft服务器，响应Server List Ping，运行在独立线程的事件循环中
+
+    listeners 个监听端口对应 listeners 个不同的服务器地址，监控场景需要互不相同的地址。
+    """
+
+    def __init__(self, profile, host="127.0.0.1", listeners=1):
+        self.profile = profile
+        self.host = host
+        self.listeners = listeners
+        self.ports = []
+        self.requests = 0
+        self.status = json.dumps({
+            "version": {"name": "1.20.1", "protocol": 763},
+            "players": {"max": 200, "online": 42},
+            "description": {"text": "§aA Minecraft Server"},
+        }).encode("utf-8")
+        self._loop = asyncio.new_event_loop()
+        self._servers = []
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.addresses[0]
+
+    @property
+    def addresses(self):
+        return [f"{self.host}:{port}" for port in self.ports]
+
+    async def _handle(self, reader, writer):
+        self.requests += 1
+        try:
+            await slp.recv_packet_async(reader)     # 握手
+            await slp.recv_packet_async(reader)     # 状态请求
+            await asyncio.sleep(self.profile.delay())
+            if self.profile.fails():
+                return
+            writer.write(slp.pack_packet(0x00, slp.pack_varint(len(self.status)) + self.status))
+            await writer.drain()
+            payload = await slp.recv_packet_async(reader)
+            writer.write(slp.pack_varint(len(payload)) + payload)
+            await writer.drain()
+        except (OSError, EOFError, asyncio.IncompleteReadError, slp.SLPError):
+            pass
+        finally:
+            writer.close()
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            for _ in range(self.listeners):
+                server = self._loop.run_until_complete(
+                    asyncio.start_server(self._handle, self.host, 0, backlog=1024))
+                self._servers.append(server)
+                self.ports.append(server.sockets[0].getsockname()[1])
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        def close():
+            for server in self._servers:
+                server.close()
+            self._loop.stop()
+        self._loop.call_soon_threadsafe(close)
+        self._thread.join(5)
+
+
+class FakeDNSServer:
+    """模拟的DNS服务器（UDP）：mcN.bench.local 的SRV记录指向 localhost 和第N个模拟服务器端口
+
+    只有SRV记录由这里应答，目标主机和解析器一样交给 getaddrinfo。
+
+    delay 为每次应答前等待的秒数，mangle 不为None时应答先经过 mangle(报文) 再发出。
+    """
+
+    def __init__(self, game_server, ttl=300, host="127.0.0.1"):
+        self.ttl = ttl
+        self.queries = 0
+        self.names = []
+        self.records = {}
+        self._known = set()
+        self.delay = 0
+        self.mangle = None
+        for index, port in enumerate(game_server.ports):
+            self.names.append(f"mc{index}.bench.local")
+            self.add(f"_minecraft._tcp.mc{index}.bench.local", resolver.TYPE_SRV,
+                     struct.pack(">HHH", 0, 5, port) + resolver.encode_name(SRV_TARGET))
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((host, 0))
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._sock.getsockname()
+
+    def add(self, name, qtype, rdata):
+        """增加一条记录，rdata 为编码好的记录数据"""
+        self.records.setdefault((name, qtype), []).append(rdata)
+        self._known.add(name)
+
+    def answer(self, message):
+        """按查询报文构造应答；名字不存在时返回NXDOMAIN，带SOA记录给出否定TTL"""
+        query_id = struct.unpack(">H", message[:2])[0]
+        offset = 12
+        labels = []
+        while message[offset]:
+            labels.append(message[offset + 1:offset + 1 + message[offset]].decode("ascii").lower())
+            offset += 1 + message[offset]
+        qtype = struct.unpack(">H", message[offset + 1:offset + 3])[0]
+        question = message[12:offset + 5]
+        name = ".".join(labels)
+        answers = self.records.get((name, qtype), [])
+        rcode = 0 if name in self._known else resolver.RCODE_NXDOMAIN
+        body = b"".join(struct.pack(">HHHIH", 0xC00C, qtype, 1, self.ttl, len(rdata)) + rdata for rdata in answers)
+        authority = 0
+        if not answers:
+            soa = (resolver.encode_name("ns.bench.local") + resolver.encode_name("admin.bench.local")
+                   + struct.pack(">IIIII", 1, 3600, 600, 86400, self.ttl))
+            body += resolver.encode_name("bench.local") + struct.pack(">HHIH", resolver.TYPE_SOA, 1, self.ttl,
+                                                                      len(soa)) + soa
+            authority = 1
+        header = struct.pack(">HHHHHH", query_id, 0x8180 | rcode, 1, len(answers), authority, 0)
+        return header + question + body
+
+    def start(self):
+        def run():
+            while True:
+                try:
+                    message, client = self._sock.recvfrom(512)
+                except OSError:
+                    return
+                self.queries += 1
+                if self.delay:
+                    time.sleep(self.delay)
+                try:
+                    reply = self.answer(message)
+                    if self.mangle is not None:
+                        reply = self.mangle(reply)
+                    self._sock.sendto(reply, client)
+                except (IndexError, struct.error, UnicodeDecodeError):
+                    pass
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._sock.close()
+
+
+class FakeUDPServer:
+    """模拟的UDP状态服务：同一个端口上回应基岩版 Unconnected Ping 和 GameSpy4 Query
+
+    mangle 不为None时应答先经过 mangle(请求, 应答) 再发出，返回None表示不应答。
+    """
+
+    def __init__(self, profile, host="127.0.0.1"):
+        self.profile = profile
+        self.requests = 0
+        self.pong = ("MCPE;§bBedrock Server;622;1.20.40;42;200;123456789;Bench;Survival;1;"
+                     "19132;19133;").encode("utf-8")
+        self.full_stat = (udp_probe.QUERY_KV_PADDING
+                          + b"hostname\x00A Minecraft Server\x00gametype\x00SMP\x00game_id\x00MINECRAFT\x00"
+                          + b"version\x001.20.1\x00plugins\x00Paper on 1.20.1: Essentials 2.20; LuckPerms 5.4\x00"
+                          + b"map\x00world\x00numplayers\x003\x00maxplayers\x00200\x00hostport\x0025565\x00"
+                          + b"hostip\x00127.0.0.1\x00\x00" + udp_probe.QUERY_PLAYER_PADDING
+                          + b"Alice\x00Bob\x00Carol\x00\x00")
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((host, 0))
+        self.mangle = None
+        self._thread = None
+
+    @property
+    def address(self):
+        return "%s:%d" % self._sock.getsockname()
+
+    def answer(self, message):
+        """按请求构造应答，不认识的数据报返回None"""
+        if message[0] == udp_probe.UNCONNECTED_PING:
+            return (bytes([udp_probe.UNCONNECTED_PONG]) + message[1:9] + struct.pack(">Q", 1)
+                    + udp_probe.RAKNET_MAGIC + struct.pack(">H", len(self.pong)) + self.pong)
+        if message[:2] == udp_probe.QUERY_MAGIC:
+            kind, session = message[2], message[3:7]
+            if kind == udp_probe.QUERY_HANDSHAKE:
+                return bytes([kind]) + session + b"9513307\x00"
+            if kind == udp_probe.QUERY_STAT:
+                return bytes([kind]) + session + self.full_stat
+        return None
+
+    def start(self):
+        def run():
+            while True:
+                try:
+                    message, client = self._sock.recvfrom(2048)
+                except OSError:
+                    return
+                self.requests += 1
+                reply = self.answer(message) if message else None
+                if reply is not None and self.mangle is not None:
+                    reply = self.mangle(message, reply)
+                if reply is None or self.profile.fails():
+                    continue
+                delay = self.profile.delay()
+                if delay:
+                    threading.Timer(delay, self._sock.sendto, (reply, client)).start()
+                else:
+                    self._sock.sendto(reply, client)
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._sock.close()
@@ -0,0 +1,325 @@
+"""玩家数与延迟的历史记录
+
+每个服务器使用几组定长的环形缓冲区保存 (时间戳, 玩家数, 在线, 延迟)：
+最细的一层保存原始采样，较粗的层把采样按时间段聚合（平均玩家数、在线比例、平均延迟）。
+所有列都用 array 模块的紧凑类型存储，单条记录只占9字节，缓冲区写满后覆盖最旧的记录；
+服务器数量超过 max_servers 时丢弃最久没有采样的服务器，因此内存占用有固定上限。
+"""
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+import cache
+
+# (聚合时间段秒数, 容量)；0表示原始采样
+DEFAULT_TIERS = (
+    (0, 120),            # 最近120次原始采样
+    (30 * 60, 336),      # 30分钟一档，约7天
+    (6 * 3600, 360),     # 6小时一档，约90天
+)
+# 最多保存历史的服务器数，超出时丢弃最久没有采样的
+DEFAULT_MAX_SERVERS = 256
+NO_LATENCY = 0xFFFF
+MAX_PLAYERS = 0xFFFF
+HISTORY_PATH = os.path.join(os.path.dirname(cache.DEFAULT_DB_PATH), "history.bin")
+# 保存格式：文件头、版本号，之后按服务器依次写出各层缓冲区的列和未完成的聚合段
+FILE_MAGIC = b"MVPHIST"
+FILE_VERSION = 1
+# RingSeries 各列（时间戳、玩家数、在线比例、延迟）的 struct 类型
+COLUMN_TYPES = ("I", "H", "B", "H")
+# _Bucket：start, count, players, online, latency, latency_count
+BUCKET_STRUCT = struct.Struct(">IIQQQI")
+
+
+class RingSeries:
+    """定长环形缓冲区，按时间顺序保存采样"""
+    __slots__ = ("capacity", "timestamps", "players", "online", "latency", "head")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = array("I")   # 秒级时间戳
+        self.players = array("H")      # 玩家数（聚合层为平均值）
+        self.online = array("B")       # 在线比例 0-100
+        self.latency = array("H")      # 延迟毫秒，NO_LATENCY表示没有数据
+        self.head = 0                  # 缓冲区写满后下一次覆盖的位置（也是最旧记录的位置）
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append(self, timestamp, players, online, latency):
+        if len(self.timestamps) < self.capacity:
+            self.timestamps.append(timestamp)
+            self.players.append(players)
+            self.online.append(online)
+            self.latency.append(latency)
+            return
+        i = self.head
+        self.timestamps[i] = timestamp
+        self.players[i] = players
+        self.online[i] = online
+        self.latency[i] = latency
+        self.head = (i + 1) % self.capacity
+
+    def _physical(self, logical):
+        return (self.head + logical) % len(self.timestamps)
+
+    def oldest(self):
+        return self.timestamps[self._physical(0)] if self.timestamps else None
+
+    def _lower_bound(self, timestamp):
+        """第一个时间戳 >= timestamp 的逻辑下标（二分查找）"""
+        low, high = 0, len(self.timestamps)
+        while low < high:
+            mid = (low + high) // 2
+            if self.timestamps[self._physical(mid)] < timestamp:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def range(self, start, end):
+        """返回时间戳在 [start, end) 内的采样列表"""
+        if not self.timestamps:
+            return []
+        first = self._lower_bound(start)
+        last = self._lower_bound(end)
+        points = []
+        for logical in range(first, last):
+            i = self._physical(logical)
+            latency = self.latency[i]
+            points.append((self.timestamps[i], self.players[i], self.online[i],
+                           None if latency == NO_LATENCY else latency))
+        return points
+
+    def columns(self):
+        return self.timestamps, self.players, self.online, self.latency
+
+    def nbytes(self):
+        return sum(column.itemsize * len(column) for column in self.columns())
+
+
+class _Bucket:
+    """正在累积的聚合时间段"""
+    __slots__ = ("start", "count", "players", "online", "latency", "latency_count")
+
+    def __init__(self, start):
+        self.start = start
+        self.count = 0
+        self.players = 0
+        self.online = 0
+        self.latency = 0
+        self.latency_count = 0
+
+    def add(self, players, online, latency):
+        self.count += 1
+        self.players += players
+        self.online += online
+        if latency != NO_LATENCY:
+            self.latency += latency
+            self.latency_count += 1
+
+    def point(self):
+        latency = round(self.latency / self.latency_count) if self.latency_count else NO_LATENCY
+        return (self.start, round(self.players / self.count), round(self.online / self.count), latency)
+
+
+class ServerHistory:
+    """单个服务器的多层历史记录"""
+    __slots__ = ("tiers", "buckets")
+
+    def __init__(self, tiers=DEFAULT_TIERS):
+        self.tiers = [(period, RingSeries(capacity)) for period, capacity in tiers]
+        self.buckets = [None] * len(self.tiers)
+
+    def add(self, timestamp, players, online, latency):
+        for index, (period, series) in enumerate(self.tiers):
+            if period == 0:
+                series.append(timestamp, players, online, latency)
+                continue
+            start = timestamp - timestamp % period
+            bucket = self.buckets[index]
+            if bucket is not None and bucket.start != start:
+                # 进入新的时间段，把上一段的聚合结果写入缓冲区
+                series.append(*bucket.point())
+                bucket = None
+            if bucket is None:
+                bucket = self.buckets[index] = _Bucket(start)
+            bucket.add(players, online, latency)
+
+    def query(self, start, end):
+        """返回 [start, end) 内的采样：近期用细粒度数据，更早的部分用聚合数据"""
+        segments = []
+        boundary = end
+        for index, (period, series) in enumerate(self.tiers):
+            points = series.range(start, boundary)
+            # 尚未写入缓冲区的当前聚合段
+            bucket = self.buckets[index]
+            if bucket is not None and start <= bucket.start < boundary and (
+                    not points or bucket.start > points[-1][0]):
+                timestamp, players, online, latency = bucket.point()
+                points.append((timestamp, players, online, None if latency == NO_LATENCY else latency))
+            if points:
+                segments.append(points)
+                boundary = points[0][0]
+            if boundary <= start:
+                break
+        result = []
+        for points in reversed(segments):
+            result.extend(points)
+        return result
+
+    def nbytes(self):
+        return sum(series.nbytes() for _, series in self.tiers)
+
+
+class HistoryStore:
+    """所有服务器的历史记录，按最近采样时间保留至多 max_servers 个服务器"""
+
+    def __init__(self, tiers=DEFAULT_TIERS, max_servers=DEFAULT_MAX_SERVERS):
+        self.tier_config = tuple(tiers)
+        self.max_servers = max_servers
+        self._servers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, address, players, online, latency=None, timestamp=None):
+        """记录一次采样，address会被规范化"""
+        timestamp = int(time.time() if timestamp is None else timestamp)
+        players = max(0, min(MAX_PLAYERS, int(players or 0)))
+        online = 100 if online else 0
+        latency = NO_LATENCY if latency is None else max(0, min(NO_LATENCY - 1, int(round(latency))))
+        key = cache.cache_key(address)
+        with self._lock:
+            history = self._servers.get(key)
+            if history is None:
+                history = self._servers[key] = ServerHistory(self.tier_config)
+                while len(self._servers) > self.max_servers:
+                    self._servers.popitem(last=False)
+            else:
+                self._servers.move_to_end(key)
+            history.add(timestamp, players, online, latency)
+
+    def record_result(self, address, data, timestamp=None):
+        """从格式化后的查询结果中提取采样"""
+        if not data.get("success"):
+            return
+        result = data.get("data") or {}
+        online = result.get("online", False)
+        self.record(address, result.get("players", 0) if online else 0, online,
+                    result.get("latency"), timestamp)
+
+    def query(self, address, start, end=None):
+        """返回 [(时间戳, 玩家数, 在线比例0-100, 延迟或None), ...]，按时间升序"""
+        end = int(time.time()) + 1 if end is None else end
+        with self._lock:
+            history = self._servers.get(cache.cache_key(address))
+            return history.query(start, end) if history is not None else []
+
+    def addresses(self):
+        with self._lock:
+            return list(self._servers)
+
+    def nbytes(self):
+        """缓冲区实际占用的字节数"""
+        with self._lock:
+            return sum(history.nbytes() for history in self._servers.values())
+
+    def save(self, path=HISTORY_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data = self._encode()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _encode(self):
+        """按 FILE_MAGIC 之后的版本号写出的二进制格式，整数都是大端序"""
+        out = [FILE_MAGIC, struct.pack(">HH", FILE_VERSION, len(self.tier_config))]
+        out.extend(struct.pack(">II", period, capacity) for period, capacity in self.tier_config)
+        out.append(struct.pack(">I", len(self._servers)))
+        for key, history in self._servers.items():
+            raw_key = key.encode("utf-8")
+            out.append(struct.pack(">H", len(raw_key)) + raw_key)
+            for _, series in history.tiers:
+                out.append(struct.pack(">II", len(series), series.head))
+                for column, code in zip(series.columns(), COLUMN_TYPES):
+                    out.append(struct.pack(f">{len(column)}{code}", *column))
+            for bucket in history.buckets:
+                if bucket is None:
+                    out.append(b"\x00")
+                else:
+                    out.append(b"\x01" + BUCKET_STRUCT.pack(bucket.start, bucket.count, bucket.players,
+                                                             bucket.online, bucket.latency, bucket.latency_count))
+        return b"".join(out)
+
+    @classmethod
+    def _decode(cls, data):
+        reader = _Reader(data)
+        if reader.take(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError("不是历史记录文件")
+        version, tier_count = reader.unpack(">HH")
+        if version != FILE_VERSION:
+            raise ValueError(f"不支持的历史记录版本: {version}")
+        store = cls([reader.unpack(">II") for _ in range(tier_count)])
+        for _ in range(reader.unpack(">I")[0]):
+            key = reader.take(reader.unpack(">H")[0]).decode("utf-8")
+            history = ServerHistory(store.tier_config)
+            for _, series in history.tiers:
+                length, head = reader.unpack(">II")
+                if length > series.capacity or head >= max(length, 1):
+                    raise ValueError("历史记录长度不正确")
+                for column, code in zip(series.columns(), COLUMN_TYPES):
+                    column.extend(reader.unpack(f">{length}{code}"))
+                series.head = head
+            for index in range(len(history.buckets)):
+                if reader.take(1) == b"\x01":
+                    fields = reader.unpack(BUCKET_STRUCT.format)
+                    bucket = history.buckets[index] = _Bucket(fields[0])
+                    (bucket.count, bucket.players, bucket.online,
+                     bucket.latency, bucket.latency_count) = fields[1:]
+            store._servers[key] = history
+        if not reader.done():
+            raise ValueError("历史记录文件末尾有多余数据")
+        # 文件按最近采样时间从旧到新保存，旧版本可能记录了批量查询的大量服务器
+        while len(store._servers) > store.max_servers:
+            store._servers.popitem(last=False)
+        return store
+
+    @classmethod
+    def load(cls, path=HISTORY_PATH):
+        """读取保存的历史记录，文件不存在、被截断或格式不对时返回空的记录"""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return cls()
+        try:
+            return cls._decode(data)
+        except (ValueError, struct.error, UnicodeDecodeError, OverflowError):
+            return cls()
+
+
+class _Reader:
+    """按顺序读取二进制数据，数据不够时抛出 ValueError"""
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def take(self, size):
+        if self.offset + size > len(self.data):
+            raise ValueError("历史记录文件不完整")
+        chunk = self.data[self.offset:self.offset + size].tobytes()
+        self.offset += size
+        return chunk
+
+    def unpack(self, fmt):
+        return struct.unpack(fmt, self.take(struct.calcsize(fmt)))
+
+    def done(self):
+        return self.offset == len(self.data)
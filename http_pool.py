@@ -0,0 +1,185 @@
+"""共享的HTTP连接池
+
+服务器状态、玩家信息和皮肤下载都通过同一个 requests.Session 发出，
+连接保持keep-alive，连续查询可以复用已经完成TCP/TLS握手的连接。
+新建连接时的DNS解析、TCP连接和TLS握手，以及首字节和响应体的耗时都会记到 metrics 中。
+"""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+import metrics
+import resolver
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 10
+
+
+class PoolStats:
+    """连接池计数器：每个请求要么复用已有连接（命中），要么新建连接（未命中）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.misses = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    @property
+    def hits(self):
+        return max(0, self.requests - self.misses)
+
+    def as_dict(self):
+        return {"requests": self.requests, "hits": self.hits, "misses": self.misses}
+
+
+class _TimedConnectionMixin:
+    """分别记录DNS解析和TCP连接的耗时"""
+
+    def _new_conn(self):
+        host = self._dns_host
+        with metrics.phase("dns"):
+            try:
+                address = resolver.shared_resolver().addresses(host)[0]
+            except OSError:
+                address = None
+        with metrics.phase("connect"):
+            if address is None:
+                # 解析失败时交给urllib3按原来的方式报告错误
+                return super()._new_conn()
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except NewConnectionError:
+                # 第一个地址连不上（例如IPv6不通）时按主机名重试全部地址
+                self._dns_host = host
+                return super()._new_conn()
+            finally:
+                self._dns_host = host
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    """另外记录TLS握手耗时"""
+
+    def connect(self):
+        timing = metrics.current()
+        if timing is None:
+            return super().connect()
+        before = timing.total_of(("dns", "connect"))
+        started = time.perf_counter()
+        super().connect()
+        elapsed = (time.perf_counter() - started) * 1000
+        timing.add("tls", max(0.0, elapsed - (timing.total_of(("dns", "connect")) - before)))
+
+
+def _counting_pool_class(base, stats, connection_class):
+    """生成在新建连接时计数、并使用计时连接的连接池类"""
+    class CountingPool(base):
+        ConnectionCls = connection_class
+
+        def _new_conn(self):
+            stats.record_miss()
+            return super()._new_conn()
+    CountingPool.__name__ = f"Counting{base.__name__}"
+    return CountingPool
+
+
+class CountingAdapter(HTTPAdapter):
+    """记录连接复用情况和首字节耗时的HTTPAdapter"""
+
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool_class(HTTPConnectionPool, self.stats, TimedHTTPConnection),
+            "https": _counting_pool_class(HTTPSConnectionPool, self.stats, TimedHTTPSConnection),
+        }
+
+    def send(self, request, **kwargs):
+        self.stats.record_request()
+        timing = metrics.current()
+        if timing is None:
+            return super().send(request, **kwargs)
+        handshake = ("dns", "connect", "tls")
+        before = timing.total_of(handshake)
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        # 返回时只读完了响应头；扣除其中新建连接的耗时即为首字节时间
+        elapsed = (time.perf_counter() - started) * 1000
+        timing.add("ttfb", max(0.0, elapsed - (timing.total_of(handshake) - before)))
+        return response
+
+
+class HTTPPool:
+    """长生命周期的HTTP会话
+
+    pool_size: 每个主机保留的最大连接数，应不小于同时发请求的线程数
+    connect_timeout / read_timeout: 默认的连接超时和读取超时（秒）
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.stats = PoolStats()
+        self.session = requests.Session()
+        self.session.headers["Connection"] = "keep-alive"
+        adapter = CountingAdapter(self.stats, pool_connections=8, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url, timeout=None, stream=False, **kwargs):
+        """发送GET请求，timeout为None时使用连接池的默认超时"""
+        response = self.session.get(url, timeout=timeout or self.timeout, stream=True, **kwargs)
+        if not stream:
+            with metrics.phase("body"):
+                response.content
+        return response
+
+    def close(self):
+        self.session.close()
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool():
+    """返回进程内共享的连接池，首次调用时创建"""
+    global _shared_pool
+    if _shared_pool is None:
+        with _shared_lock:
+            if _shared_pool is None:
+                _shared_pool = HTTPPool()
+    return _shared_pool
+
+
+def configure(pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+              read_timeout=DEFAULT_READ_TIMEOUT):
+    """以新的参数重建共享连接池"""
+    global _shared_pool
+    with _shared_lock:
+        old_pool = _shared_pool
+        _shared_pool = HTTPPool(pool_size, connect_timeout, read_timeout)
+    if old_pool is not None:
+        old_pool.close()
+    return _shared_pool
@@ -0,0 +1,131 @@
+"""结构化日志
+
+基于标准库 logging：调用方只把日志记录放进队列，格式化和写入（控制台、滚动的NDJSON文件）
+都在后台线程完成，查询线程不会因为输出而阻塞。请求/响应内容这类大块数据通过
+debug_payload 记录，只有开启DEBUG级别时才会被序列化。
+
+    logs.setup(level="DEBUG", log_file=logs.DEFAULT_LOG_PATH)
+    logger = logs.get_logger("core")
+    logger.info("正在请求: %s", url)
+    logs.debug_payload(logger, "API响应", data)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime
+
+import records
+
+LOGGER_NAME = "mvpmc"
+# 与缓存数据库放在同一个目录下
+DEFAULT_LOG_PATH = os.path.join(os.path.expanduser("~"), ".mvpmc_motd_reader", "logs", "mvpmc.ndjson")
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUPS = 3
+
+_listener = None
+
+
+def get_logger(name=None):
+    """返回 mvpmc 或 mvpmc.<name> 日志记录器"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
+
+
+def _json_default(value):
+    """记录按 records.json_default 写成JSON对象，其他无法序列化的值退回 str，日志输出不会因此失败"""
+    try:
+        return records.json_default(value)
+    except TypeError:
+        return str(value)
+
+
+def debug_payload(logger, message, payload):
+    """只在开启DEBUG时记录一份数据，序列化推迟到后台线程"""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, extra={"payload": payload})
+
+
+class ConsoleFormatter(logging.Formatter):
+    """与原来的控制台输出一致：[时间] 消息"""
+
+    def format(self, record):
+        text = f"[{datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S')}] {record.getMessage()}"
+        payload = getattr(record, "payload", None)
+        if payload is not None:
+            text += " " + json.dumps(payload, ensure_ascii=False, default=_json_default)
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+
+class NDJSONFormatter(logging.Formatter):
+    """每条记录一行JSON"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        payload = getattr(record, "payload", None)
+        if payload is not None:
+            entry["payload"] = payload
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=_json_default)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """保留原始的 record，把格式化留给后台线程
+
+    标准库的 QueueHandler 会在调用线程里先格式化消息，这正是要避免的开销。
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup(level="INFO", console=True, log_file=None, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS):
+    """配置日志输出，可以重复调用；log_file 为None时不写文件"""
+    global _listener
+    shutdown()
+    handlers = []
+    if console:
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setFormatter(ConsoleFormatter())
+        handlers.append(console_handler)
+    if log_file:
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        file_handler.setFormatter(NDJSONFormatter())
+        handlers.append(file_handler)
+
+    records = queue.SimpleQueue()
+    logger = get_logger()
+    logger.handlers = [_QueueHandler(records)]
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    return logger
+
+
+def shutdown():
+    """写完队列中剩余的记录并停止后台线程"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown)
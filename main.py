@@ -1,157 +1,503 @@
+import time
+# --profile-startup 从这里开始计算导入耗时
+_IMPORT_STARTED = time.perf_counter()
+
+import os
 import sys
-import requests
-import json
-import re
-from datetime import datetime
+import asyncio
+import contextlib
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QLabel, QLineEdit, QPushButton, QTextEdit, QFrame, QScrollArea,
-                             QGroupBox, QProgressBar, QMessageBox, QTabWidget)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QUrl
-from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest
-from PyQt5.QtWidgets import QStatusBar
-from PyQt5.QtGui import QFont, QPixmap, QIcon, QColor, QPalette, QImage, QPainter
+                             QLabel, QLineEdit, QPushButton, QFrame, QScrollArea,
+                             QGroupBox, QProgressBar, QMessageBox, QTabWidget, QCheckBox,
+                             QPlainTextEdit, QSpinBox, QTableView, QHeaderView, QComboBox, QFileDialog)
+from PyQt5.QtCore import Qt, QThread, QObject, QTimer, QEvent, pyqtSignal
+from PyQt5.QtGui import QFont, QPixmap, QImage
+
+import backends
+import cache
+import core
+import export
+import history
+import http_pool
+import logs
+import metrics
+import motd
+import players
+import resolver
+import scanner
+import scheduler
+import skins
+import views
+import worker_pool
+
+
+FetchError = core.FetchError
+logger = logs.get_logger("gui")
+
+# 整个窗口共用的样式表，只在创建窗口时解析一次；个别控件通过objectName区分
+STYLESHEET = """
+    QMainWindow {
+        background-color: #f0f0f0;
+    }
+    QLabel {
+        color: #000000;
+    }
+    QLineEdit {
+        background-color: #ffffff;
+        color: #000000;
+        border: 1px solid #cccccc;
+        padding: 8px;
+        border-radius: 4px;
+    }
+    QPushButton {
+        background-color: #3498db;
+        color: white;
+        border: none;
+        padding: 8px 16px;
+        border-radius: 4px;
+        font-weight: bold;
+    }
+    QPushButton:hover {
+        background-color: #2980b9;
+    }
+    QPushButton:pressed {
+        background-color: #21618c;
+    }
+    QPushButton:disabled {
+        background-color: #bdc3c7;
+        color: #7f8c8d;
+    }
+    QGroupBox {
+        border: 1px solid #cccccc;
+        border-radius: 5px;
+        margin-top: 1ex;
+        color: #2c3e50;
+        font-weight: bold;
+    }
+    QGroupBox::title {
+        subcontrol-origin: margin;
+        subcontrol-position: top center;
+        padding: 0 5px;
+        color: #000000;
+    }
+    QTextEdit {
+        background-color: #ffffff;
+        color: #000000;
+        border: 1px solid #cccccc;
+        border-radius: 4px;
+    }
+    QScrollArea {
+        border: none;
+    }
+    QTabWidget::pane {
+        border: 1px solid #cccccc;
+        border-radius: 5px;
+    }
+    QTabBar::tab {
+        background: #e0e0e0;
+        border: 1px solid #cccccc;
+        border-bottom-color: #cccccc;
+        border-top-left-radius: 4px;
+        border-top-right-radius: 4px;
+        padding: 8px 16px;
+        margin-right: 2px;
+    }
+    QTabBar::tab:selected {
+        background: #3498db;
+        color: white;
+    }
+    QFrame#sidebar {
+        background-color: #3498db;
+        border-right: 1px solid #2980b9;
+    }
+    QLabel#sidebarTitle {
+        color: white;
+        font-size: 18px;
+        font-weight: bold;
+        border-bottom: 1px solid white;
+        padding-bottom: 10px;
+        margin-bottom: 15px;
+    }
+    QLabel#sidebarHeading {
+        color: white;
+        font-size: 14px;
+        font-weight: bold;
+        margin-top: 10px;
+    }
+    QLabel#sidebarText {
+        color: white;
+        font-size: 12px;
+        margin-left: 10px;
+    }
+    QLabel#sidebarEndpoint {
+        color: white;
+        font-size: 11px;
+        margin-left: 10px;
+    }
+    QLabel#sidebarAuthor {
+        color: white;
+        font-size: 14px;
+        font-weight: bold;
+        margin-top: 30px;
+        padding-top: 10px;
+        border-top: 1px solid white;
+    }
+    QLabel#appTitle {
+        color: #2c3e50;
+        margin: 15px;
+    }
+"""
+
+
+class ServerStatusWorker:
+    """后台任务，用于获取服务器状态（在 RequestPool 的线程中执行）"""
+    
+    def __init__(self, server_address, direct=False):
+        self.server_address = server_address
+        self.direct = direct
+        self.metrics_kind = core.status_metrics_kind(direct)
+    
+    @property
+    def key(self):
+        return core.status_key(self.server_address, self.direct)
+    
+    def run(self):
+        return core.fetch_status(self.server_address, self.direct)
+
+
+class PlayerInfoWorker:
+    """后台任务，用于获取玩家信息"""
+    
+    metrics_kind = "player"
+    
+    def __init__(self, username):
+        self.username = username
+    
+    @property
+    def key(self):
+        return ("player", self.username.lower())
+    
+    def run(self):
+        return core.fetch_player(self.username)
+
+
+_skin_renderer = None
+
+
+def skin_renderer():
+    """共用的皮肤预览渲染器，没有安装 NumPy 时返回None（退回直接显示贴图）
+
+    第一次加载皮肤时才导入 NumPy，不拖慢启动。
+    """
+    global _skin_renderer
+    if _skin_renderer is None:
+        try:
+            import skin_render
+        except ImportError:
+            logger.info("未安装 NumPy，皮肤预览直接显示贴图")
+            _skin_renderer = False
+        else:
+            _skin_renderer = skin_render
+    return _skin_renderer or None
+
+
+def image_to_texture(image):
+    """把解码后的贴图转换成渲染器使用的RGBA数组，高清贴图先按最近邻缩小到64像素宽"""
+    render = skin_renderer()
+    if image.width() != 64:
+        image = image.scaled(64, image.height() * 64 // max(1, image.width()),
+                             Qt.IgnoreAspectRatio, Qt.FastTransformation)
+    if image.height() not in (32, 64):
+        raise ValueError(f"不支持的皮肤尺寸: {image.width()}×{image.height()}")
+    image = image.convertToFormat(QImage.Format_RGBA8888)
+    data = image.constBits()
+    data.setsize(image.sizeInBytes())
+    return render.from_rgba_bytes(bytes(data), image.width(), image.height(), image.bytesPerLine())
+
+
+def texture_to_image(array):
+    """把渲染结果转换成 QImage（复制一份，不引用数组的内存）"""
+    height, width = array.shape[:2]
+    return QImage(array.tobytes(), width, height, width * 4, QImage.Format_RGBA8888).copy()
+
+
+class SkinImageWorker:
+    """后台任务：经皮肤缓存取得贴图，并在后台线程渲染成头像和全身正面的预览图
+
+    没有 NumPy 或贴图尺寸不支持时退回缩放后的原始贴图。结果按贴图内容哈希
+    保存在 images 中，同一张贴图只处理一次。
+    """
+    
+    metrics_kind = "skin"
+    
+    def __init__(self, skin_url, skin_cache, images, size=128):
+        self.skin_url = skin_url
+        self.skin_cache = skin_cache
+        self.images = images
+        self.size = size
+    
+    @property
+    def key(self):
+        return ("skin", self.skin_url, self.size)
+    
+    def run(self):
+        digest, content = self.skin_cache.fetch(self.skin_url)
+        image = self.images.get((digest, self.size))
+        if image is None:
+            # QImage 可以在非GUI线程中使用，QPixmap 不行
+            image = QImage.fromData(content)
+            if image.isNull():
+                return image
+            image = self.render(digest, image)
+            self.images.put((digest, self.size), image)
+        return image
+    
+    def render(self, digest, image):
+        render = skin_renderer()
+        if render is not None:
+            try:
+                head, body = render.shared_renderer().render(digest, image_to_texture(image))
+                return texture_to_image(render.side_by_side([head, body]))
+            except ValueError as e:
+                logger.info("无法渲染皮肤预览: %s", e)
+        return image.scaled(self.size, self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+class SkinIconsWorker:
+    """后台任务：为批量查询的结果列表取得一批皮肤，并一次渲染出所有头像图标"""
+    
+    metrics_kind = "skin"
+    
+    def __init__(self, skin_urls, skin_cache, size=16):
+        self.skin_urls = skin_urls
+        self.skin_cache = skin_cache
+        self.size = size
+    
+    @property
+    def key(self):
+        return ("skin_icons", tuple(self.skin_urls), self.size)
+    
+    def _fetch(self, url):
+        try:
+            return url, self.skin_cache.fetch(url)
+        except FetchError:
+            return url, None
+    
+    def run(self):
+        """返回 {皮肤URL: QImage}，下载或解码失败的皮肤不包含在内"""
+        with ThreadPoolExecutor(players.DEFAULT_CONCURRENCY) as executor:
+            fetched = [(url, result) for url, result in executor.map(self._fetch, self.skin_urls)
+                       if result is not None]
+        decoded = []
+        for url, (digest, content) in fetched:
+            image = QImage.fromData(content)
+            if not image.isNull():
+                decoded.append((url, digest, image))
+        render = skin_renderer()
+        if render is None:
+            # 没有 NumPy 时直接裁出头部正面
+            return {url: image.copy(8 * image.width() // 64, 8 * image.width() // 64,
+                                    image.width() // 8, image.width() // 8)
+                    .scaled(self.size, self.size, Qt.KeepAspectRatio, Qt.FastTransformation)
+                    for url, digest, image in decoded}
+        items = []
+        for url, digest, image in decoded:
+            try:
+                items.append((url, (digest, image_to_texture(image), None)))
+            except ValueError:
+                continue
+        renderer = render.shared_renderer(head_scale=self.size // 8, body_scale=1)
+        rendered = renderer.render_batch([item for _, item in items])
+        return {url: texture_to_image(head) for (url, _), (head, _) in zip(items, rendered)}
+
 
+class RequestPool(QObject):
+    """复用的后台请求池
 
-class ServerStatusWorker(QThread):
-    """工作线程，用于在后台获取服务器状态"""
+    相同的进行中请求只发起一次网络调用；结果通过信号回到GUI线程，
+    已取消（被新查询取代）的请求不会再回调。显示结果的耗时记为该类查询的渲染阶段。
+    """
+    request_done = pyqtSignal(object)
+    rendered = pyqtSignal(str)
+    
+    def __init__(self, max_workers=worker_pool.DEFAULT_MAX_WORKERS):
+        super().__init__()
+        self.flights = worker_pool.SingleFlightPool(max_workers)
+        self.request_done.connect(self.dispatch)
+    
+    def submit(self, worker, on_result, on_error, on_finished=None):
+        """提交后台任务，返回可以取消的 Ticket"""
+        ticket = self.flights.submit(worker.key, worker.run)
+        ticket.context = (worker.metrics_kind, on_result, on_error, on_finished)
+        ticket.add_done_callback(self.request_done.emit)
+        return ticket
+    
+    def dispatch(self, ticket):
+        """在GUI线程中分发结果"""
+        if ticket.cancelled:
+            return
+        kind, on_result, on_error, on_finished = ticket.context
+        try:
+            data = ticket.future.result()
+        except FetchError as e:
+            on_error(str(e))
+        except Exception as e:
+            on_error(f"未知错误: {str(e)}")
+        else:
+            started = time.perf_counter()
+            on_result(data)
+            metrics.registry().observe(kind, "render", (time.perf_counter() - started) * 1000)
+            self.rendered.emit(kind)
+        if on_finished:
+            on_finished()
+    
+    def shutdown(self):
+        self.flights.shutdown()
+
+
+class PlayerBatchWorker(QThread):
+    """工作线程，批量查询玩家，结果按完成顺序逐条发出"""
     result_ready = pyqtSignal(dict)
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, server_address):
+    def __init__(self, queries, player_cache, concurrency=players.DEFAULT_CONCURRENCY):
         super().__init__()
-        self.server_address = server_address
+        self.queries = queries
+        self.resolver = players.PlayerResolver(player_cache, concurrency)
     
     def run(self):
         try:
-            url = f"https://uapis.cn/api/v1/game/minecraft/serverstatus?server={self.server_address}"
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 正在请求: {url}")
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                # 转换API响应格式以匹配前端期望的格式
-                formatted_data = {
-                    "success": True,
-                    "data": data
-                }
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] API响应: {json.dumps(formatted_data, ensure_ascii=False, indent=2)}")
-                self.result_ready.emit(formatted_data)
-            else:
-                error_msg = f"API请求失败: {response.status_code}"
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {error_msg}")
-                self.error_occurred.emit(error_msg)
-        except requests.exceptions.RequestException as e:
-            error_msg = f"网络错误: {str(e)}"
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {error_msg}")
-            self.error_occurred.emit(error_msg)
+            for item in self.resolver.resolve(self.queries):
+                self.result_ready.emit(item)
         except Exception as e:
             error_msg = f"未知错误: {str(e)}"
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {error_msg}")
+            logger.error(error_msg)
             self.error_occurred.emit(error_msg)
+    
+    def stop(self):
+        """停止派发新的查询"""
+        self.resolver.cancel()
 
 
-class PlayerInfoWorker(QThread):
-    """工作线程，用于在后台获取玩家信息"""
+class BatchScanWorker(QThread):
+    """工作线程，在独立的事件循环中运行批量扫描"""
     result_ready = pyqtSignal(dict)
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, username):
+    def __init__(self, addresses, direct=False, concurrency=100):
         super().__init__()
-        self.username = username
+        self.addresses = addresses
+        self.scanner = scanner.BatchScanner(concurrency=concurrency, direct=direct)
     
     def run(self):
         try:
-            url = f"https://uapis.cn/api/v1/game/minecraft/userinfo?username={self.username}"
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 正在请求: {url}")
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                # 转换API响应格式以匹配前端期望的格式
-                formatted_data = {
-                    "success": True,
-                    "data": data
-                }
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] API响应: {json.dumps(formatted_data, ensure_ascii=False, indent=2)}")
-                self.result_ready.emit(formatted_data)
-            else:
-                error_msg = f"API请求失败: {response.status_code}"
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {error_msg}")
-                self.error_occurred.emit(error_msg)
-        except requests.exceptions.RequestException as e:
-            error_msg = f"网络错误: {str(e)}"
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {error_msg}")
-            self.error_occurred.emit(error_msg)
+            logger.info("开始批量查询: %d 个地址", len(self.addresses))
+            count = asyncio.run(self.scanner.scan_all(self.addresses, self.result_ready.emit))
+            logger.info("批量查询结束: %d 条结果", count)
         except Exception as e:
             error_msg = f"未知错误: {str(e)}"
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {error_msg}")
+            logger.error(error_msg)
             self.error_occurred.emit(error_msg)
+    
+    def stop(self):
+        """停止派发新的地址"""
+        self.scanner.cancel()
+
+
+# 查询方式下拉框的选项，数据为 core.fetch_status 的 direct 参数
+STATUS_MODE_ITEMS = (
+    ("uapis.cn", False, "经过uapis.cn查询（慢时对冲直连）"),
+    ("Java直连", "java", "不经过API，直接连接服务器获取状态和延迟"),
+    ("基岩版(UDP)", "bedrock", "RakNet Unconnected Ping，默认端口19132"),
+    ("Query(UDP)", "query", "GameSpy4 Query，需要服务器开启 enable-query，可获取玩家列表和插件"),
+)
+
+
+def status_mode_combo():
+    """查询方式下拉框"""
+    combo = QComboBox()
+    for index, (text, mode, tip) in enumerate(STATUS_MODE_ITEMS):
+        combo.addItem(text, mode)
+        combo.setItemData(index, tip, Qt.ToolTipRole)
+    return combo
+
+
+def format_age(seconds):
+    """把秒数格式化为“N分钟前”这样的描述"""
+    if seconds < 5:
+        return "刚刚"
+    if seconds < 60:
+        return f"{int(seconds)}秒前"
+    if seconds < 3600:
+        return f"{int(seconds // 60)}分钟前"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)}小时前"
+    return f"{int(seconds // 86400)}天前"
+
+
+def comparable_status(data):
+    """去掉每次查询都会变化的字段（延迟），用于判断结果是否有变化"""
+    result = dict(data.get("data") or {})
+    result.pop("latency", None)
+    return data.get("success"), result
 
 
 class MinecraftStatusApp(QMainWindow):
-    def __init__(self):
+    def __init__(self, profiler=None):
         super().__init__()
+        self.profiler = profiler
+        self.status_cache = self.create_status_cache()
+        self.player_cache = self.create_player_cache()
+        self.skin_cache = self.create_skin_cache()
+        # 解码、缩放好的皮肤图片，按 (贴图内容哈希, 尺寸) 索引
+        self.skin_images = skins.LRU(skins.DEFAULT_MEMORY_ENTRIES)
+        # 玩家数与延迟的历史记录
+        self.history = history.HistoryStore.load()
+        self.history_address = None
+        # 所有单次查询共用的后台请求池
+        self.request_pool = RequestPool()
+        self.server_ticket = None
+        self.player_ticket = None
+        self.skin_ticket = None
         self.init_ui()
         
+    def create_status_cache(self):
+        """创建服务器状态缓存，持久层不可用时退回纯内存缓存"""
+        try:
+            return cache.ResultCache(db_path=cache.DEFAULT_DB_PATH)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("缓存数据库不可用，仅使用内存缓存: %s", e)
+            return cache.ResultCache()
+        
+    def create_player_cache(self):
+        """创建 玩家名↔UUID 缓存，持久层不可用时退回纯内存缓存"""
+        try:
+            return players.PlayerCache(db_path=players.DEFAULT_DB_PATH)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("玩家缓存数据库不可用，仅使用内存缓存: %s", e)
+            return players.PlayerCache()
+        
+    def create_skin_cache(self):
+        """创建皮肤贴图缓存，磁盘不可用时退回纯内存缓存"""
+        try:
+            return skins.SkinCache(cache_dir=skins.DEFAULT_CACHE_DIR)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("皮肤缓存目录不可用，仅使用内存缓存: %s", e)
+            return skins.SkinCache()
+        
     def init_ui(self):
-        """初始化用户界面"""
+        """初始化用户界面
+
+        只有默认显示的服务器状态页在这里创建，其余标签页在第一次切换过去时才创建。
+        """
         self.setWindowTitle('服务器状态读取器-byMVP')
         self.setGeometry(100, 100, 900, 700)
         self.setMinimumSize(700, 500)
         
-        # 设置应用程序样式
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #f0f0f0;
-            }
-            QLabel {
-                color: #000000;
-            }
-            QLineEdit {
-                background-color: #ffffff;
-                color: #000000;
-                border: 1px solid #cccccc;
-                padding: 8px;
-                border-radius: 4px;
-            }
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 4px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #2980b9;
-            }
-            QPushButton:pressed {
-                background-color: #21618c;
-            }
-            QPushButton:disabled {
-                background-color: #bdc3c7;
-                color: #7f8c8d;
-            }
-            QGroupBox {
-                border: 1px solid #cccccc;
-                border-radius: 5px;
-                margin-top: 1ex;
-                color: #2c3e50;
-                font-weight: bold;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                subcontrol-position: top center;
-                padding: 0 5px;
-                color: #000000;
-            }
-            QTextEdit {
-                background-color: #ffffff;
-                color: #000000;
-                border: 1px solid #cccccc;
-                border-radius: 4px;
-            }
-        """)
+        # 整个界面的样式只设置一次
+        self.setStyleSheet(STYLESHEET)
         
         # 创建中央部件
         central_widget = QWidget()
@@ -163,60 +509,21 @@ class MinecraftStatusApp(QMainWindow):
         
         # 创建侧边栏
         sidebar = QFrame()
-        sidebar.setStyleSheet("""
-            QFrame {
-                background-color: #3498db;
-                border-right: 1px solid #2980b9;
-            }
-        """)
+        sidebar.setObjectName("sidebar")
         sidebar.setFixedWidth(200)
         sidebar_layout = QVBoxLayout(sidebar)
         sidebar_layout.setContentsMargins(10, 20, 10, 20)
         
-        # 侧边栏标题
-        sidebar_title = QLabel("信息")
-        sidebar_title.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-size: 18px;
-                font-weight: bold;
-                border-bottom: 1px solid white;
-                padding-bottom: 10px;
-                margin-bottom: 15px;
-            }
-        """)
-        sidebar_layout.addWidget(sidebar_title)
-        
-        # API信息
-        api_label = QLabel("免费API接口：")
-        api_label.setStyleSheet("color: white; font-size: 14px; font-weight: bold; margin-top: 10px;")
-        sidebar_layout.addWidget(api_label)
-        
-        method_label = QLabel("GET")
-        method_label.setStyleSheet("color: white; font-size: 12px; margin-left: 10px;")
-        sidebar_layout.addWidget(method_label)
-        
-        url_label = QLabel("uapis.cn")
-        url_label.setStyleSheet("color: white; font-size: 12px; margin-left: 10px;")
-        sidebar_layout.addWidget(url_label)
-        
-        endpoint_label = QLabel("/api/v1/game/minecraft/serverstatus")
-        endpoint_label.setStyleSheet("color: white; font-size: 11px; margin-left: 10px;")
-        sidebar_layout.addWidget(endpoint_label)
-        
-        # 作者信息
-        author_label = QLabel("程序作者：MVP")
-        author_label.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-size: 14px;
-                font-weight: bold;
-                margin-top: 30px;
-                padding-top: 10px;
-                border-top: 1px solid white;
-            }
-        """)
-        sidebar_layout.addWidget(author_label)
+        # 侧边栏标题、API信息、作者信息
+        for text, name in (("信息", "sidebarTitle"),
+                           ("免费API接口：", "sidebarHeading"),
+                           ("GET", "sidebarText"),
+                           ("uapis.cn", "sidebarText"),
+                           ("/api/v1/game/minecraft/serverstatus", "sidebarEndpoint"),
+                           ("程序作者：MVP", "sidebarAuthor")):
+            label = QLabel(text)
+            label.setObjectName(name)
+            sidebar_layout.addWidget(label)
         
         sidebar_layout.addStretch()
         
@@ -228,40 +535,84 @@ class MinecraftStatusApp(QMainWindow):
         
         # 标题
         title_label = QLabel('Minecraft信息查询工具')
+        title_label.setObjectName("appTitle")
         title_font = QFont()
         title_font.setPointSize(20)
         title_font.setBold(True)
         title_label.setFont(title_font)
         title_label.setAlignment(Qt.AlignCenter)
-        title_label.setStyleSheet("color: #2c3e50; margin: 15px;")
         main_layout.addWidget(title_label)
         
-        # 创建标签页
-        tab_widget = QTabWidget()
-        tab_widget.setStyleSheet("""
-            QTabWidget::pane {
-                border: 1px solid #cccccc;
-                border-radius: 5px;
-            }
-            QTabBar::tab {
-                background: #e0e0e0;
-                border: 1px solid #cccccc;
-                border-bottom-color: #cccccc;
-                border-top-left-radius: 4px;
-                border-top-right-radius: 4px;
-                padding: 8px 16px;
-                margin-right: 2px;
-            }
-            QTabBar::tab:selected {
-                background: #3498db;
-                color: white;
-            }
-        """)
-        
-        # 服务器状态查询标签
-        server_tab = QWidget()
-        server_tab_layout = QVBoxLayout(server_tab)
+        # 批量查询与监控的后台状态不依赖标签页是否已经创建
+        self.batch_worker = None
+        self.player_batch_worker = None
+        # 扫描结果先缓冲，定时批量写入模型，避免每条结果都触发一次重绘
+        self.batch_buffer = []
+        self.batch_flush_timer = QTimer(self)
+        self.batch_flush_timer.setInterval(100)
+        self.batch_flush_timer.timeout.connect(self.flush_batch_results)
+        # 每秒检查一次哪些服务器到期需要查询
+        self.watch_scheduler = scheduler.AdaptiveScheduler()
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setInterval(1000)
+        self.watch_timer.timeout.connect(self.poll_watchlist)
+        # 最近一次单独查询的结果，以及正在随批量查询/监控追加写入的导出文件 (标签页, 写入器)
+        self.last_status_result = None
+        self.last_player_result = None
+        self.live_export = None
+        
+        # 创建标签页，除第一页外都先放一个空白页面，切换过去时再创建内容
+        self.tab_widget = QTabWidget()
+        self.tab_builders = {}
+        for title, builder in (("服务器状态", self.build_server_tab),
+                               ("玩家信息", self.build_player_tab),
+                               ("批量查询", self.build_batch_tab),
+                               ("监控", self.build_watch_tab)):
+            page = QWidget()
+            self.tab_builders[self.tab_widget.addTab(page, title)] = (page, builder)
+        self.ensure_tab(0)
+        self.tab_widget.currentChanged.connect(self.ensure_tab)
+        export_button = QPushButton("导出当前视图")
+        export_button.setShortcut("Ctrl+E")
+        export_button.setToolTip("把当前标签页的结果导出为 NDJSON、CSV 或列式文件 (Ctrl+E)")
+        export_button.clicked.connect(self.export_current_view)
+        self.tab_widget.setCornerWidget(export_button)
+        
+        main_layout.addWidget(self.tab_widget)
         
+        # 将侧边栏和主内容添加到主布局
+        main_h_layout.addWidget(sidebar)
+        main_h_layout.addWidget(main_content)
+        
+        # 状态栏
+        status_bar = self.statusBar()
+        if status_bar:
+            status_bar.showMessage('就绪-MVP')
+            # 缓存命中情况与连接池复用情况
+            self.cache_stats_label = QLabel()
+            status_bar.addPermanentWidget(self.cache_stats_label)
+            self.pool_stats_label = QLabel()
+            status_bar.addPermanentWidget(self.pool_stats_label)
+            # 最近一次查询的耗时分解
+            self.metrics_label = QLabel()
+            status_bar.addPermanentWidget(self.metrics_label)
+            self.request_pool.rendered.connect(self.update_metrics_label)
+            self.update_cache_stats()
+            self.update_pool_stats()
+        
+    def ensure_tab(self, index):
+        """第一次显示某个标签页时创建其中的控件"""
+        entry = self.tab_builders.pop(index, None)
+        if entry is None:
+            return
+        page, builder = entry
+        started = time.perf_counter()
+        builder(QVBoxLayout(page))
+        if self.profiler is not None:
+            self.profiler.note(f"创建标签页 {self.tab_widget.tabText(index)}", started)
+        
+    def build_server_tab(self, layout):
+        """服务器状态查询标签"""
         # 输入区域
         input_group = QGroupBox("服务器信息")
         input_layout = QHBoxLayout(input_group)
@@ -273,17 +624,27 @@ class MinecraftStatusApp(QMainWindow):
         self.check_button = QPushButton("查询状态")
         self.check_button.clicked.connect(self.check_status)
         
+        # 查询方式：uapis.cn、Java直连（Server List Ping）或UDP探测
+        self.status_mode_combo = status_mode_combo()
+        
         input_layout.addWidget(QLabel("服务器地址:"))
         input_layout.addWidget(self.server_input)
+        input_layout.addWidget(self.status_mode_combo)
+        
+        # 重复查询时先显示上次的结果，再在后台刷新
+        self.swr_checkbox = QCheckBox("即时显示上次结果")
+        self.swr_checkbox.setChecked(True)
+        self.swr_checkbox.setToolTip("缓存过期时立即显示上次的结果并标注时间，后台刷新后只在数据变化时更新")
+        input_layout.addWidget(self.swr_checkbox)
         input_layout.addWidget(self.check_button)
         
-        server_tab_layout.addWidget(input_group)
+        layout.addWidget(input_group)
         
         # 进度条
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
         self.progress_bar.setRange(0, 0)  # Indeterminate progress
-        server_tab_layout.addWidget(self.progress_bar)
+        layout.addWidget(self.progress_bar)
         
         # 结果显示区域
         result_group = QGroupBox("服务器状态")
@@ -291,7 +652,6 @@ class MinecraftStatusApp(QMainWindow):
         
         self.result_area = QScrollArea()
         self.result_area.setWidgetResizable(True)
-        self.result_area.setStyleSheet("QScrollArea { border: none; }")
         
         self.result_content = QWidget()
         self.result_content_layout = QVBoxLayout(self.result_content)
@@ -299,14 +659,35 @@ class MinecraftStatusApp(QMainWindow):
         self.result_content_layout.setContentsMargins(10, 10, 10, 10)
         
         self.result_area.setWidget(self.result_content)
-        result_layout.addWidget(self.result_area)
-        
-        server_tab_layout.addWidget(result_group)
         
-        # 玩家信息查询标签
-        player_tab = QWidget()
-        player_tab_layout = QVBoxLayout(player_tab)
+        # 结果视图只创建一次，之后的查询只更新其中的字段
+        self.server_result_view = views.ServerResultView()
+        self.result_content_layout.addWidget(self.server_result_view)
+        self.result_content_layout.addStretch()
+        result_layout.addWidget(self.result_area)
         
+        layout.addWidget(result_group)
+        
+        # 历史记录图表
+        history_group = QGroupBox("历史记录")
+        history_layout = QVBoxLayout(history_group)
+        history_options_layout = QHBoxLayout()
+        self.history_range = QComboBox()
+        for text, seconds in (("最近1小时", 3600), ("最近24小时", 86400), ("最近7天", 7 * 86400),
+                              ("最近30天", 30 * 86400), ("最近90天", 90 * 86400)):
+            self.history_range.addItem(text, seconds)
+        self.history_range.setCurrentIndex(1)
+        self.history_range.currentIndexChanged.connect(self.refresh_history_chart)
+        history_options_layout.addWidget(QLabel("时间范围:"))
+        history_options_layout.addWidget(self.history_range)
+        history_options_layout.addStretch()
+        history_layout.addLayout(history_options_layout)
+        self.history_chart = views.HistoryChart()
+        history_layout.addWidget(self.history_chart)
+        layout.addWidget(history_group)
+        
+    def build_player_tab(self, layout):
+        """玩家信息查询标签"""
         # 玩家信息输入区域
         player_input_group = QGroupBox("玩家信息")
         player_input_layout = QHBoxLayout(player_input_group)
@@ -322,13 +703,13 @@ class MinecraftStatusApp(QMainWindow):
         player_input_layout.addWidget(self.player_input)
         player_input_layout.addWidget(self.player_check_button)
         
-        player_tab_layout.addWidget(player_input_group)
+        layout.addWidget(player_input_group)
         
         # 玩家信息进度条
         self.player_progress_bar = QProgressBar()
         self.player_progress_bar.setVisible(False)
         self.player_progress_bar.setRange(0, 0)  # Indeterminate progress
-        player_tab_layout.addWidget(self.player_progress_bar)
+        layout.addWidget(self.player_progress_bar)
         
         # 玩家信息结果显示区域
         player_result_group = QGroupBox("玩家信息")
@@ -336,7 +717,6 @@ class MinecraftStatusApp(QMainWindow):
         
         self.player_result_area = QScrollArea()
         self.player_result_area.setWidgetResizable(True)
-        self.player_result_area.setStyleSheet("QScrollArea { border: none; }")
         
         self.player_result_content = QWidget()
         self.player_result_content_layout = QVBoxLayout(self.player_result_content)
@@ -344,24 +724,128 @@ class MinecraftStatusApp(QMainWindow):
         self.player_result_content_layout.setContentsMargins(10, 10, 10, 10)
         
         self.player_result_area.setWidget(self.player_result_content)
-        player_result_layout.addWidget(self.player_result_area)
-        
-        player_tab_layout.addWidget(player_result_group)
-        
-        # 添加标签页
-        tab_widget.addTab(server_tab, "服务器状态")
-        tab_widget.addTab(player_tab, "玩家信息")
-        
-        main_layout.addWidget(tab_widget)
         
-        # 将侧边栏和主内容添加到主布局
-        main_h_layout.addWidget(sidebar)
-        main_h_layout.addWidget(main_content)
+        self.player_result_view = views.PlayerResultView()
+        self.player_result_content_layout.addWidget(self.player_result_view)
+        self.player_result_content_layout.addStretch()
+        player_result_layout.addWidget(self.player_result_area)
         
-        # 状态栏
-        status_bar = self.statusBar()
-        if status_bar:
-            status_bar.showMessage('就绪-MVP')
+        layout.addWidget(player_result_group)
+        
+        # 批量查询玩家：结果按完成顺序进入表格，缓存命中的玩家不联网
+        player_batch_group = QGroupBox("批量查询玩家")
+        player_batch_layout = QVBoxLayout(player_batch_group)
+        
+        self.player_batch_input = QPlainTextEdit()
+        self.player_batch_input.setPlaceholderText("每行一个玩家名称或UUID，# 开头为注释")
+        self.player_batch_input.setMaximumHeight(100)
+        player_batch_layout.addWidget(self.player_batch_input)
+        
+        player_batch_options_layout = QHBoxLayout()
+        self.player_batch_concurrency = QSpinBox()
+        self.player_batch_concurrency.setRange(1, 64)
+        self.player_batch_concurrency.setValue(players.DEFAULT_CONCURRENCY)
+        self.player_batch_button = QPushButton("开始批量查询")
+        self.player_batch_button.clicked.connect(self.toggle_player_batch)
+        player_batch_options_layout.addWidget(QLabel("并发数:"))
+        player_batch_options_layout.addWidget(self.player_batch_concurrency)
+        player_batch_options_layout.addStretch()
+        player_batch_options_layout.addWidget(self.player_batch_button)
+        player_batch_layout.addLayout(player_batch_options_layout)
+        
+        self.player_batch_progress_bar = QProgressBar()
+        self.player_batch_progress_bar.setVisible(False)
+        player_batch_layout.addWidget(self.player_batch_progress_bar)
+        
+        self.player_batch_model = views.PlayerListModel(self)
+        self.player_batch_table = QTableView()
+        self.player_batch_table.setModel(self.player_batch_model)
+        self.player_batch_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.player_batch_table.verticalHeader().setDefaultSectionSize(24)
+        self.player_batch_table.setEditTriggers(QTableView.NoEditTriggers)
+        player_batch_layout.addWidget(self.player_batch_table)
+        
+        layout.addWidget(player_batch_group)
+        
+        self.player_batch_buffer = []
+        self.player_batch_flush_timer = QTimer(self)
+        self.player_batch_flush_timer.setInterval(100)
+        self.player_batch_flush_timer.timeout.connect(self.flush_player_batch_results)
+        
+    def build_batch_tab(self, layout):
+        """批量查询标签"""
+        batch_input_group = QGroupBox("服务器列表")
+        batch_input_layout = QVBoxLayout(batch_input_group)
+        
+        self.batch_input = QPlainTextEdit()
+        self.batch_input.setPlaceholderText("每行一个服务器地址，# 开头为注释")
+        self.batch_input.setMaximumHeight(120)
+        batch_input_layout.addWidget(self.batch_input)
+        
+        batch_options_layout = QHBoxLayout()
+        self.batch_concurrency = QSpinBox()
+        self.batch_concurrency.setRange(1, 1000)
+        self.batch_concurrency.setValue(100)
+        self.batch_mode_combo = status_mode_combo()
+        self.batch_button = QPushButton("开始批量查询")
+        self.batch_button.clicked.connect(self.toggle_batch_scan)
+        batch_options_layout.addWidget(QLabel("并发数:"))
+        batch_options_layout.addWidget(self.batch_concurrency)
+        batch_options_layout.addWidget(self.batch_mode_combo)
+        batch_options_layout.addStretch()
+        batch_options_layout.addWidget(self.batch_button)
+        batch_input_layout.addLayout(batch_options_layout)
+        
+        layout.addWidget(batch_input_group)
+        
+        # 批量查询进度条
+        self.batch_progress_bar = QProgressBar()
+        self.batch_progress_bar.setVisible(False)
+        layout.addWidget(self.batch_progress_bar)
+        
+        # 批量查询结果表格
+        self.batch_model = views.ServerListModel(self)
+        self.batch_table = QTableView()
+        self.batch_table.setModel(self.batch_model)
+        self.batch_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.batch_table.verticalHeader().setDefaultSectionSize(24)
+        self.batch_table.setEditTriggers(QTableView.NoEditTriggers)
+        layout.addWidget(self.batch_table)
+        
+    def build_watch_tab(self, layout):
+        """监控标签"""
+        watch_input_group = QGroupBox("监控列表")
+        watch_input_layout = QHBoxLayout(watch_input_group)
+        
+        self.watch_input = QLineEdit()
+        self.watch_input.setPlaceholderText("输入要监控的服务器地址")
+        self.watch_input.returnPressed.connect(self.add_watch_address)
+        watch_add_button = QPushButton("添加")
+        watch_add_button.clicked.connect(self.add_watch_address)
+        watch_remove_button = QPushButton("移除选中")
+        watch_remove_button.clicked.connect(self.remove_watch_addresses)
+        self.watch_mode_combo = status_mode_combo()
+        self.watch_button = QPushButton("开始监控")
+        self.watch_button.clicked.connect(self.toggle_watch)
+        
+        watch_input_layout.addWidget(self.watch_input)
+        watch_input_layout.addWidget(watch_add_button)
+        watch_input_layout.addWidget(watch_remove_button)
+        watch_input_layout.addWidget(self.watch_mode_combo)
+        watch_input_layout.addWidget(self.watch_button)
+        layout.addWidget(watch_input_group)
+        
+        self.watch_model = views.WatchListModel(self)
+        self.watch_table = QTableView()
+        self.watch_table.setModel(self.watch_model)
+        self.watch_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.watch_table.verticalHeader().setDefaultSectionSize(24)
+        self.watch_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.watch_table.setSelectionBehavior(QTableView.SelectRows)
+        layout.addWidget(self.watch_table)
+        
+        for address in scheduler.load_watchlist():
+            self.add_watch_entry(address)
         
     def check_status(self):
         """检查服务器状态"""
@@ -370,6 +854,32 @@ class MinecraftStatusApp(QMainWindow):
         if not server_address:
             QMessageBox.warning(self, "输入错误", "请输入服务器地址")
             return
+        # 中文域名转成punycode、IPv6补上方括号，格式错误的地址不发出请求
+        try:
+            server_address = resolver.normalize(server_address).text
+        except ValueError as e:
+            QMessageBox.warning(self, "输入错误", str(e))
+            return
+            
+        # 新的查询取代仍在进行中的旧查询
+        self.cancel_server_request()
+        self.show_history(server_address)
+            
+        # 缓存中有未过期的结果时直接显示，不发起网络请求；不同查询方式的结果分开缓存
+        mode = self.status_mode_combo.currentData()
+        cached = self.status_cache.get(server_address, mode)
+        self.update_cache_stats()
+        if cached is not None:
+            self.clear_result_area()
+            self.show_cached_status(cached)
+            return
+            
+        # 缓存已过期但有上次的成功结果时，先显示旧结果再后台刷新
+        if self.swr_checkbox.isChecked():
+            entry = self.status_cache.get_entry(server_address, mode)
+            if entry is not None and entry.value.get("success"):
+                self.revalidate_status(server_address, entry, mode)
+                return
             
         # 禁用按钮并显示进度条
         self.check_button.setEnabled(False)
@@ -382,12 +892,72 @@ class MinecraftStatusApp(QMainWindow):
         # 清空之前的结果
         self.clear_result_area()
         
-        # 创建并启动工作线程
-        self.worker = ServerStatusWorker(server_address)
-        self.worker.result_ready.connect(self.display_result)
-        self.worker.error_occurred.connect(self.show_error)
-        self.worker.finished.connect(self.on_worker_finished)
-        self.worker.start()
+        # 提交到后台请求池
+        worker = ServerStatusWorker(server_address, direct=mode)
+        self.server_ticket = self.request_pool.submit(
+            worker,
+            on_result=lambda data: self.on_status_result(server_address, data, mode),
+            on_error=lambda message: self.on_status_error(server_address, message, mode),
+            on_finished=self.on_worker_finished)
+        
+    def cancel_server_request(self):
+        """取消被新查询取代的服务器状态请求"""
+        if self.server_ticket is not None:
+            self.server_ticket.cancel()
+            self.on_worker_finished()
+            
+    def on_status_result(self, server_address, data, mode=False):
+        """缓存并显示查询结果"""
+        self.status_cache.put(server_address, data, mode=mode)
+        self.record_history(server_address, data)
+        self.display_result(data)
+        
+    def on_status_error(self, server_address, message, mode=False):
+        """缓存并显示查询失败"""
+        self.status_cache.put_error(server_address, message, mode)
+        self.show_error(message)
+        
+    def revalidate_status(self, server_address, entry, mode=False):
+        """立即显示缓存中的旧结果，同时在后台重新查询"""
+        self.clear_result_area()
+        self.display_result(entry.value)
+        self.server_result_view.set_note(f"显示的是{format_age(entry.age)}的结果，正在后台刷新...")
+        
+        self.check_button.setEnabled(False)
+        self.check_button.setText("刷新中...")
+        status_bar = self.statusBar()
+        if status_bar:
+            status_bar.showMessage('已显示上次结果，正在刷新...')
+        
+        shown = entry.value
+        worker = ServerStatusWorker(server_address, direct=mode)
+        self.server_ticket = self.request_pool.submit(
+            worker,
+            on_result=lambda data: self.on_status_revalidated(server_address, shown, data, mode),
+            on_error=self.on_revalidate_error,
+            on_finished=self.on_worker_finished)
+        
+    def on_status_revalidated(self, server_address, shown, data, mode=False):
+        """后台刷新完成，只有数据发生变化时才重新渲染"""
+        self.status_cache.put(server_address, data, mode=mode)
+        self.record_history(server_address, data)
+        if comparable_status(shown) != comparable_status(data):
+            self.display_result(data)
+            status_bar = self.statusBar()
+            if status_bar:
+                status_bar.showMessage('查询完成（数据已更新）-MVP')
+        else:
+            self.server_result_view.set_note("已刷新，数据无变化")
+            status_bar = self.statusBar()
+            if status_bar:
+                status_bar.showMessage('查询完成（数据无变化）-MVP')
+                
+    def on_revalidate_error(self, message):
+        """后台刷新失败时保留旧结果"""
+        self.server_result_view.set_note(f"刷新失败（{message}），显示的是缓存结果")
+        status_bar = self.statusBar()
+        if status_bar:
+            status_bar.showMessage('刷新失败，显示的是缓存结果')
         
     def check_player_info(self):
         """检查玩家信息"""
@@ -397,6 +967,9 @@ class MinecraftStatusApp(QMainWindow):
             QMessageBox.warning(self, "输入错误", "请输入玩家名称或UUID")
             return
             
+        # 新的查询取代仍在进行中的旧查询（包括上一个玩家的皮肤下载）
+        self.cancel_player_request()
+            
         # 禁用按钮并显示进度条
         self.player_check_button.setEnabled(False)
         self.player_check_button.setText("查询中...")
@@ -408,30 +981,41 @@ class MinecraftStatusApp(QMainWindow):
         # 清空之前的结果
         self.clear_player_result_area()
         
-        # 创建并启动工作线程
-        self.player_worker = PlayerInfoWorker(player_name)
-        self.player_worker.result_ready.connect(self.display_player_result)
-        self.player_worker.error_occurred.connect(self.show_player_error)
-        self.player_worker.finished.connect(self.on_player_worker_finished)
-        self.player_worker.start()
+        # 名称或UUID在缓存中时直接显示，不发起网络请求
+        cached = self.player_cache.get(player_name)
+        if cached is not None:
+            self.on_player_worker_finished()
+            if cached.get("success"):
+                self.display_player_result(cached)
+            else:
+                self.show_player_error(cached.get("message", "查询失败"))
+            if status_bar:
+                status_bar.showMessage('玩家信息查询完成（缓存结果）')
+            return
+        
+        # 提交到后台请求池
+        self.player_ticket = self.request_pool.submit(
+            PlayerInfoWorker(player_name),
+            on_result=self.on_player_result,
+            on_error=self.show_player_error,
+            on_finished=self.on_player_worker_finished)
+        
+    def cancel_player_request(self):
+        """取消被新查询取代的玩家信息请求和皮肤下载"""
+        if self.skin_ticket is not None:
+            self.skin_ticket.cancel()
+            self.skin_ticket = None
+        if self.player_ticket is not None:
+            self.player_ticket.cancel()
+            self.on_player_worker_finished()
         
     def clear_result_area(self):
         """清空结果区域"""
-        for i in reversed(range(self.result_content_layout.count())):
-            item = self.result_content_layout.itemAt(i)
-            if item and item.widget():
-                widget_item = item.widget()
-                if widget_item:
-                    widget_item.setParent(None)
+        self.server_result_view.clear()
                     
     def clear_player_result_area(self):
         """清空玩家信息结果区域"""
-        for i in reversed(range(self.player_result_content_layout.count())):
-            item = self.player_result_content_layout.itemAt(i)
-            if item and item.widget():
-                widget_item = item.widget()
-                if widget_item:
-                    widget_item.setParent(None)
+        self.player_result_view.clear()
 
                 
     def display_result(self, data):
@@ -446,123 +1030,124 @@ class MinecraftStatusApp(QMainWindow):
             return
             
         result = data.get("data", {})
+        self.last_status_result = dict(data, address=self.server_input.text().strip())
         
-        # 显示基本信息
-        info_frame = QFrame()
-        info_layout = QVBoxLayout(info_frame)
-        
-        # 状态标题
-        status_title = QLabel("服务器信息")
-        status_title_font = QFont()
-        status_title_font.setPointSize(16)
-        status_title_font.setBold(True)
-        status_title.setFont(status_title_font)
-        status_title.setStyleSheet("color: #2c3e50;")
-        info_layout.addWidget(status_title)
-        
-        # 在线状态
-        online_status = result.get("online", False)
-        status_text = "在线" if online_status else "离线"
-        status_color = "#2ecc71" if online_status else "#e74c3c"
-        
-        status_label = QLabel(f"服务器状态: <span style='color: {status_color}; font-weight: bold;'>{status_text}</span>")
-        status_label.setStyleSheet("font-size: 14px;")
-        info_layout.addWidget(status_label)
-        
-        # IP地址和端口
-        ip = result.get("ip", "未知")
-        port = result.get("port", "未知")
-        ip_label = QLabel(f"服务器地址: {ip}:{port}")
-        ip_label.setStyleSheet("font-size: 14px;")
-        info_layout.addWidget(ip_label)
-        
-        # 玩家数
-        players = result.get("players", 0)
-        max_players = result.get("max_players", 0)
-        players_label = QLabel(f"玩家数量: {players} / {max_players}")
-        players_label.setStyleSheet("font-size: 14px;")
-        info_layout.addWidget(players_label)
-        
-        # 版本信息
-        version = result.get("version", "未知")
-        version_label = QLabel(f"游戏版本: {version}")
-        version_label.setStyleSheet("font-size: 14px;")
-        info_layout.addWidget(version_label)
-        
-        self.result_content_layout.addWidget(info_frame)
-        
-        # MOTD信息
-        if online_status:
-            motd_frame = QFrame()
-            motd_layout = QVBoxLayout(motd_frame)
-            
-            motd_title = QLabel("MOTD信息")
-            motd_title.setFont(status_title_font)
-            motd_title.setStyleSheet("color: #2c3e50;")
-            motd_layout.addWidget(motd_title)
-            
-            # 带格式的MOTD
-            motd_html = result.get("motd_html", "无")
-            motd_html_label = QLabel("带格式MOTD:")
-            motd_html_label.setStyleSheet("font-size: 14px;")
-            motd_layout.addWidget(motd_html_label)
-            
-            motd_html_display = QTextEdit()
-            motd_html_display.setHtml(motd_html)
-            motd_html_display.setMaximumHeight(100)
-            motd_html_display.setReadOnly(True)
-            motd_layout.addWidget(motd_html_display)
-            
-            # 纯文本MOTD
-            motd_clean = result.get("motd_clean", "无")
-            motd_clean_label = QLabel("纯文本MOTD:")
-            motd_clean_label.setStyleSheet("font-size: 14px;")
-            motd_layout.addWidget(motd_clean_label)
-            
-            motd_clean_display = QTextEdit()
-            motd_clean_display.setPlainText(motd_clean)
-            motd_clean_display.setMaximumHeight(100)
-            motd_clean_display.setReadOnly(True)
-            motd_layout.addWidget(motd_clean_display)
+        # 接口没有提供渲染好的HTML时在本地渲染原始MOTD
+        if "motd_html" not in result and result.get("motd"):
+            local_html, local_clean = motd.render(result["motd"])
+            result = dict(result, motd_html=local_html, motd_clean=result.get("motd_clean", local_clean))
+        
+        self.server_result_view.set_note("")
+        self.server_result_view.show_result(result)
             
-            self.result_content_layout.addWidget(motd_frame)
+    def show_cached_status(self, data):
+        """显示缓存中的查询结果"""
+        if data.get("success"):
+            self.display_result(data)
+        else:
+            self.show_error(data.get("message", "查询失败-MVP"))
+        status_bar = self.statusBar()
+        if status_bar:
+            status_bar.showMessage('查询完成（缓存结果）-MVP')
             
     def show_error(self, message):
         """显示错误信息"""
         status_bar = self.statusBar()
         if status_bar:
             status_bar.showMessage('查询失败')
-        self.clear_result_area()
-        
-        error_frame = QFrame()
-        error_layout = QVBoxLayout(error_frame)
-        
-        error_title = QLabel("错误")
-        error_title_font = QFont()
-        error_title_font.setPointSize(14)
-        error_title_font.setBold(True)
-        error_title.setFont(error_title_font)
-        error_title.setStyleSheet("color: #e74c3c;")
-        error_layout.addWidget(error_title)
-        
-        error_label = QLabel(message)
-        error_label.setStyleSheet("color: #e74c3c; font-size: 13px;")
-        error_label.setWordWrap(True)
-        error_layout.addWidget(error_label)
-        
-        self.result_content_layout.addWidget(error_frame)
+        self.server_result_view.show_error(message)
         
     def on_worker_finished(self):
-        """工作线程完成时调用"""
+        """后台请求完成时调用"""
+        self.server_ticket = None
         self.check_button.setEnabled(True)
         self.check_button.setText("查询状态")
         self.progress_bar.setVisible(False)
+        self.update_pool_stats()
         
     def on_player_worker_finished(self):
-        """玩家信息工作线程完成时调用"""
+        """玩家信息后台请求完成时调用"""
+        self.player_ticket = None
         self.player_check_button.setEnabled(True)
         self.player_check_button.setText("查询玩家信息")
         self.player_progress_bar.setVisible(False)
+        self.update_pool_stats()
+        
+    def on_player_result(self, data):
+        """缓存并显示玩家信息"""
+        if data.get("success"):
+            self.player_cache.put(data)
+        self.display_player_result(data)
+        
+    def toggle_player_batch(self):
+        """开始或停止批量查询玩家"""
+        if self.player_batch_worker is not None and self.player_batch_worker.isRunning():
+            self.player_batch_worker.stop()
+            self.player_batch_button.setEnabled(False)
+            self.player_batch_button.setText("正在停止...")
+            return
+        
+        queries = players.read_queries(self.player_batch_input.toPlainText().splitlines())
+        if not queries:
+            QMessageBox.warning(self, "输入错误", "请输入至少一个玩家名称或UUID")
+            return
+        
+        self.player_batch_model.clear()
+        self.player_batch_buffer = []
+        self.player_batch_flush_timer.start()
+        self.player_batch_progress_bar.setRange(0, len(queries))
+        self.player_batch_progress_bar.setValue(0)
+        self.player_batch_progress_bar.setVisible(True)
+        self.player_batch_button.setText("停止")
+        status_bar = self.statusBar()
+        if status_bar:
+            status_bar.showMessage(f'正在批量查询 {len(queries)} 个玩家...')
+        
+        self.player_batch_worker = PlayerBatchWorker(queries, self.player_cache,
+                                                     self.player_batch_concurrency.value())
+        self.player_batch_worker.result_ready.connect(self.add_player_batch_result)
+        self.player_batch_worker.error_occurred.connect(
+            lambda message: QMessageBox.warning(self, "批量查询失败", message))
+        self.player_batch_worker.finished.connect(self.on_player_batch_finished)
+        self.player_batch_worker.start()
+        
+    def add_player_batch_result(self, item):
+        """缓冲一条玩家查询结果"""
+        self.player_batch_buffer.append(item)
+        
+    def flush_player_batch_results(self):
+        """把缓冲的玩家结果一次性写入表格模型"""
+        if not self.player_batch_buffer:
+            return
+        items, self.player_batch_buffer = self.player_batch_buffer, []
+        self.player_batch_model.upsert_many(items)
+        self.write_live_export(1, items)
+        self.player_batch_progress_bar.setValue(self.player_batch_progress_bar.value() + len(items))
+        # 这一批结果的头像一起下载、一起渲染
+        skin_urls = sorted({(item.get("data") or {}).get("skin_url") for item in items if item.get("success")}
+                           - {None, "", "无"})
+        if skin_urls:
+            self.request_pool.submit(
+                SkinIconsWorker(skin_urls, self.skin_cache),
+                on_result=lambda icons: self.player_batch_model.set_skin_icons(
+                    {url: QPixmap.fromImage(image) for url, image in icons.items()}),
+                on_error=lambda message: logger.warning("加载皮肤头像失败: %s", message),
+                on_finished=self.update_pool_stats)
+        
+    def on_player_batch_finished(self):
+        """批量查询玩家的线程完成时调用"""
+        self.player_batch_flush_timer.stop()
+        self.flush_player_batch_results()
+        self.player_batch_button.setEnabled(True)
+        self.player_batch_button.setText("开始批量查询")
+        self.player_batch_progress_bar.setVisible(False)
+        self.update_pool_stats()
+        status_bar = self.statusBar()
+        if status_bar:
+            cached = sum(1 for item in self.player_batch_model.items() if item.get("cached"))
+            status_bar.showMessage(f'批量查询完成，共 {self.player_batch_model.rowCount()} 个玩家，'
+                                   f'其中 {cached} 个来自缓存')
+        self.close_live_export(1)
         
     def display_player_result(self, data):
         """显示玩家信息查询结果"""
@@ -576,119 +1161,380 @@ class MinecraftStatusApp(QMainWindow):
             return
             
         result = data.get("data", {})
-        
-        # 显示玩家基本信息
-        info_frame = QFrame()
-        info_layout = QVBoxLayout(info_frame)
-        
-        # 玩家信息标题
-        info_title = QLabel("玩家信息")
-        info_title_font = QFont()
-        info_title_font.setPointSize(16)
-        info_title_font.setBold(True)
-        info_title.setFont(info_title_font)
-        info_title.setStyleSheet("color: #2c3e50;")
-        info_layout.addWidget(info_title)
-        
-        # 状态码
-        code = result.get("code", "未知")
-        code_label = QLabel(f"状态码: {code}")
-        code_label.setStyleSheet("font-size: 14px;")
-        info_layout.addWidget(code_label)
-        
-        # 玩家名称
-        username = result.get("username", "未知")
-        username_label = QLabel(f"玩家名称: {username}")
-        username_label.setStyleSheet("font-size: 14px;")
-        info_layout.addWidget(username_label)
-        
-        # 玩家UUID
-        uuid = result.get("uuid", "未知")
-        uuid_label = QLabel(f"玩家UUID: {uuid}")
-        uuid_label.setStyleSheet("font-size: 14px;")
-        info_layout.addWidget(uuid_label)
-        
-        # 玩家皮肤URL
-        skin_url = result.get("skin_url", "无")
-        skin_title = QLabel("皮肤信息:")
-        skin_title.setStyleSheet("font-size: 14px; font-weight: bold; margin-top: 10px;")
-        info_layout.addWidget(skin_title)
-        
-        skin_url_label = QLabel(f"皮肤URL: {skin_url}")
-        skin_url_label.setStyleSheet("font-size: 12px;")
-        skin_url_label.setWordWrap(True)
-        info_layout.addWidget(skin_url_label)
-        
-        # 如果有皮肤URL，尝试显示皮肤图片
-        if skin_url and skin_url != "无":
-            skin_display_label = QLabel("皮肤预览:")
-            skin_display_label.setStyleSheet("font-size: 14px; font-weight: bold; margin-top: 10px;")
-            info_layout.addWidget(skin_display_label)
-            
-            # 添加皮肤图片显示区域
-            self.skin_label = QLabel()
-            self.skin_label.setStyleSheet("QLabel {background-color: #ecf0f1; border: 1px solid #bdc3c7; padding: 5px; min-height: 128px; min-width: 128px;}")
-            self.skin_label.setAlignment(Qt.AlignCenter)
-            self.skin_label.setText("正在加载皮肤...")
-            info_layout.addWidget(self.skin_label)
-            
-            # 创建网络访问管理器来加载皮肤图片
-            self.network_manager = QNetworkAccessManager()
-            self.network_manager.finished.connect(lambda reply: self.on_skin_image_loaded(reply, self.skin_label))
-            request = QNetworkRequest(QUrl(skin_url))
-            self.network_manager.get(request)
-        
-        self.player_result_content_layout.addWidget(info_frame)
+        self.last_player_result = dict(data, query=self.player_input.text().strip())
+        
+        # 如果有皮肤URL，通过共享连接池在后台下载皮肤图片
+        if self.player_result_view.show_result(result):
+            # 已经解码过的贴图直接显示，不再经过后台线程
+            digest, _ = self.skin_cache.peek(result["skin_url"])
+            image = self.skin_images.get((digest, 128)) if digest else None
+            if image is not None:
+                self.on_skin_image_loaded(image)
+                return
+            self.skin_ticket = self.request_pool.submit(
+                SkinImageWorker(result["skin_url"], self.skin_cache, self.skin_images),
+                on_result=self.on_skin_image_loaded,
+                on_error=lambda message: self.player_result_view.set_skin_text("皮肤加载失败"),
+                on_finished=self.update_pool_stats)
         
     def show_player_error(self, message):
         """显示玩家信息查询错误信息"""
         status_bar = self.statusBar()
         if status_bar:
             status_bar.showMessage('玩家信息查询失败')
-        self.clear_player_result_area()
-        
-        error_frame = QFrame()
-        error_layout = QVBoxLayout(error_frame)
-        
-        error_title = QLabel("错误")
-        error_title_font = QFont()
-        error_title_font.setPointSize(16)
-        error_title_font.setBold(True)
-        error_title.setFont(error_title_font)
-        error_title.setStyleSheet("color: #e74c3c;")
-        error_layout.addWidget(error_title)
+        self.player_result_view.show_error(message)
+        
+    def toggle_batch_scan(self):
+        """开始或停止批量查询"""
+        if self.batch_worker is not None and self.batch_worker.isRunning():
+            self.batch_worker.stop()
+            self.batch_button.setEnabled(False)
+            self.batch_button.setText("正在停止...")
+            return
         
-        error_label = QLabel(message)
-        error_label.setStyleSheet("color: #e74c3c; font-size: 14px;")
-        error_label.setWordWrap(True)
-        error_layout.addWidget(error_label)
+        addresses = resolver.read_addresses(self.batch_input.toPlainText().splitlines())
+        if not addresses:
+            QMessageBox.warning(self, "输入错误", "请输入至少一个服务器地址")
+            return
         
-        self.player_result_content_layout.addWidget(error_frame)
+        self.batch_model.clear()
+        self.batch_buffer = []
+        self.batch_flush_timer.start()
+        self.batch_progress_bar.setRange(0, len(addresses))
+        self.batch_progress_bar.setValue(0)
+        self.batch_progress_bar.setVisible(True)
+        self.batch_button.setText("停止")
+        status_bar = self.statusBar()
+        if status_bar:
+            status_bar.showMessage(f'正在批量查询 {len(addresses)} 个服务器...')
+        
+        self.batch_worker = BatchScanWorker(addresses,
+                                            direct=self.batch_mode_combo.currentData(),
+                                            concurrency=self.batch_concurrency.value())
+        self.batch_worker.result_ready.connect(self.add_batch_result)
+        self.batch_worker.error_occurred.connect(lambda message: QMessageBox.warning(self, "批量查询失败", message))
+        self.batch_worker.finished.connect(self.on_batch_worker_finished)
+        self.batch_worker.start()
+        
+    def add_batch_result(self, item):
+        """缓冲一条批量查询结果"""
+        self.batch_buffer.append(item)
+        
+    def flush_batch_results(self):
+        """把缓冲的结果一次性写入表格模型"""
+        if not self.batch_buffer:
+            return
+        items, self.batch_buffer = self.batch_buffer, []
+        # 批量查询的服务器数量没有上限，只有单个查询和监控列表记录历史
+        self.batch_model.upsert_many(items)
+        self.write_live_export(2, items)
+        self.batch_progress_bar.setValue(self.batch_progress_bar.value() + len(items))
+        
+    def on_batch_worker_finished(self):
+        """批量查询线程完成时调用"""
+        self.batch_flush_timer.stop()
+        self.flush_batch_results()
+        self.batch_button.setEnabled(True)
+        self.batch_button.setText("开始批量查询")
+        self.batch_progress_bar.setVisible(False)
+        self.update_pool_stats()
+        status_bar = self.statusBar()
+        if status_bar:
+            status_bar.showMessage(f'批量查询完成，共 {self.batch_model.rowCount()} 条结果')
+        self.close_live_export(2)
+        
+    def add_watch_entry(self, address):
+        """把地址加入调度器和表格"""
+        key = self.watch_scheduler.add(address)
+        self.watch_model.upsert({"address": key, "success": False, "data": None, "error": "等待查询"})
+        
+    def add_watch_address(self):
+        """添加监控地址"""
+        address = self.watch_input.text().strip()
+        if not address:
+            QMessageBox.warning(self, "输入错误", "请输入服务器地址")
+            return
+        self.add_watch_entry(address)
+        self.watch_input.clear()
+        self.save_watchlist()
+        
+    def remove_watch_addresses(self):
+        """移除表格中选中的监控地址"""
+        rows = sorted({index.row() for index in self.watch_table.selectionModel().selectedRows()}, reverse=True)
+        for row in rows:
+            address = self.watch_model.item(row)["address"]
+            self.watch_scheduler.remove(address)
+            self.watch_model.remove(address)
+        if rows:
+            self.save_watchlist()
+            
+    def save_watchlist(self):
+        try:
+            scheduler.save_watchlist(self.watch_scheduler.addresses())
+        except OSError as e:
+            logger.warning("保存监控列表失败: %s", e)
+        
+    def toggle_watch(self):
+        """开始或停止监控"""
+        if self.watch_timer.isActive():
+            self.watch_timer.stop()
+            self.close_live_export(3)
+            self.watch_button.setText("开始监控")
+            status_bar = self.statusBar()
+            if status_bar:
+                status_bar.showMessage('监控已停止')
+            return
+        if not len(self.watch_scheduler):
+            QMessageBox.warning(self, "输入错误", "监控列表为空")
+            return
+        self.watch_button.setText("停止监控")
+        self.watch_timer.start()
+        self.poll_watchlist()
+        status_bar = self.statusBar()
+        if status_bar:
+            status_bar.showMessage(f'正在监控 {len(self.watch_scheduler)} 个服务器')
+        
+    def poll_watchlist(self):
+        """把到期的服务器交给后台请求池查询"""
+        direct = self.watch_mode_combo.currentData()
+        for address in self.watch_scheduler.due():
+            started = time.perf_counter()
+            self.request_pool.submit(
+                ServerStatusWorker(address, direct=direct),
+                on_result=lambda data, address=address, started=started:
+                    self.on_watch_result(address, started, data, None, direct),
+                on_error=lambda message, address=address, started=started:
+                    self.on_watch_result(address, started, None, message, direct))
+            
+    def on_watch_result(self, address, started, data, error, mode=False):
+        """记录监控结果并调整该服务器的轮询间隔"""
+        item = {"address": address, "success": data is not None, "data": None, "error": error,
+                "elapsed": round((time.perf_counter() - started) * 1000, 1)}
+        if data is not None:
+            item.update(data)
+            self.status_cache.put(address, data, mode=mode)
+            self.record_history(address, data)
+        else:
+            self.status_cache.put_error(address, error, mode)
+        item["interval"] = self.watch_scheduler.record_result(address, item)
+        if item["interval"] is not None:
+            self.watch_model.upsert(item)
+            self.write_live_export(3, [item])
+        
+    def current_view(self):
+        """当前标签页的 (结果类型, 结果列表, 是否仍在产生新结果)"""
+        index = self.tab_widget.currentIndex()
+        if index == 0:
+            return "status", [self.last_status_result] if self.last_status_result else [], False
+        if index == 1:
+            running = self.player_batch_worker is not None and self.player_batch_worker.isRunning()
+            if running or self.player_batch_model.rowCount():
+                return "player", self.player_batch_model.items(), running
+            return "player", [self.last_player_result] if self.last_player_result else [], False
+        if index == 2:
+            running = self.batch_worker is not None and self.batch_worker.isRunning()
+            return "status", self.batch_model.items(), running
+        return "status", self.watch_model.items(), self.watch_timer.isActive()
+        
+    def export_current_view(self):
+        """把当前标签页的结果导出到文件；批量查询或监控仍在运行时，之后的结果继续追加"""
+        kind, items, live = self.current_view()
+        if not items and not live:
+            QMessageBox.information(self, "导出", "当前页面没有可以导出的结果")
+            return
+        path, selected = QFileDialog.getSaveFileName(
+            self, "导出当前视图", "results.csv",
+            "CSV (*.csv);;NDJSON (*.ndjson *.jsonl);;列式 (*.colz)")
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            path += {"CSV": ".csv", "NDJSON": ".ndjson"}.get(selected.split(" ")[0], ".colz")
+        try:
+            with contextlib.ExitStack() as stack:
+                writer = stack.enter_context(export.open_writer(path, kind))
+                writer.write_many(items)
+                if live:
+                    # 写入成功后文件保持打开，之后由 close_live_export 关闭
+                    stack.pop_all()
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "导出失败", str(e))
+            return
+        self.close_live_export()
+        if live:
+            self.live_export = (self.tab_widget.currentIndex(), writer)
+        status_bar = self.statusBar()
+        if status_bar:
+            suffix = "，新的结果会继续写入" if live else ""
+            status_bar.showMessage(f'已导出 {writer.count} 条结果到 {path}{suffix}')
         
-    def on_skin_image_loaded(self, reply, label):
-        """皮肤图片加载完成后的处理"""
-        if reply.error():
-            label.setText("皮肤加载失败") 
+    def write_live_export(self, tab, items):
+        """正在导出该标签页时追加新的结果"""
+        if self.live_export is None or self.live_export[0] != tab:
+            return
+        try:
+            self.live_export[1].write_many(items)
+        except OSError as e:
+            logger.warning("写入导出文件失败: %s", e)
+            self.close_live_export()
+        
+    def close_live_export(self, tab=None):
+        """结束导出；tab 不为None时只结束该标签页的导出"""
+        if self.live_export is None or (tab is not None and self.live_export[0] != tab):
             return
+        _, writer = self.live_export
+        self.live_export = None
+        try:
+            writer.close()
+        except OSError as e:
+            logger.warning("关闭导出文件失败: %s", e)
+        
+    def record_history(self, address, data):
+        """记录一次采样，正在显示该服务器的历史时刷新图表"""
+        self.history.record_result(address, data)
+        if cache.cache_key(address) == self.history_address:
+            self.refresh_history_chart()
             
-        image_data = reply.readAll()
-        pixmap = QPixmap()
-        pixmap.loadFromData(image_data)
-        
-        if not pixmap.isNull():
-            # 缩放图片以适应显示区域
-            pixmap = pixmap.scaled(128, 128, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            label.setPixmap(pixmap)
+    def show_history(self, address):
+        """切换历史图表显示的服务器"""
+        self.history_address = cache.cache_key(address)
+        self.refresh_history_chart()
+        
+    def refresh_history_chart(self):
+        """按选择的时间范围重新查询历史数据"""
+        if self.history_address is None:
+            return
+        end = int(time.time()) + 1
+        start = end - self.history_range.currentData()
+        self.history_chart.set_points(self.history.query(self.history_address, start, end), start, end)
+        
+    def on_skin_image_loaded(self, image):
+        """皮肤图片加载完成后的处理，解码和缩放已经在后台完成"""
+        if not image.isNull():
+            self.player_result_view.set_skin_pixmap(QPixmap.fromImage(image))
         else:
-            label.setText("皮肤加载失败")
+            self.player_result_view.set_skin_text("皮肤加载失败")
             
-        reply.deleteLater()
+    def update_cache_stats(self):
+        """刷新状态栏中的缓存计数"""
+        stats = self.status_cache.stats
+        self.cache_stats_label.setText(f"缓存命中: {stats.hits}  未命中: {stats.misses}  淘汰: {stats.evictions}")
+        
+    def update_pool_stats(self):
+        """刷新状态栏中的连接池计数"""
+        stats = http_pool.shared_pool().stats
+        self.pool_stats_label.setText(f"连接复用: {stats.hits}  新建连接: {stats.misses}")
+        
+    def update_metrics_label(self, kind):
+        """刷新状态栏中的耗时分解，鼠标悬停时显示各类查询的p50/p95"""
+        self.metrics_label.setText(f"{metrics.KIND_NAMES.get(kind, kind)}: {metrics.registry().summary(kind)}")
+        registry = metrics.registry()
+        lines = []
+        for name, title in metrics.KIND_NAMES.items():
+            p50 = registry.quantile(name, "total", 0.5)
+            if p50 is not None:
+                lines.append(f"{title}  p50 {p50:.0f} ms  p95 {registry.quantile(name, 'total', 0.95):.0f} ms")
+        hedging = backends.status_fetcher().as_dict()
+        if hedging["hedges"]:
+            wins = "  ".join(f"{name} {count}" for name, count in hedging["wins"].items())
+            lines.append(f"对冲 {hedging['hedges']} 次  胜出: {wins}")
+        self.metrics_label.setToolTip("\n".join(lines))
+        
+    def closeEvent(self, event):
+        """关闭窗口时停止后台任务"""
+        self.watch_timer.stop()
+        self.request_pool.shutdown()
+        try:
+            self.history.save()
+        except OSError as e:
+            logger.warning("保存历史记录失败: %s", e)
+        if self.batch_worker is not None and self.batch_worker.isRunning():
+            self.batch_worker.stop()
+            self.batch_worker.wait(3000)
+        if self.player_batch_worker is not None and self.player_batch_worker.isRunning():
+            self.player_batch_worker.stop()
+            self.player_batch_worker.wait(3000)
+        self.close_live_export()
+        super().closeEvent(event)
+
+
+class StartupProfiler(QObject):
+    """--profile-startup：记录启动各阶段的耗时，窗口第一次绘制完成后输出并退出"""
+
+    def __init__(self, started):
+        super().__init__()
+        self.started = started
+        self.last = started
+        self.phases = []
+        self.details = []
+        self.painted = False
+
+    def mark(self, name):
+        """记录从上一阶段结束到现在的耗时"""
+        now = time.perf_counter()
+        self.phases.append((name, (now - self.last) * 1000))
+        self.last = now
+
+    def note(self, name, started):
+        """记录某个阶段内部一个步骤的耗时"""
+        self.details.append((name, (time.perf_counter() - started) * 1000))
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and not self.painted:
+            self.painted = True
+            # 等这一轮绘制结束后再计时
+            QTimer.singleShot(0, self.report)
+        return False
+
+    def report(self):
+        self.mark("首次绘制")
+        print("启动耗时:")
+        for name, elapsed in self.phases:
+            print(f"  {name:<16}{elapsed:10.1f} ms")
+        print(f"  {'合计':<16}{(self.last - self.started) * 1000:10.1f} ms")
+        for name, elapsed in self.details:
+            print(f"    其中 {name}: {elapsed:.1f} ms")
+        QApplication.instance().quit()
+
+
+def option_value(name, default):
+    """读取 --name VALUE 形式的命令行参数，只写了 --name 时返回default，没写时返回None"""
+    if name not in sys.argv:
+        return None
+    index = sys.argv.index(name)
+    if index + 1 < len(sys.argv) and not sys.argv[index + 1].startswith("--"):
+        return sys.argv[index + 1]
+    return default
 
 
 def main():
+    profiler = StartupProfiler(_IMPORT_STARTED) if "--profile-startup" in sys.argv else None
+    if profiler is not None:
+        profiler.mark("导入模块")
+    # --debug 输出完整的响应内容；--log-file [PATH] 另外写入滚动的NDJSON日志
+    logs.setup(level="DEBUG" if "--debug" in sys.argv else "INFO",
+               log_file=option_value("--log-file", logs.DEFAULT_LOG_PATH))
+    # --metrics-port [PORT]：在本机开放 /metrics（Prometheus文本格式）和 /metrics.json
+    port = option_value("--metrics-port", metrics.DEFAULT_PORT)
+    if port is not None:
+        metrics.serve(int(port))
+        logger.info("指标端点: http://127.0.0.1:%s/metrics", port)
+    # --backends SPEC：状态查询使用的后端，例如 api,direct,mirror=URL；--no-hedge 只在失败时换下一个
+    spec = option_value("--backends", backends.DEFAULT_SPEC)
+    if spec is not None or "--no-hedge" in sys.argv:
+        try:
+            backends.configure(spec or backends.DEFAULT_SPEC, hedge="--no-hedge" not in sys.argv)
+        except ValueError as e:
+            logger.warning("后端配置无效，使用默认配置: %s", e)
     app = QApplication(sys.argv)
-    window = MinecraftStatusApp()
+    if profiler is not None:
+        profiler.mark("创建QApplication")
+    window = MinecraftStatusApp(profiler)
+    if profiler is not None:
+        profiler.mark("创建界面")
+        window.installEventFilter(profiler)
     window.show()
+    if profiler is not None:
+        profiler.mark("显示窗口")
     sys.exit(app.exec_())
 
 
@@ -0,0 +1,267 @@
+"""查询耗时分解与指标导出
+
+每次查询在 timed(kind) 中进行，连接池、SLP 和 JSON 解析等环节通过 phase(name)
+把各自的耗时记到当前查询上：限流与重试的等待、DNS解析、建立连接、TLS握手、首字节、读取响应体、JSON解析，
+GUI 再补充界面渲染的耗时。结果累积到进程内的直方图，可以导出为 Prometheus 文本格式
+（本地HTTP端点）或JSON。
+
+当前查询保存在 ContextVar 中，后台线程和 asyncio 任务各自独立，互不干扰。
+"""
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+PHASES = ("wait", "dns", "connect", "tls", "ttfb", "body", "json", "render", "total")
+PHASE_NAMES = {
+    "wait": "限流等待",
+    "dns": "DNS",
+    "connect": "连接",
+    "tls": "TLS",
+    "ttfb": "首字节",
+    "body": "下载",
+    "json": "解析",
+    "render": "渲染",
+    "total": "总计",
+}
+KIND_NAMES = {
+    "status": "服务器状态",
+    "status_direct": "直连查询",
+    "status_hedged": "对冲查询",
+    "status_bedrock": "基岩版探测",
+    "status_query": "Query探测",
+    "player": "玩家信息",
+    "skin": "皮肤",
+}
+# 直方图桶的上界（毫秒）
+BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+DEFAULT_PORT = 9464
+
+_current = contextvars.ContextVar("mvpmc_request_timing", default=None)
+
+
+class Histogram:
+    """固定桶的累积直方图"""
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(BUCKETS) and value > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """按桶内线性插值估算分位数"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[index - 1] if index else 0
+                upper = BUCKETS[index] if index < len(BUCKETS) else lower * 2
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return BUCKETS[-1]
+
+    def as_dict(self):
+        cumulative = []
+        total = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {"count": self.count, "sum": round(self.sum, 3), "buckets": cumulative}
+
+
+class RequestTiming:
+    """一次查询各阶段的耗时（毫秒）"""
+    __slots__ = ("kind", "phases", "started")
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.phases = {}
+        self.started = time.perf_counter()
+
+    def add(self, phase, elapsed_ms):
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed_ms
+
+    def total_of(self, phases):
+        return sum(self.phases.get(phase, 0.0) for phase in phases)
+
+
+class MetricsRegistry:
+    """进程内的指标汇总"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._results = {}
+        self._last = {}
+
+    def observe(self, kind, phase, elapsed_ms):
+        """记录一个阶段的耗时；render 这类在查询结束后才发生的阶段也会并入最近一次的分解"""
+        with self._lock:
+            histogram = self._histograms.get((kind, phase))
+            if histogram is None:
+                histogram = self._histograms[(kind, phase)] = Histogram()
+            histogram.observe(elapsed_ms)
+            last = self._last.get(kind)
+            if last is not None and phase not in last:
+                last[phase] = elapsed_ms
+
+    def record(self, timing, ok=True):
+        with self._lock:
+            key = (timing.kind, "ok" if ok else "error")
+            self._results[key] = self._results.get(key, 0) + 1
+            for phase, elapsed in timing.phases.items():
+                histogram = self._histograms.get((timing.kind, phase))
+                if histogram is None:
+                    histogram = self._histograms[(timing.kind, phase)] = Histogram()
+                histogram.observe(elapsed)
+            self._last[timing.kind] = dict(timing.phases)
+
+    def last(self, kind):
+        with self._lock:
+            return dict(self._last.get(kind) or {})
+
+    def quantile(self, kind, phase, q, min_count=1):
+        """样本数少于 min_count 时返回None"""
+        with self._lock:
+            histogram = self._histograms.get((kind, phase))
+            if histogram is None or histogram.count < min_count:
+                return None
+            return histogram.quantile(q)
+
+    def summary(self, kind):
+        """状态栏使用的一行摘要：最近一次的分解和总耗时的p95"""
+        last = self.last(kind)
+        if not last:
+            return ""
+        parts = [f"{PHASE_NAMES[phase]} {last[phase]:.1f}" for phase in PHASES
+                 if phase != "total" and phase in last]
+        text = " / ".join(parts) + " ms"
+        p95 = self.quantile(kind, "total", 0.95)
+        if p95 is not None:
+            text += f"  p95 {p95:.0f} ms"
+        return text
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._results.clear()
+            self._last.clear()
+
+    def as_dict(self):
+        with self._lock:
+            kinds = {}
+            for (kind, phase), histogram in self._histograms.items():
+                kinds.setdefault(kind, {"phases": {}, "results": {}})["phases"][phase] = histogram.as_dict()
+            for (kind, result), count in self._results.items():
+                kinds.setdefault(kind, {"phases": {}, "results": {}})["results"][result] = count
+            return {"unit": "ms", "kinds": kinds}
+
+    def dump_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=2)
+
+    def prometheus_text(self):
+        """Prometheus 文本格式"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            results = sorted(self._results.items())
+        lines = ["# HELP mvpmc_request_phase_milliseconds 每次查询各阶段的耗时",
+                 "# TYPE mvpmc_request_phase_milliseconds histogram"]
+        for (kind, phase), histogram in histograms:
+            labels = f'kind="{kind}",phase="{phase}"'
+            total = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+                total += count
+                lines.append(f'mvpmc_request_phase_milliseconds_bucket{{{labels},le="{bound}"}} {total}')
+            lines.append(f"mvpmc_request_phase_milliseconds_sum{{{labels}}} {histogram.sum:.3f}")
+            lines.append(f"mvpmc_request_phase_milliseconds_count{{{labels}}} {histogram.count}")
+        lines.append("# HELP mvpmc_requests_total 查询次数")
+        lines.append("# TYPE mvpmc_requests_total counter")
+        for (kind, result), count in results:
+            lines.append(f'mvpmc_requests_total{{kind="{kind}",result="{result}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def registry():
+    return _registry
+
+
+def current():
+    """当前正在计时的查询，没有时返回None"""
+    return _current.get()
+
+
+@contextmanager
+def timed(kind):
+    """对一次查询计时，结束时记录到全局指标（异常视为失败）"""
+    timing = RequestTiming(kind)
+    token = _current.set(timing)
+    ok = False
+    try:
+        yield timing
+        ok = True
+    finally:
+        _current.reset(token)
+        timing.phases["total"] = (time.perf_counter() - timing.started) * 1000
+        _registry.record(timing, ok)
+
+
+@contextmanager
+def phase(name):
+    """把代码块的耗时记到当前查询的某个阶段上，没有正在计时的查询时什么也不做"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, (time.perf_counter() - started) * 1000)
+
+
+def serve(port=DEFAULT_PORT, host="127.0.0.1"):
+    """在后台线程启动指标端点（/metrics 与 /metrics.json），返回服务器对象"""
+    # 只有需要导出时才导入http.server，不拖慢命令行的启动
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/metrics.json":
+                body = json.dumps(_registry.as_dict(), ensure_ascii=False).encode("utf-8")
+                content_type = "application/json; charset=utf-8"
+            elif path == "/metrics":
+                body = _registry.prometheus_text().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,249 @@
+"""本地MOTD格式化
+
+把传统的 §/& 颜色与样式代码、十六进制颜色以及JSON聊天组件（含 extra 和 translate）
+转换成 QTextEdit.setHtml 可以显示的HTML，同时给出去掉格式后的纯文本。
+同一个MOTD在轮询之间几乎不会变化，因此渲染结果按原始MOTD做了缓存。
+"""
+import html
+import json
+import re
+from functools import lru_cache
+
+CACHE_SIZE = 4096
+
+# 传统颜色代码与名称对应的颜色值
+COLORS = {
+    "0": "#000000", "1": "#0000aa", "2": "#00aa00", "3": "#00aaaa",
+    "4": "#aa0000", "5": "#aa00aa", "6": "#ffaa00", "7": "#aaaaaa",
+    "8": "#555555", "9": "#5555ff", "a": "#55ff55", "b": "#55ffff",
+    "c": "#ff5555", "d": "#ff55ff", "e": "#ffff55", "f": "#ffffff",
+}
+COLOR_NAMES = {
+    "black": "0", "dark_blue": "1", "dark_green": "2", "dark_aqua": "3",
+    "dark_red": "4", "dark_purple": "5", "gold": "6", "gray": "7",
+    "dark_gray": "8", "blue": "9", "green": "a", "aqua": "b",
+    "red": "c", "light_purple": "d", "yellow": "e", "white": "f",
+}
+# 样式代码与JSON组件中对应的字段
+STYLE_CODES = {"k": "obfuscated", "l": "bold", "m": "strikethrough", "n": "underlined", "o": "italic"}
+STYLE_FIELDS = ("bold", "italic", "underlined", "strikethrough", "obfuscated")
+
+_HEX_DIGITS = set("0123456789abcdefABCDEF")
+_TRANSLATE_ARG_RE = re.compile(r"%(?:(\d+)\$)?s")
+
+
+class Style:
+    """一段文本的颜色和样式，不可变"""
+    __slots__ = ("color",) + STYLE_FIELDS
+
+    def __init__(self, color=None, bold=False, italic=False, underlined=False,
+                 strikethrough=False, obfuscated=False):
+        self.color = color
+        self.bold = bold
+        self.italic = italic
+        self.underlined = underlined
+        self.strikethrough = strikethrough
+        self.obfuscated = obfuscated
+
+    def replace(self, **changes):
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return Style(**values)
+
+    def key(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def css(self):
+        rules = []
+        if self.color:
+            rules.append(f"color: {self.color};")
+        if self.bold:
+            rules.append("font-weight: bold;")
+        if self.italic:
+            rules.append("font-style: italic;")
+        decorations = []
+        if self.underlined:
+            decorations.append("underline")
+        if self.strikethrough:
+            decorations.append("line-through")
+        if decorations:
+            rules.append(f"text-decoration: {' '.join(decorations)};")
+        return " ".join(rules)
+
+
+PLAIN = Style()
+
+
+def _hex_at(text, start, length):
+    """text[start:start+length] 是否全是十六进制数字"""
+    chunk = text[start:start + length]
+    return len(chunk) == length and all(c in _HEX_DIGITS for c in chunk)
+
+
+def tokenize_legacy(text, base=PLAIN):
+    """单遍扫描带格式代码的文本，产出 (文本, Style) 片段"""
+    style = base
+    buffer = []
+    i = 0
+    length = len(text)
+    while i < length:
+        char = text[i]
+        if char in "§&" and i + 1 < length:
+            code = text[i + 1].lower()
+            # &#rrggbb 形式的十六进制颜色
+            if code == "#" and _hex_at(text, i + 2, 6):
+                if buffer:
+                    yield "".join(buffer), style
+                    buffer = []
+                style = base.replace(color="#" + text[i + 2:i + 8].lower())
+                i += 8
+                continue
+            # §x§r§r§g§g§b§b 形式的十六进制颜色
+            if code == "x" and i + 14 <= length and all(
+                    text[j] == char and text[j + 1] in _HEX_DIGITS for j in range(i + 2, i + 14, 2)):
+                if buffer:
+                    yield "".join(buffer), style
+                    buffer = []
+                style = base.replace(color="#" + "".join(text[j + 1] for j in range(i + 2, i + 14, 2)).lower())
+                i += 14
+                continue
+            if code in COLORS or code in STYLE_CODES or code == "r":
+                if buffer:
+                    yield "".join(buffer), style
+                    buffer = []
+                if code in COLORS:
+                    # 颜色代码同时清除之前的样式
+                    style = base.replace(color=COLORS[code])
+                elif code == "r":
+                    style = base
+                else:
+                    style = style.replace(**{STYLE_CODES[code]: True})
+                i += 2
+                continue
+        buffer.append(char)
+        i += 1
+    if buffer:
+        yield "".join(buffer), style
+
+
+def _component_style(component, parent):
+    changes = {}
+    color = component.get("color")
+    if isinstance(color, str):
+        if color.startswith("#") and _hex_at(color, 1, 6):
+            changes["color"] = color.lower()
+        elif color in COLOR_NAMES:
+            changes["color"] = COLORS[COLOR_NAMES[color]]
+        elif color == "reset":
+            changes["color"] = None
+    for field in STYLE_FIELDS:
+        value = component.get(field)
+        if isinstance(value, bool):
+            changes[field] = value
+    return parent.replace(**changes) if changes else parent
+
+
+def _translate(component, style):
+    """translate组件：把 with 中的参数代入 %s / %1$s 占位符"""
+    template = component.get("fallback") or component.get("translate", "")
+    args = component.get("with") or []
+    position = 0
+    last = 0
+    for match in _TRANSLATE_ARG_RE.finditer(template):
+        yield from tokenize_legacy(template[last:match.start()], style)
+        if match.group(1):
+            index = int(match.group(1)) - 1
+        else:
+            index = position
+            position += 1
+        if 0 <= index < len(args):
+            yield from tokenize_component(args[index], style)
+        last = match.end()
+    yield from tokenize_legacy(template[last:], style)
+
+
+def tokenize_component(component, parent=PLAIN):
+    """遍历JSON聊天组件树，产出 (文本, Style) 片段"""
+    if isinstance(component, str):
+        yield from tokenize_legacy(component, parent)
+        return
+    if isinstance(component, list):
+        # 列表中第一个元素是后续元素的父组件
+        if not component:
+            return
+        first, rest = component[0], component[1:]
+        style = _component_style(first, parent) if isinstance(first, dict) else parent
+        yield from tokenize_component(first, parent)
+        for child in rest:
+            yield from tokenize_component(child, style)
+        return
+    if not isinstance(component, dict):
+        if component is not None:
+            yield from tokenize_legacy(str(component), parent)
+        return
+    style = _component_style(component, parent)
+    if "text" in component:
+        yield from tokenize_legacy(str(component["text"]), style)
+    elif "translate" in component:
+        yield from _translate(component, style)
+    for child in component.get("extra") or []:
+        yield from tokenize_component(child, style)
+
+
+def _spans_to_html(spans):
+    parts = []
+    for text, style in spans:
+        escaped = html.escape(text).replace("\n", "<br>")
+        css = style.css()
+        parts.append(f"<span style='{css}'>{escaped}</span>" if css else escaped)
+    return "".join(parts)
+
+
+def _merge(spans):
+    """合并相邻的同样式片段"""
+    merged = []
+    for text, style in spans:
+        if not text:
+            continue
+        if merged and merged[-1][1].key() == style.key():
+            merged[-1] = (merged[-1][0] + text, merged[-1][1])
+        else:
+            merged.append((text, style))
+    return merged
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _render_raw(raw):
+    component = raw
+    if raw[:1] in ("{", "["):
+        try:
+            component = json.loads(raw)
+        except ValueError:
+            pass
+    spans = _merge(tokenize_component(component))
+    return _spans_to_html(spans), "".join(text for text, _ in spans)
+
+
+def render(motd):
+    """返回 (HTML, 纯文本)
+
+    motd 可以是带格式代码的字符串、JSON字符串，或者已经解析好的聊天组件。
+    """
+    if motd is None:
+        return "", ""
+    if not isinstance(motd, str):
+        motd = json.dumps(motd, ensure_ascii=False, sort_keys=True)
+    return _render_raw(motd)
+
+
+def to_html(motd):
+    return render(motd)[0]
+
+
+def to_clean(motd):
+    return render(motd)[1]
+
+
+def cache_info():
+    """渲染缓存的命中统计"""
+    return _render_raw.cache_info()
@@ -0,0 +1,248 @@
+"""批量玩家查询与 玩家名↔UUID 缓存
+
+同一个玩家既可以用名称也可以用UUID（带不带连字符均可）查询，缓存对两种形式都能命中。
+缓存命中时不发起任何网络请求；其余查询以有限的并发数进行，结果按完成顺序逐条返回。
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import cache
+import core
+import logs
+import records
+
+# 玩家改名至少间隔30天，一天内的结果可以放心复用
+DEFAULT_TTL = 24 * 3600
+# 不存在的玩家名只在内存中短暂记住
+DEFAULT_NEGATIVE_TTL = 10 * 60
+DEFAULT_RETENTION = 30 * 24 * 3600
+DEFAULT_CONCURRENCY = 8
+# 表示玩家不存在、可以按 negative_ttl 缓存的状态码（部分接口对不存在的玩家返回204）
+MISSING_STATUSES = (404, 204)
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(cache.DEFAULT_DB_PATH), "players.db")
+
+_UUID_RE = re.compile(r"^[0-9a-f]{32}$")
+logger = logs.get_logger("players")
+
+
+def normalize_uuid(text):
+    """返回去掉连字符的小写UUID，不是UUID时返回None"""
+    value = text.strip().lower().replace("-", "")
+    return value if _UUID_RE.match(value) else None
+
+
+def player_key(query):
+    """规范化查询：UUID统一为32位小写，玩家名统一为小写"""
+    uuid = normalize_uuid(query)
+    return f"uuid:{uuid}" if uuid else f"name:{query.strip().lower()}"
+
+
+def read_queries(lines):
+    """从文本行中读取玩家列表，忽略空行、#注释和指向同一玩家的重复项"""
+    seen = set()
+    queries = []
+    for line in lines:
+        query = line.split("#", 1)[0].strip()
+        if query and player_key(query) not in seen:
+            seen.add(player_key(query))
+            queries.append(query)
+    return queries
+
+
+class PlayerCache:
+    """双向的 玩家名↔UUID 缓存，db_path不为None时启用SQLite持久层
+
+    缓存的值是 core.fetch_player 返回的格式化结果；同一玩家只保存一份，
+    名称索引指向UUID。查询不存在的玩家得到的错误按较短的TTL只保存在内存中。
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL, db_path=None,
+                 retention=DEFAULT_RETENTION):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stats = cache.CacheStats()
+        self._by_uuid = {}
+        self._by_name = {}
+        self._missing = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._open_db(db_path, retention)
+
+    def _open_db(self, db_path, retention):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS players (
+                uuid TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS players_name ON players (name)")
+        self._db.execute("DELETE FROM players WHERE stored_at < ?", (time.time() - retention,))
+        self._db.commit()
+
+    def _load(self, key):
+        column, value = key.split(":", 1)
+        # 同名的旧记录（玩家改名后名称被他人使用）取最新的一条
+        row = self._db.execute(
+            f"SELECT uuid, name, value, stored_at, expires_at FROM players WHERE {column} = ? "
+            "ORDER BY stored_at DESC LIMIT 1", (value,)).fetchone()
+        if row is None:
+            return None
+        entry = cache.CacheEntry(json.loads(row[2]), row[3], row[4])
+        self._remember(row[0], row[1], entry)
+        return entry
+
+    def _remember(self, uuid, name, entry):
+        old = self._by_uuid.get(uuid)
+        if old is not None:
+            old_name = ((old.value.get("data") or {}).get("username") or "").lower()
+            if self._by_name.get(old_name) == uuid:
+                del self._by_name[old_name]
+        self._by_uuid[uuid] = entry
+        self._by_name[name] = uuid
+
+    def _entry(self, key):
+        column, value = key.split(":", 1)
+        uuid = value if column == "uuid" else self._by_name.get(value)
+        entry = self._by_uuid.get(uuid) if uuid else None
+        if entry is None and self._db is not None:
+            entry = self._load(key)
+            if entry is not None:
+                self.stats.disk_hits += 1
+        return entry
+
+    def get(self, query):
+        """返回未过期的缓存结果（包括“玩家不存在”），没有时返回None"""
+        key = player_key(query)
+        now = time.time()
+        with self._lock:
+            missing = self._missing.get(key)
+            if missing is not None:
+                if now < missing[1]:
+                    self.stats.hits += 1
+                    return missing[0]
+                del self._missing[key]
+            entry = self._entry(key)
+            if entry is not None and entry.fresh:
+                self.stats.hits += 1
+                return entry.value
+            if entry is not None:
+                self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+
+    def put(self, value):
+        """写入一条查询成功的结果，玩家名和UUID两个方向都会被索引"""
+        data = value.get("data") or {}
+        uuid = normalize_uuid(str(data.get("uuid", "")))
+        name = str(data.get("username", "")).strip().lower()
+        if not uuid or not name:
+            return
+        now = time.time()
+        entry = cache.CacheEntry(value, now, now + self.ttl)
+        with self._lock:
+            self._remember(uuid, name, entry)
+            self._missing.pop(f"name:{name}", None)
+            self._missing.pop(f"uuid:{uuid}", None)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO players (uuid, name, value, stored_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    (uuid, name, json.dumps(value, ensure_ascii=False, default=records.json_default), entry.stored_at, entry.expires_at))
+                self._db.commit()
+
+    def put_missing(self, query, message):
+        """记住一个不存在的玩家"""
+        with self._lock:
+            self._missing[player_key(query)] = ({"success": False, "message": message},
+                                                time.time() + self.negative_ttl)
+
+    def __len__(self):
+        return len(self._by_uuid)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class PlayerResolver:
+    """批量玩家查询
+
+    concurrency: 同时进行的网络请求数
+    player_cache: PlayerCache，为None时不使用缓存
+    """
+
+    def __init__(self, player_cache=None, concurrency=DEFAULT_CONCURRENCY, timeout=None):
+        self.cache = player_cache
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._cancelled = False
+
+    def cancel(self):
+        """停止派发新的查询，已经在进行的请求会自然结束"""
+        self._cancelled = True
+
+    def _fetch(self, query):
+        started = time.perf_counter()
+        try:
+            data = core.fetch_player(query, self.timeout)
+        except core.FetchError as e:
+            # 只有404说明玩家不存在；被限流（429）、其他4xx、网络错误和5xx都不缓存
+            if self.cache is not None and e.status_code in MISSING_STATUSES:
+                self.cache.put_missing(query, str(e))
+            return self._item(query, None, str(e), started)
+        if self.cache is not None and data.get("success"):
+            self.cache.put(data)
+        return self._item(query, data, None, started)
+
+    @staticmethod
+    def _item(query, data, error, started, cached=False):
+        item = {"query": query, "success": error is None and bool(data and data.get("success")),
+                "data": None, "error": error, "cached": cached,
+                "elapsed": round((time.perf_counter() - started) * 1000, 1)}
+        if data is not None:
+            item.update(data)
+            if not data.get("success"):
+                item["error"] = data.get("message", "查询失败")
+        return item
+
+    def resolve(self, queries):
+        """逐条产出查询结果：缓存命中立即返回，其余按完成顺序返回"""
+        pending = []
+        for query in read_queries(queries):
+            started = time.perf_counter()
+            cached = self.cache.get(query) if self.cache is not None else None
+            if cached is not None:
+                yield self._item(query, cached, None, started, cached=True)
+            else:
+                pending.append(query)
+        if not pending:
+            return
+        logger.info("批量查询玩家: %d 个需要联网", len(pending))
+        executor = ThreadPoolExecutor(max(1, min(self.concurrency, len(pending))))
+        try:
+            futures = [executor.submit(self._run, query) for query in pending]
+            for future in as_completed(futures):
+                item = future.result()
+                if item is not None:
+                    yield item
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, query):
+        if self._cancelled:
+            return None
+        return self._fetch(query)
@@ -0,0 +1,292 @@
+"""上游请求的限流、重试与熔断
+
+同一主机的所有请求共用一个 HostGuard：
+- 令牌桶限制每秒请求数，遇到429时速率减半，之后每次成功再慢慢加回去（AIMD），
+  并按 Retry-After 让所有请求一起暂停，不会在被限流时继续撞墙；
+- 429、5xx 和连接错误按带随机抖动的指数退避重试，有 Retry-After 时以它为准，
+  要求等待的时间超过 max_delay 时不再重试，直接返回响应；
+- 连续失败达到阈值后熔断，冷却期内直接失败，冷却结束后放一个探测请求，成功才恢复。
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import logs
+import metrics
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 0.25
+DEFAULT_MAX_DELAY = 8.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+DEFAULT_MIN_RATE = 0.5
+# 每次成功后恢复的速率（每秒请求数）
+RATE_INCREASE = 0.2
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+logger = logs.get_logger("ratelimit")
+
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多积累 capacity 个"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        # 暂停期间 _updated 位于将来，不补充令牌
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """有足够令牌时扣除并返回True，否则返回False"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """阻塞直到取得令牌"""
+        while not self.try_acquire(tokens):
+            time.sleep(max(0.001, self.wait_time(tokens)))
+
+    def available(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return int(self._tokens)
+
+    def wait_time(self, tokens=1):
+        """距离攒够 tokens 个令牌还需要的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            missing = tokens - self._tokens
+            paused = max(0.0, self._updated - now)
+            return paused if missing <= 0 else paused + missing / self.rate
+
+    def pause(self, seconds):
+        """清空令牌并在 seconds 秒内不再补充"""
+        with self._lock:
+            self._tokens = 0.0
+            self._updated = max(self._updated, time.monotonic() + seconds)
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """速率在 [min_rate, max_rate] 之间按AIMD自动调整的令牌桶"""
+
+    def __init__(self, max_rate, capacity=None, min_rate=DEFAULT_MIN_RATE):
+        super().__init__(max_rate, capacity)
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self._slowed_at = 0.0
+
+    def slow_down(self):
+        """被限流：速率减半；同时到达的多个429只算一次"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._slowed_at < 1.0:
+                return
+            self._slowed_at = now
+            self.rate = max(self.min_rate, self.rate / 2)
+        logger.info("上游限流，请求速率降到每秒 %.1f 个", self.rate)
+
+    def speed_up(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + RATE_INCREASE)
+
+
+class CircuitOpenError(Exception):
+    """熔断期间拒绝请求"""
+
+    def __init__(self, host, retry_in):
+        super().__init__(f"{host} 暂时不可用，{retry_in:.0f} 秒后重试")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """连续失败 failure_threshold 次后熔断 reset_timeout 秒"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, host, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """允许请求时返回，否则抛出 CircuitOpenError；冷却结束后只放行一个探测请求"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            retry_in = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and retry_in <= 0:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(self.host, max(retry_in, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("%s 已恢复", self.host)
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED
+                                                and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                logger.warning("%s 连续失败 %d 次，暂停请求 %.0f 秒", self.host, self.failures, self.reset_timeout)
+
+
+def retry_after_seconds(value):
+    """解析 Retry-After（秒数或HTTP日期），无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class HostGuard:
+    """一个上游主机的限流、重试与熔断
+
+    rate: 每秒请求数上限，为None时不限流
+    """
+
+    def __init__(self, host, rate=None, burst=None, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.host = host
+        self.bucket = AdaptiveTokenBucket(rate, burst) if rate else None
+        self.breaker = CircuitBreaker(host, failure_threshold, reset_timeout)
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self.throttled = 0
+        self.rejected = 0
+
+    def backoff(self, attempt, retry_after=None):
+        """第 attempt 次失败后的等待时间：full jitter 指数退避，Retry-After 优先且不缩短"""
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, send, retry_exceptions=(OSError,)):
+        """发送请求并在需要时重试
+
+        send 返回带 status_code 和 headers 的响应；重试用尽后返回最后一次的响应或抛出最后一次的异常。
+        """
+        for attempt in range(self.max_attempts):
+            last = attempt == self.max_attempts - 1
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self.rejected += 1
+                raise
+            if self.bucket is not None:
+                with metrics.phase("wait"):
+                    self.bucket.acquire()
+            try:
+                response = send()
+            except retry_exceptions as e:
+                self.breaker.record_failure()
+                if last:
+                    raise
+                delay = self.backoff(attempt)
+                logger.info("%s 连接失败（%s），%.2f 秒后重试", self.host, e, delay)
+            except BaseException:
+                # 读取超时等不重试的错误也计入熔断，半开状态的探测请求失败时必须重新熔断
+                self.breaker.record_failure()
+                raise
+            else:
+                status = response.status_code
+                if status not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    if self.bucket is not None:
+                        self.bucket.speed_up()
+                    return response
+                retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                if status == 429:
+                    # 被限流说明上游还活着，不计入熔断
+                    self.throttled += 1
+                    self.breaker.record_success()
+                    if self.bucket is not None:
+                        self.bucket.slow_down()
+                        if retry_after:
+                            self.bucket.pause(retry_after)
+                else:
+                    self.breaker.record_failure()
+                if last:
+                    return response
+                if retry_after is not None and retry_after > self.max_delay:
+                    # 要求等待的时间超过重试愿意等待的上限：不提前重试，直接把响应交给调用方
+                    logger.info("%s 返回 %d，要求 %.0f 秒后重试，放弃本次请求", self.host, status, retry_after)
+                    return response
+                delay = self.backoff(attempt, retry_after)
+                logger.info("%s 返回 %d，%.2f 秒后重试", self.host, status, delay)
+            self.retries += 1
+            with metrics.phase("wait"):
+                time.sleep(delay)
+
+    def as_dict(self):
+        return {
+            "host": self.host,
+            "rate": round(self.bucket.rate, 2) if self.bucket is not None else None,
+            "circuit": self.breaker.state,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+        }
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def guard(host):
+    """返回主机共用的 HostGuard，没有配置过的主机只重试和熔断、不限流"""
+    host_guard = _guards.get(host)
+    if host_guard is None:
+        with _guards_lock:
+            host_guard = _guards.setdefault(host, HostGuard(host))
+    return host_guard
+
+
+def configure(host, **kwargs):
+    """以新的参数替换主机的 HostGuard，参数同 HostGuard"""
+    with _guards_lock:
+        host_guard = _guards[host] = HostGuard(host, **kwargs)
+    return host_guard
+
+
+def stats():
+    with _guards_lock:
+        return [host_guard.as_dict() for host_guard in _guards.values()]
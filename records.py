@@ -0,0 +1,232 @@
+"""服务器状态与玩家信息的结果记录
+
+接口返回的JSON在这里解码一次并检查字段类型，之后以带 __slots__ 的对象传递和保存，
+批量查询几十万条结果时比嵌套的字典省下大部分内存。记录提供与字典相同的读取方式
+（get、[]、in、keys），原来按字典读取结果的代码不需要修改；没有出现在响应中的字段
+与字典一样视为不存在。写入JSON时使用 json_default 或 to_dict。
+
+    status = records.ServerStatus.decode(response.json())
+    status.players, status.get("motd_html", "无")
+"""
+import sys
+
+MAX_PORT = 65535
+
+
+class DecodeError(ValueError):
+    """响应中的字段缺失或类型不对"""
+
+
+def _integer(name, value, minimum=0, maximum=None):
+    """整数字段：接受整数、整数值的浮点数和纯数字字符串"""
+    if isinstance(value, bool):
+        raise DecodeError(f"{name} 应为整数，实际为布尔值")
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, str) and value.strip().lstrip("-").isdecimal():
+        try:
+            value = int(value)
+        except ValueError:
+            raise DecodeError(f"{name} 不是合法的整数: {value!r}")
+    if not isinstance(value, int):
+        raise DecodeError(f"{name} 应为整数，实际为 {type(value).__name__}")
+    if value < minimum or (maximum is not None and value > maximum):
+        raise DecodeError(f"{name} 超出范围: {value}")
+    return value
+
+
+def _number(name, value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise DecodeError(f"{name} 应为数字，实际为 {type(value).__name__}")
+    return value
+
+
+def _text(name, value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if not isinstance(value, str):
+        raise DecodeError(f"{name} 应为字符串，实际为 {type(value).__name__}")
+    return value
+
+
+def _optional(check):
+    return lambda name, value: None if value is None else check(name, value)
+
+
+def _flag(name, value):
+    if not isinstance(value, (bool, int)):
+        raise DecodeError(f"{name} 应为布尔值，实际为 {type(value).__name__}")
+    return bool(value)
+
+
+def _count(name, value):
+    """玩家数：缺失或为null时记为0"""
+    return 0 if value is None else _integer(name, value)
+
+
+def _port(name, value):
+    return None if value is None else _integer(name, value, 0, MAX_PORT)
+
+
+def _interned(name, value):
+    """取值很少的短字符串（例如版本号）共用同一个对象"""
+    value = _optional(_text)(name, value)
+    return sys.intern(value) if value is not None and len(value) <= 64 else value
+
+
+def _raw(name, value):
+    return value
+
+
+def _names(name, value):
+    """字符串列表（玩家名、插件），保存为元组"""
+    if not isinstance(value, (list, tuple)):
+        raise DecodeError(f"{name} 应为列表，实际为 {type(value).__name__}")
+    return tuple(_text(name, item) for item in value)
+
+
+_MISSING = object()
+
+
+class Record:
+    """按 __slots__ 保存字段的结果记录，FIELDS 为 {字段名: 检查函数}"""
+    __slots__ = ("extra",)
+    FIELDS = {}
+    REQUIRED = ()
+
+    def __init__(self, **values):
+        extra = None
+        for name, value in values.items():
+            if name in self.FIELDS:
+                setattr(self, name, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[name] = value
+        self.extra = extra
+
+    @classmethod
+    def decode(cls, data):
+        """从接口返回的JSON对象创建记录，类型不对时抛出 DecodeError；未知字段原样保留在 extra 中"""
+        if isinstance(data, cls):
+            return data
+        if not isinstance(data, dict):
+            raise DecodeError(f"响应应为JSON对象，实际为 {type(data).__name__}")
+        missing = [name for name in cls.REQUIRED if data.get(name) is None]
+        if missing:
+            raise DecodeError(f"响应缺少字段: {', '.join(missing)}")
+        record = cls.__new__(cls)
+        fields = cls.FIELDS
+        extra = None
+        for name, value in data.items():
+            check = fields.get(name)
+            if check is not None:
+                setattr(record, name, check(name, value))
+            else:
+                if extra is None:
+                    extra = {}
+                extra[name] = value
+        record.extra = extra
+        return record
+
+    def get(self, name, default=None):
+        if name in self.FIELDS:
+            return getattr(self, name, default)
+        return default if self.extra is None else self.extra.get(name, default)
+
+    def __getitem__(self, name):
+        value = self.get(name, _MISSING)
+        if value is _MISSING:
+            raise KeyError(name)
+        return value
+
+    def __contains__(self, name):
+        return self.get(name, _MISSING) is not _MISSING
+
+    def keys(self):
+        names = [name for name in self.FIELDS if hasattr(self, name)]
+        if self.extra:
+            names.extend(self.extra)
+        return names
+
+    def items(self):
+        return [(name, self[name]) for name in self.keys()]
+
+    def to_dict(self):
+        """转换成与接口响应相同的字典"""
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    # 记录可以修改，还会和内容相同的字典相等，因此和字典一样不可哈希
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.items())
+        return f"{type(self).__name__}({fields})"
+
+
+class ServerStatus(Record):
+    """uapis.cn serverstatus 接口（或Server List Ping直连）的结果"""
+    FIELDS = {
+        "online": _flag,
+        "ip": _optional(_text),
+        "port": _port,
+        "players": _count,
+        "max_players": _count,
+        "version": _interned,
+        "protocol": _optional(lambda name, value: _integer(name, value, -1)),
+        "motd": _raw,
+        "motd_clean": _optional(_text),
+        "motd_html": _optional(_text),
+        "latency": _optional(_number),
+        # 以下字段只有UDP探测（udp_probe）提供
+        "edition": _interned,
+        "gamemode": _interned,
+        "software": _interned,
+        "map": _optional(_text),
+        "plugins": _optional(_names),
+        "player_list": _optional(_names),
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class PlayerInfo(Record):
+    """uapis.cn userinfo 接口的结果"""
+    FIELDS = {
+        "username": _text,
+        "uuid": _text,
+        "skin_url": _optional(_text),
+    }
+    REQUIRED = ("username", "uuid")
+    __slots__ = tuple(FIELDS)
+
+
+def json_default(value):
+    """json.dumps 的 default 参数：把记录写成普通的JSON对象"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def deep_sizeof(value, _seen=None):
+    """对象及其引用的字典、列表、记录和字符串一共占用的字节数，同一个对象只计一次"""
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(item, seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += deep_sizeof(item, seen)
+    elif isinstance(value, Record):
+        for name in value.FIELDS:
+            size += deep_sizeof(getattr(value, name, None), seen)
+        size += deep_sizeof(value.extra, seen)
+    return size
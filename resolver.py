@@ -0,0 +1,548 @@
+"""服务器地址的规范化与 SRV 解析
+
+直连服务器时，没有写端口的地址先查询 _minecraft._tcp SRV 记录（与游戏客户端一致），
+再把目标主机解析成IP。所有结果缓存在进程内：SRV应答按记录的TTL，不存在的域名按SOA中的
+否定TTL；同一个名字同时只会发出一次查询，其余调用者等待这次的结果，所以
+监控轮询同一批服务器时不会重复做DNS查询。
+
+SRV查询直接通过UDP发给系统配置的DNS服务器（/etc/resolv.conf 或Windows注册表），
+应答被截断时改用TCP；读不到DNS服务器配置时跳过SRV查询。主机名到IP的解析始终交给
+getaddrinfo，这样 hosts 文件、nsswitch 和搜索域都和系统其他程序一致，结果按
+DEFAULT_TTL 缓存。测试时可以用 configure(nameservers=[("127.0.0.1", 5353)])
+指向本地的模拟DNS服务器。
+"""
+import asyncio
+import ipaddress
+import os
+import random
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import logs
+import metrics
+
+DEFAULT_PORT = 25565
+SRV_PREFIX = "_minecraft._tcp."
+DNS_PORT = 53
+DEFAULT_TIMEOUT = 2.0
+# getaddrinfo 的结果没有TTL，按这个时长缓存
+DEFAULT_TTL = 60
+MIN_TTL = 30
+MAX_TTL = 3600
+DEFAULT_NEGATIVE_TTL = 60
+# 所有DNS服务器都没有应答时，短时间内不再重试
+FAILURE_TTL = 5
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_WORKERS = 32
+RESOLV_CONF = "/etc/resolv.conf"
+
+TYPE_A = 1
+TYPE_CNAME = 5
+TYPE_SOA = 6
+TYPE_AAAA = 28
+TYPE_SRV = 33
+# 缓存中 getaddrinfo 结果使用的类型
+TYPE_SYSTEM = 0
+RCODE_NXDOMAIN = 3
+
+logger = logs.get_logger("resolver")
+
+
+class DNSError(OSError):
+    """名字无法解析；继承 OSError，与 getaddrinfo 失败时的处理方式一致"""
+
+
+class ServerAddress:
+    """规范化后的服务器地址：主机名小写、去掉末尾的点、国际化域名转成punycode，IPv6不带方括号"""
+    __slots__ = ("host", "port", "explicit_port")
+
+    def __init__(self, host, port=DEFAULT_PORT, explicit_port=True):
+        self.host = host
+        self.port = port
+        self.explicit_port = explicit_port
+
+    @property
+    def is_ip(self):
+        try:
+            ipaddress.ip_address(self.host)
+        except ValueError:
+            return False
+        return True
+
+    @property
+    def text(self):
+        """用于显示和传给接口的写法，没有写端口时不补全"""
+        host = f"[{self.host}]" if ":" in self.host else self.host
+        return f"{host}:{self.port}" if self.explicit_port else host
+
+    def __eq__(self, other):
+        if not isinstance(other, ServerAddress):
+            return NotImplemented
+        return (self.host, self.port, self.explicit_port) == (other.host, other.port, other.explicit_port)
+
+    def __hash__(self):
+        return hash((self.host, self.port, self.explicit_port))
+
+    def __repr__(self):
+        return f"ServerAddress({self.text!r})"
+
+
+def read_addresses(lines):
+    """从文本行中读取地址列表，忽略空行、#注释和重复地址"""
+    seen = set()
+    addresses = []
+    for line in lines:
+        address = line.split("#", 1)[0].strip()
+        if address and address not in seen:
+            seen.add(address)
+            addresses.append(address)
+    return addresses
+
+
+def normalize(address, default_port=DEFAULT_PORT):
+    """解析 host、host:port、[IPv6]:port 或不带方括号的IPv6地址，格式错误时抛出 ValueError"""
+    if isinstance(address, ServerAddress):
+        return address
+    address = address.strip()
+    if address.startswith("["):
+        host, _, rest = address[1:].partition("]")
+        if rest and not rest.startswith(":"):
+            raise ValueError(f"地址格式错误: {address}")
+        port = rest[1:]
+    elif address.count(":") == 1:
+        host, port = address.split(":")
+    else:
+        host, port = address, ""
+    host = host.strip().rstrip(".").lower()
+    if not host:
+        raise ValueError("地址为空")
+    if ":" in host:
+        try:
+            host = ipaddress.IPv6Address(host).compressed
+        except ValueError:
+            raise ValueError(f"IPv6地址格式错误: {host}")
+    elif not host.isascii():
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            raise ValueError(f"域名格式错误: {host}")
+    if not port:
+        return ServerAddress(host, default_port, False)
+    try:
+        port = int(port)
+    except ValueError:
+        raise ValueError(f"端口格式错误: {port}")
+    if not 0 < port < 65536:
+        raise ValueError(f"端口超出范围: {port}")
+    return ServerAddress(host, port, True)
+
+
+class Endpoint:
+    """解析结果：server 为用户输入的地址，host/port 为实际连接的主机和端口（SRV记录可能改变它们）"""
+    __slots__ = ("server", "host", "port", "addresses")
+
+    def __init__(self, server, host, port, addresses):
+        self.server = server
+        self.host = host
+        self.port = port
+        self.addresses = addresses
+
+    def __repr__(self):
+        return f"Endpoint({self.server.text!r} -> {self.host}:{self.port} {self.addresses})"
+
+
+def encode_name(name):
+    """把域名编码成DNS报文中的标签序列"""
+    labels = [label for label in name.rstrip(".").split(".") if label]
+    out = bytearray()
+    for label in labels:
+        raw = label.encode("ascii")
+        if len(raw) > 63:
+            raise ValueError(f"域名标签过长: {label}")
+        out.append(len(raw))
+        out.extend(raw)
+    out.append(0)
+    return bytes(out)
+
+
+def build_query(name, qtype, query_id):
+    """标准递归查询报文"""
+    return struct.pack(">HHHHHH", query_id, 0x0100, 1, 0, 0, 0) + encode_name(name) + struct.pack(">HH", qtype, 1)
+
+
+def _read_name(message, offset):
+    """读取（可能带压缩指针的）域名，返回 (名字, 名字之后的偏移量)"""
+    labels = []
+    end = None
+    for _ in range(128):
+        if offset >= len(message):
+            raise DNSError("DNS应答不完整")
+        length = message[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(message):
+                raise DNSError("DNS应答不完整")
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | message[offset + 1]
+            continue
+        offset += 1
+        if length == 0:
+            return ".".join(labels).lower(), end if end is not None else offset
+        labels.append(message[offset:offset + length].decode("ascii", "replace"))
+        offset += length
+    raise DNSError("DNS应答中的域名压缩指针成环")
+
+
+def _parse_rdata(message, rtype, offset, length):
+    rdata = message[offset:offset + length]
+    if rtype == TYPE_A and length == 4:
+        return socket.inet_ntop(socket.AF_INET, rdata)
+    if rtype == TYPE_AAAA and length == 16:
+        return socket.inet_ntop(socket.AF_INET6, rdata)
+    if rtype == TYPE_SRV and length >= 7:
+        priority, weight, port = struct.unpack(">HHH", rdata[:6])
+        return priority, weight, port, _read_name(message, offset + 6)[0]
+    if rtype == TYPE_CNAME:
+        return _read_name(message, offset)[0]
+    if rtype == TYPE_SOA:
+        _, position = _read_name(message, offset)
+        _, position = _read_name(message, position)
+        return struct.unpack(">IIIII", message[position:position + 20])[4]
+    return None
+
+
+def parse_response(message, query_id):
+    """解析应答，返回 (rcode, 是否被截断, [(名字, 类型, TTL, 数据), ...], 否定TTL或None)"""
+    if len(message) < 12:
+        raise DNSError("DNS应答不完整")
+    response_id, flags, qdcount, ancount, nscount, _ = struct.unpack(">HHHHHH", message[:12])
+    if response_id != query_id or not flags & 0x8000:
+        raise DNSError("DNS应答与查询不匹配")
+    offset = 12
+    for _ in range(qdcount):
+        offset = _read_name(message, offset)[1] + 4
+    answers = []
+    negative_ttl = None
+    for index in range(ancount + nscount):
+        name, offset = _read_name(message, offset)
+        if offset + 10 > len(message):
+            raise DNSError("DNS应答不完整")
+        rtype, _, ttl, length = struct.unpack(">HHIH", message[offset:offset + 10])
+        offset += 10
+        if offset + length > len(message):
+            raise DNSError("DNS应答不完整")
+        data = _parse_rdata(message, rtype, offset, length)
+        offset += length
+        if index < ancount:
+            answers.append((name, rtype, ttl, data))
+        elif rtype == TYPE_SOA and data is not None:
+            # RFC 2308：否定应答的TTL取SOA记录TTL与minimum字段中较小的一个
+            negative_ttl = min(ttl, data)
+    return flags & 0x000F, bool(flags & 0x0200), answers, negative_ttl
+
+
+def _read_resolv_conf(path=RESOLV_CONF):
+    servers = []
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                parts = line.split("#", 1)[0].split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    servers.append((parts[1].split("%", 1)[0], DNS_PORT))
+    except OSError:
+        pass
+    return servers
+
+
+def _read_windows_nameservers():
+    import winreg
+    servers = []
+    root = r"SYSTEM\CurrentControlSet\Services\Tcpip\Parameters"
+
+    def collect(key):
+        for value_name in ("NameServer", "DhcpNameServer"):
+            try:
+                value = winreg.QueryValueEx(key, value_name)[0]
+            except OSError:
+                continue
+            for server in value.replace(",", " ").split():
+                if (server, DNS_PORT) not in servers:
+                    servers.append((server, DNS_PORT))
+
+    try:
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, root) as key:
+            collect(key)
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, root + r"\Interfaces") as interfaces:
+            for index in range(winreg.QueryInfoKey(interfaces)[0]):
+                with winreg.OpenKey(interfaces, winreg.EnumKey(interfaces, index)) as key:
+                    collect(key)
+    except OSError:
+        pass
+    return servers
+
+
+def system_nameservers():
+    """系统配置的DNS服务器 [(IP, 端口), ...]，读不到时返回空列表"""
+    if os.name == "nt":
+        return _read_windows_nameservers()
+    return _read_resolv_conf()
+
+
+class Resolver:
+    """带缓存的 SRV 与主机名解析器，可以在多个线程和事件循环中共用
+
+    nameservers: 查询SRV记录用的 [(IP, 端口), ...]，为None时读取系统配置，为空列表时不查询SRV
+    """
+
+    def __init__(self, nameservers=None, timeout=DEFAULT_TIMEOUT, min_ttl=MIN_TTL, max_ttl=MAX_TTL,
+                 negative_ttl=DEFAULT_NEGATIVE_TTL, max_entries=DEFAULT_MAX_ENTRIES, max_workers=DEFAULT_WORKERS):
+        self.nameservers = list(system_nameservers() if nameservers is None else nameservers)
+        self.timeout = timeout
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_workers = max_workers
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+        # (名字, 类型) -> (过期时间, 记录列表)，空列表表示否定应答
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+
+    def _clamp(self, ttl):
+        return min(self.max_ttl, max(self.min_ttl, ttl))
+
+    def _cached(self, key):
+        """缓存中未过期的记录，没有时返回None；调用时需持有锁"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[1]
+
+    def _store(self, key, records, ttl):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + ttl, records)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _lookup(self, name, qtype, cached_only=False):
+        """查询一种记录，返回记录列表（可能为空）；cached_only 为True且没有缓存时返回None"""
+        key = (name, qtype)
+        while True:
+            with self._lock:
+                records = self._cached(key)
+                if records is not None:
+                    self.hits += 1
+                    return records
+                if cached_only:
+                    return None
+                waiter = self._inflight.get(key)
+                owner = waiter is None
+                if owner:
+                    waiter = self._inflight[key] = threading.Event()
+                    self.misses += 1
+            if not owner:
+                # 同一个名字正在被别的线程查询，等它写入缓存后再读
+                waiter.wait()
+                continue
+            try:
+                if qtype == TYPE_SYSTEM:
+                    records, ttl = self._query_system(name)
+                else:
+                    records, ttl = self._query(name, qtype)
+                self._store(key, records, ttl)
+                return records
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                waiter.set()
+
+    def _query_system(self, host):
+        try:
+            infos = socket.getaddrinfo(host, None, 0, socket.SOCK_STREAM)
+        except OSError:
+            return [], self.negative_ttl
+        return list(dict.fromkeys(info[4][0] for info in infos)), DEFAULT_TTL
+
+    def _exchange(self, server, message, query_id):
+        """向一个DNS服务器发送查询，应答被截断时改用TCP"""
+        family = socket.AF_INET6 if ":" in server[0] else socket.AF_INET
+        with socket.socket(family, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.sendto(message, server)
+            deadline = time.monotonic() + self.timeout
+            while True:
+                sock.settimeout(max(0.001, deadline - time.monotonic()))
+                reply, source = sock.recvfrom(65535)
+                if source[0] == server[0] and len(reply) >= 2 and struct.unpack(">H", reply[:2])[0] == query_id:
+                    break
+        result = parse_response(reply, query_id)
+        if not result[1]:
+            return result
+        with socket.create_connection(server, self.timeout) as sock:
+            sock.sendall(struct.pack(">H", len(message)) + message)
+            length = struct.unpack(">H", self._recv_exact(sock, 2))[0]
+            return parse_response(self._recv_exact(sock, length), query_id)
+
+    @staticmethod
+    def _recv_exact(sock, length):
+        data = bytearray()
+        while len(data) < length:
+            chunk = sock.recv(length - len(data))
+            if not chunk:
+                raise DNSError("DNS服务器关闭了连接")
+            data.extend(chunk)
+        return bytes(data)
+
+    def _query(self, name, qtype):
+        """向配置的DNS服务器依次查询，返回 (记录列表, 缓存秒数)"""
+        error = None
+        for server in self.nameservers:
+            query_id = random.getrandbits(16)
+            self.queries += 1
+            try:
+                rcode, _, answers, negative_ttl = self._exchange(server, build_query(name, qtype, query_id), query_id)
+            except (OSError, struct.error) as e:
+                error = e
+                continue
+            if rcode not in (0, RCODE_NXDOMAIN):
+                # SERVFAIL、REFUSED 等：换下一个服务器
+                error = DNSError(f"DNS服务器 {server[0]} 返回错误 {rcode}")
+                continue
+            records = [data for _, rtype, _, data in answers if rtype == qtype and data is not None]
+            if not records:
+                return [], self._clamp(self.negative_ttl if negative_ttl is None else negative_ttl)
+            return records, self._clamp(min(ttl for _, rtype, ttl, _ in answers if rtype == qtype))
+        logger.warning("查询 %s 失败: %s", name, error)
+        return [], FAILURE_TTL
+
+    def addresses(self, host, cached_only=False):
+        """主机名解析成IP列表（按系统给出的顺序），无法解析时抛出 DNSError；cached_only 时没有缓存返回None"""
+        try:
+            return [ipaddress.ip_address(host).compressed]
+        except ValueError:
+            pass
+        # A/AAAA 交给系统解析（hosts文件、nsswitch、搜索域等），结果同样缓存
+        records = self._lookup(host, TYPE_SYSTEM, cached_only)
+        if records is None:
+            return None
+        if not records:
+            raise DNSError(f"无法解析地址: {host}")
+        return records
+
+    def srv_target(self, host, cached_only=False):
+        """_minecraft._tcp SRV记录指向的 (主机, 端口)，没有记录时返回 (None, None)；cached_only 时没有缓存返回None"""
+        records = self._lookup(SRV_PREFIX + host, TYPE_SRV, cached_only)
+        if records is None:
+            return None
+        # 目标为 "." 表示明确不提供该服务
+        records = [record for record in records if record[3]]
+        if not records:
+            return None, None
+        # RFC 2782：取优先级最小的一组，按权重随机选择
+        priority = min(record[0] for record in records)
+        candidates = [record for record in records if record[0] == priority]
+        total = sum(record[1] for record in candidates)
+        if total:
+            pick = random.uniform(0, total)
+            for record in candidates:
+                pick -= record[1]
+                if pick <= 0:
+                    break
+        else:
+            record = random.choice(candidates)
+        return record[3], record[2]
+
+    def _resolve(self, server, srv, cached_only=False):
+        host, port = server.host, server.port
+        if srv and not server.explicit_port and self.nameservers and not server.is_ip:
+            target = self.srv_target(host, cached_only)
+            if target is None:
+                return None
+            if target[0] is not None:
+                host, port = target
+        addresses = self.addresses(host, cached_only)
+        if addresses is None:
+            return None
+        return Endpoint(server, host, port, addresses)
+
+    def resolve(self, address, srv=True):
+        """解析服务器地址，返回 Endpoint；地址格式错误时抛出 ValueError，无法解析时抛出 DNSError"""
+        server = normalize(address)
+        with metrics.phase("dns"):
+            return self._resolve(server, srv)
+
+    def _get_executor(self):
+        with self._lock:
+            # fork 出的子进程（多进程扫描）不能继续使用父进程的线程池
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="dns")
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    async def resolve_async(self, address, srv=True):
+        """resolve 的asyncio版本：命中缓存时直接返回，否则在线程池中查询，批量扫描时各地址并发解析"""
+        server = normalize(address)
+        with metrics.phase("dns"):
+            endpoint = self._resolve(server, srv, cached_only=True)
+            if endpoint is not None:
+                return endpoint
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), self._resolve, server, srv)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def as_dict(self):
+        return {
+            "nameservers": [server[0] for server in self.nameservers],
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "queries": self.queries,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def shared_resolver():
+    """进程内共用的解析器，首次调用时读取系统的DNS配置"""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = Resolver()
+    return _resolver
+
+
+def configure(**kwargs):
+    """以新的参数替换共用的解析器，参数同 Resolver"""
+    global _resolver
+    resolver = Resolver(**kwargs)
+    with _resolver_lock:
+        old, _resolver = _resolver, resolver
+    if old is not None:
+        old.close()
+    return resolver
@@ -0,0 +1,273 @@
+"""基于asyncio的批量服务器状态扫描
+
+支持全局并发上限、单主机并发上限和单次请求超时，结果按完成顺序逐条返回。
+既可以在GUI的批量查询标签页中使用，也可以直接在命令行运行：
+
+    python scanner.py servers.txt --direct --concurrency 500
+    python scanner.py bedrock.txt --protocol bedrock --concurrency 2000
+    python scanner.py servers.txt --processes 8 -o results.ndjson --checkpoint scan.ckpt
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+import api
+import core
+import logs
+import metrics
+import ratelimit
+import records
+import resolver
+import slp
+import udp_probe
+from http_pool import DEFAULT_POOL_SIZE
+from resolver import read_addresses
+
+logger = logs.get_logger("scanner")
+
+
+# direct 取这些值时使用的 UDPProber 方法
+UDP_PROBES = {"bedrock": "bedrock", "query": "full_stat"}
+
+
+class BatchScanner:
+    """批量扫描引擎
+
+    concurrency: 全局同时进行的请求数
+    per_host: 同一主机同时进行的请求数（API模式下主机即uapis.cn）
+    timeout: 单个地址的截止时间（秒）
+    direct: 为True或"java"时使用Server List Ping直连，"bedrock"、"query"时使用 udp_probe，
+            否则通过uapis.cn查询
+    """
+
+    def __init__(self, concurrency=100, per_host=8, timeout=10, direct=False, http_workers=DEFAULT_POOL_SIZE):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.direct = direct
+        self.http_workers = http_workers
+        self._host_slots = {}
+        self._cancelled = False
+        self._prober = None
+
+    def cancel(self):
+        """停止派发新的地址，已经在进行的请求会自然结束"""
+        self._cancelled = True
+
+    def _host_key(self, address):
+        if not self.direct:
+            return api.API_HOST
+        try:
+            return resolver.normalize(address).host
+        except ValueError:
+            return address
+
+    def _host_slot(self, key):
+        slot = self._host_slots.get(key)
+        if slot is None:
+            slot = self._host_slots[key] = [asyncio.Semaphore(self.per_host), 0]
+        return slot
+
+    def _fetch_api(self, address):
+        with metrics.timed("status"):
+            return api.fetch_server_status(address, self.timeout)
+
+    async def _fetch(self, address, loop, executor):
+        if self.direct in UDP_PROBES:
+            # UDP探测自己会重发，单次超时不必等满整个截止时间
+            timeout = min(self.timeout, udp_probe.DEFAULT_TIMEOUT)
+            if self._prober is None:
+                # 所有地址共用一个UDP套接字，扫描结束时关闭
+                self._prober = udp_probe.UDPProber()
+            with metrics.timed(f"status_{self.direct}"):
+                probe = getattr(self._prober, UDP_PROBES[self.direct])
+                return api.format_response(await probe(address, timeout))
+        if self.direct:
+            with metrics.timed("status_direct"):
+                return api.format_response(await slp.query_status_async(address, self.timeout))
+        return await loop.run_in_executor(executor, self._fetch_api, address)
+
+    async def scan_one(self, address, loop, executor):
+        """查询单个地址，返回一条扫描结果（不会抛出异常）"""
+        key = self._host_key(address)
+        slot = self._host_slot(key)
+        slot[1] += 1
+        start = time.perf_counter()
+        result = {"address": address, "success": False, "data": None, "error": None}
+        try:
+            async with slot[0]:
+                formatted_data = await asyncio.wait_for(self._fetch(address, loop, executor), self.timeout)
+            result.update(formatted_data)
+        except asyncio.TimeoutError:
+            result["error"] = "请求超时"
+        except (api.APIError, ratelimit.CircuitOpenError) as e:
+            result["error"] = str(e)
+        except requests.exceptions.RequestException as e:
+            result["error"] = f"网络错误: {str(e)}"
+        except records.DecodeError as e:
+            result["error"] = f"响应格式错误: {str(e)}"
+        except ValueError as e:
+            result["error"] = f"地址错误: {str(e)}"
+        except slp.SLPError as e:
+            result["error"] = f"协议错误: {str(e)}"
+        except Exception as e:
+            # 单个服务器的意外错误只记录在这条结果中，不能让工作协程退出
+            logger.warning("查询 %s 时出现意外错误: %r", address, e)
+            result["error"] = f"未知错误: {str(e)}"
+        finally:
+            # 没有等待者的主机信号量及时回收，避免长列表占用内存
+            slot[1] -= 1
+            if slot[1] == 0:
+                self._host_slots.pop(key, None)
+        result["elapsed"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    async def scan(self, addresses):
+        """异步生成器：按完成顺序逐条产出扫描结果"""
+        self._cancelled = False
+        loop = asyncio.get_running_loop()
+        pending = iter(addresses)
+        results = asyncio.Queue()
+        executor = None if self.direct else ThreadPoolExecutor(self.http_workers)
+
+        async def worker():
+            for address in pending:
+                if self._cancelled:
+                    break
+                await results.put(await self.scan_one(address, loop, executor))
+
+        async def finish():
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                # 无论工作协程如何结束都要放入结束标记，否则 scan() 会一直等待
+                await results.put(None)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+        finisher = asyncio.ensure_future(finish())
+        try:
+            while True:
+                result = await results.get()
+                if result is None:
+                    break
+                yield result
+        finally:
+            finisher.cancel()
+            for task in workers:
+                task.cancel()
+            if executor is not None:
+                executor.shutdown(wait=False)
+            if self._prober is not None:
+                self._prober.close()
+                self._prober = None
+
+    async def scan_all(self, addresses, callback):
+        """扫描整个列表，每得到一条结果调用一次 callback，返回结果条数"""
+        count = 0
+        async for result in self.scan(addresses):
+            callback(result)
+            count += 1
+        return count
+
+    async def run_periodic(self, addresses, interval, callback, rounds=None):
+        """按固定间隔重复扫描，rounds为None时一直运行直到 cancel()"""
+        completed = 0
+        while rounds is None or completed < rounds:
+            started = time.monotonic()
+            await self.scan_all(addresses, callback)
+            completed += 1
+            if self._cancelled:
+                break
+            await asyncio.sleep(max(0, interval - (time.monotonic() - started)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量查询Minecraft服务器状态，结果以NDJSON输出")
+    parser.add_argument("file", help="地址列表文件，每行一个地址，- 表示标准输入")
+    parser.add_argument("--direct", action="store_true", help="直连服务器而不经过uapis.cn（同 --protocol java）")
+    parser.add_argument("--protocol", choices=("api", "java", "bedrock", "query"),
+                        help="查询方式：uapis.cn、Server List Ping、基岩版UDP探测或GameSpy4 Query")
+    parser.add_argument("--concurrency", type=int, default=100, help="全局并发数")
+    parser.add_argument("--per-host", type=int, default=8, help="单主机并发数")
+    parser.add_argument("--timeout", type=float, default=10, help="单个地址超时（秒）")
+    parser.add_argument("--interval", type=float, help="按此间隔（秒）重复扫描")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="分片扫描使用的进程数，大于1时按输入顺序输出（适合几十万个地址）")
+    parser.add_argument("--chunk-size", type=int, default=500, help="分片扫描时每个分片的地址数")
+    parser.add_argument("-o", "--output", help="把结果写入文件而不是标准输出")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help="分片扫描的检查点文件，中断后以相同参数重新运行会从断点继续（需要 -o）")
+    parser.add_argument("--export", metavar="PATH",
+                        help="同时把规范化后的结果逐条导出到文件（.ndjson、.csv 或列式 .colz）")
+    parser.add_argument("--export-format", choices=("ndjson", "csv", "columnar"), help="导出格式，默认按扩展名判断")
+    args = parser.parse_args(argv)
+    if args.protocol:
+        args.direct = core.STATUS_MODES[args.protocol]
+    if args.checkpoint and not args.output:
+        parser.error("--checkpoint 需要同时指定 -o/--output")
+    if args.interval and (args.processes > 1 or args.checkpoint):
+        parser.error("--interval 不能与分片扫描同时使用")
+    if args.export and (args.processes > 1 or args.checkpoint):
+        parser.error("--export 不能与分片扫描同时使用，请对 -o 的输出另行转换")
+
+    if args.file == "-":
+        addresses = read_addresses(sys.stdin)
+    else:
+        with open(args.file, encoding="utf-8") as f:
+            addresses = read_addresses(f)
+
+    if args.processes > 1 or args.checkpoint:
+        import shards
+        sharded = shards.ShardedScan(args.processes, args.chunk_size, args.concurrency, args.per_host,
+                                     args.timeout, args.direct)
+        if not args.output:
+            output = sys.stdout.buffer
+        else:
+            # 续扫需要保留已有的输出，由 ShardedScan 按检查点截断
+            output = open(args.output, "a+b" if args.checkpoint else "wb")
+        try:
+            sharded.run(addresses, output, args.checkpoint)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if args.output:
+                output.close()
+        return
+
+    scanner = BatchScanner(args.concurrency, args.per_host, args.timeout, args.direct)
+    output_file = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    exporter = None
+    if args.export:
+        import export
+        exporter = export.open_writer(args.export, "status", args.export_format)
+
+    def output(result):
+        result["time"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(json.dumps(result, ensure_ascii=False, default=records.json_default), file=output_file, flush=True)
+        if exporter is not None:
+            exporter.write(result)
+
+    try:
+        if args.interval:
+            asyncio.run(scanner.run_periodic(addresses, args.interval, output))
+        else:
+            asyncio.run(scanner.scan_all(addresses, output))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if exporter is not None:
+            exporter.close()
+        if args.output:
+            output_file.close()
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    main()
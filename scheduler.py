@@ -0,0 +1,216 @@
+"""监控列表的自适应轮询调度
+
+每个服务器有自己的轮询间隔：
+- 在线且玩家数变化时缩短间隔，变化越频繁查得越勤；
+- 在线且没有变化时逐渐放慢；
+- 离线或查询失败时按指数退避并加入随机抖动，避免大量服务器同时重试。
+所有服务器共享一个全局的每秒请求预算，大列表不会瞬间打满上游接口或目标服务器。
+"""
+import asyncio
+import heapq
+import os
+import random
+import threading
+import time
+
+import cache
+import logs
+import resolver
+from ratelimit import TokenBucket
+
+DEFAULT_BASE_INTERVAL = 60
+DEFAULT_MIN_INTERVAL = 10
+DEFAULT_MAX_INTERVAL = 600
+DEFAULT_OFFLINE_MAX_INTERVAL = 1800
+DEFAULT_RATE = 2.0
+WATCHLIST_PATH = os.path.join(os.path.dirname(cache.DEFAULT_DB_PATH), "watchlist.txt")
+
+logger = logs.get_logger("scheduler")
+
+
+class WatchEntry:
+    """监控列表中的一个服务器，address 是查询时使用的地址，key 是 cache.cache_key"""
+    __slots__ = ("address", "key", "interval", "next_due", "failures", "online", "players",
+                 "in_flight", "polls")
+
+    def __init__(self, address, key, interval, next_due):
+        self.address = address
+        self.key = key
+        self.interval = interval
+        self.next_due = next_due
+        self.failures = 0
+        self.online = None
+        self.players = None
+        self.in_flight = False
+        self.polls = 0
+
+
+class AdaptiveScheduler:
+    """自适应轮询调度器（不依赖Qt，GUI和命令行共用）"""
+
+    def __init__(self, base_interval=DEFAULT_BASE_INTERVAL, min_interval=DEFAULT_MIN_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL, offline_max_interval=DEFAULT_OFFLINE_MAX_INTERVAL,
+                 rate=DEFAULT_RATE, jitter=0.2):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.offline_max_interval = offline_max_interval
+        self.jitter = jitter
+        self.budget = TokenBucket(rate)
+        self._entries = {}
+        # (下次查询时间, 序号, key)，过期的堆元素在弹出时丢弃
+        self._heap = []
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _push(self, entry):
+        self._counter += 1
+        heapq.heappush(self._heap, (entry.next_due, self._counter, entry.key))
+
+    def _jittered(self, interval):
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def add(self, address, now=None):
+        """加入监控列表，新地址会被尽快查询；返回规范化后用于查询的地址"""
+        now = time.monotonic() if now is None else now
+        key = cache.cache_key(address)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                # 保留是否写了端口，没有写端口的域名查询时仍然先查SRV
+                try:
+                    query_address = resolver.normalize(address).text
+                except ValueError:
+                    query_address = address.strip()
+                # 初次加入时把首轮查询分散开
+                entry = WatchEntry(query_address, key, self.base_interval, now + random.uniform(0, 1))
+                self._entries[key] = entry
+                self._push(entry)
+        return entry.address
+
+    def remove(self, address):
+        with self._lock:
+            self._entries.pop(cache.cache_key(address), None)
+
+    def addresses(self):
+        with self._lock:
+            return [entry.address for entry in self._entries.values()]
+
+    def entry(self, address):
+        return self._entries.get(cache.cache_key(address))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def due(self, now=None):
+        """返回现在应当查询的地址，数量受全局请求预算限制"""
+        now = time.monotonic() if now is None else now
+        ready = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                next_due, _, key = self._heap[0]
+                entry = self._entries.get(key)
+                if entry is None or entry.next_due != next_due or entry.in_flight:
+                    # 已移除、已重新排期或仍在查询中的过期元素
+                    heapq.heappop(self._heap)
+                    continue
+                if not self.budget.try_acquire():
+                    break
+                heapq.heappop(self._heap)
+                entry.in_flight = True
+                ready.append(entry.address)
+        return ready
+
+    def next_wakeup(self, now=None):
+        """距离下一个地址到期的秒数（考虑请求预算），列表为空时返回None"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if not self._heap:
+                return None
+            delay = max(0, self._heap[0][0] - now)
+        return max(delay, self.budget.wait_time())
+
+    def record(self, address, online, players=None, now=None):
+        """记录一次查询结果并安排下次查询，online为None表示查询失败；返回新的间隔"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(cache.cache_key(address))
+            if entry is None:
+                return None
+            entry.in_flight = False
+            entry.polls += 1
+            if not online:
+                # 离线或失败：指数退避
+                entry.failures += 1
+                interval = min(self.offline_max_interval, self.base_interval * (2 ** entry.failures))
+            elif entry.failures or entry.online is None:
+                # 首次在线或刚刚恢复
+                entry.failures = 0
+                interval = self.base_interval
+            elif players != entry.players:
+                # 玩家数在变化：加快轮询
+                interval = max(self.min_interval, entry.interval / 2)
+            else:
+                # 稳定：逐渐放慢
+                interval = min(self.max_interval, entry.interval * 1.5)
+            entry.online = bool(online)
+            entry.players = players
+            entry.interval = interval
+            entry.next_due = now + self._jittered(interval)
+            self._push(entry)
+            return interval
+
+    def record_result(self, address, item, now=None):
+        """根据一条扫描结果（scanner产出的格式）记录查询结果"""
+        data = item.get("data") or {}
+        if not item.get("success"):
+            return self.record(address, None, now=now)
+        return self.record(address, data.get("online", False), data.get("players"), now)
+
+    async def run(self, fetch, callback, stop_event=None, max_concurrency=32):
+        """在asyncio中持续轮询
+
+        fetch(address) 是返回扫描结果字典的协程函数，每条结果会交给 callback(item)。
+        """
+        running = set()
+        slots = asyncio.Semaphore(max_concurrency)
+
+        async def poll(address):
+            try:
+                async with slots:
+                    item = await fetch(address)
+            except Exception as e:
+                # 不记录结果的话这个服务器会一直处于查询中，再也不会被轮询
+                logger.warning("轮询 %s 时出现意外错误: %r", address, e)
+                self.record(address, None)
+                return
+            item["interval"] = self.record_result(address, item)
+            callback(item)
+
+        while stop_event is None or not stop_event.is_set():
+            for address in self.due():
+                task = asyncio.ensure_future(poll(address))
+                running.add(task)
+                task.add_done_callback(running.discard)
+            wakeup = self.next_wakeup()
+            await asyncio.sleep(1 if wakeup is None else min(max(wakeup, 0.05), 1))
+        for task in running:
+            task.cancel()
+
+
+def load_watchlist(path=WATCHLIST_PATH):
+    """读取保存的监控列表"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return resolver.read_addresses(f)
+    except OSError:
+        return []
+
+
+def save_watchlist(addresses, path=WATCHLIST_PATH):
+    """保存监控列表，每行一个地址"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(addresses) + "\n")
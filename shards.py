@@ -0,0 +1,199 @@
+"""多进程分片扫描
+
+几十万个地址时，单个解释器里的JSON解码和MOTD处理会占满一个CPU核。这里把去重后的
+地址列表按顺序切成固定大小的分片，交给进程池处理：每个工作进程有自己的事件循环和
+BatchScanner，把一个分片的结果按输入顺序编码成NDJSON行返回。父进程按分片编号
+依次写出，所以输出顺序与输入一致。
+
+指定检查点文件时，每写完一个分片就记录已完成的分片数和输出文件的长度；
+中断后用相同的参数重新运行会截掉输出中不完整的部分，从下一个分片继续。
+
+    python scanner.py servers.txt --processes 8 -o results.ndjson --checkpoint scan.ckpt
+"""
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+from datetime import datetime
+
+import cache
+import logs
+import records
+
+DEFAULT_CHUNK_SIZE = 500
+CHECKPOINT_VERSION = 1
+
+logger = logs.get_logger("shards")
+
+# 工作进程内的状态，由 _init_worker 创建
+_loop = None
+_scanner = None
+
+
+def dedupe(addresses):
+    """按规范化后的地址去重（a.com、A.com. 与 a.com:25565 视为同一个），保留第一次出现的写法"""
+    seen = set()
+    result = []
+    for address in addresses:
+        key = cache.cache_key(address)
+        if key not in seen:
+            seen.add(key)
+            result.append(address)
+    return result
+
+
+def input_digest(addresses, chunk_size, direct):
+    """标识一次扫描的输入，检查点只能用于相同的地址列表和分片方式"""
+    mode = direct if isinstance(direct, str) and direct != "java" else int(bool(direct))
+    digest = hashlib.sha256(f"{chunk_size}:{mode}\n".encode())
+    for address in addresses:
+        digest.update(address.encode("utf-8", "replace") + b"\n")
+    return digest.hexdigest()
+
+
+def _init_worker(concurrency, per_host, timeout, direct, api_rate):
+    global _loop, _scanner
+    import api
+    import scanner
+    # Ctrl+C 由父进程处理：停止派发并保留检查点，工作进程随进程池一起结束
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if api_rate is not None:
+        # 所有进程合起来不超过原来的接口速率
+        api.configure_limits(api_rate)
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+    _scanner = scanner.BatchScanner(concurrency, per_host, timeout, direct)
+
+
+def _scan_chunk(task):
+    """在工作进程中扫描一个分片，返回 (分片编号, [NDJSON行, ...])，行的顺序与输入一致"""
+    index, addresses = task
+    positions = {address: position for position, address in enumerate(addresses)}
+    lines = [None] * len(addresses)
+
+    def collect(result):
+        result["time"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        lines[positions[result["address"]]] = json.dumps(result, ensure_ascii=False, default=records.json_default)
+
+    _loop.run_until_complete(_scanner.scan_all(addresses, collect))
+    return index, [line for line in lines if line is not None]
+
+
+class Checkpoint:
+    """扫描进度：已完成的分片数和此时输出文件的字节数"""
+
+    def __init__(self, path, digest):
+        self.path = path
+        self.digest = digest
+        self.chunks_done = 0
+        self.output_bytes = 0
+
+    def load(self):
+        """读取与当前输入匹配的检查点，返回是否可以续扫"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != CHECKPOINT_VERSION or data.get("input") != self.digest:
+            logger.warning("检查点与当前输入不一致，从头开始扫描")
+            return False
+        self.chunks_done = int(data["chunks_done"])
+        self.output_bytes = int(data["output_bytes"])
+        return True
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CHECKPOINT_VERSION, "input": self.digest,
+                       "chunks_done": self.chunks_done, "output_bytes": self.output_bytes}, f)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class ShardedScan:
+    """多进程分片扫描
+
+    processes: 工作进程数
+    chunk_size: 每个分片的地址数，越小检查点越细，进程间通信也越频繁
+    其余参数传给每个进程中的 BatchScanner
+    """
+
+    def __init__(self, processes=None, chunk_size=DEFAULT_CHUNK_SIZE, concurrency=100, per_host=8,
+                 timeout=10, direct=False):
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.direct = direct
+
+    def _api_rate(self):
+        """每个进程分到的接口速率，所有进程合起来不超过当前的设置"""
+        if self.direct:
+            return None
+        import api
+        import ratelimit
+        bucket = ratelimit.guard(api.API_HOST).bucket
+        return bucket.max_rate / self.processes if bucket is not None else 0
+
+    def run(self, addresses, output, checkpoint_path=None):
+        """扫描并把NDJSON写入 output（二进制文件对象），返回本次写出的结果条数
+
+        使用检查点时 output 必须是可以截断的普通文件。
+        """
+        addresses = dedupe(addresses)
+        chunks = [addresses[i:i + self.chunk_size] for i in range(0, len(addresses), self.chunk_size)]
+        checkpoint = None
+        first = 0
+        if checkpoint_path:
+            checkpoint = Checkpoint(checkpoint_path, input_digest(addresses, self.chunk_size, self.direct))
+            if checkpoint.load():
+                first = checkpoint.chunks_done
+                output.seek(checkpoint.output_bytes)
+                output.truncate()
+                logger.info("从第 %d/%d 个分片继续扫描", first, len(chunks))
+            else:
+                output.seek(0)
+                output.truncate()
+        if first >= len(chunks):
+            if checkpoint is not None:
+                checkpoint.remove()
+            return 0
+
+        written = 0
+        ready = {}
+        next_index = first
+        tasks = ((index, chunks[index]) for index in range(first, len(chunks)))
+        pool = multiprocessing.Pool(
+            self.processes, _init_worker,
+            (self.concurrency, self.per_host, self.timeout, self.direct, self._api_rate()))
+        try:
+            for index, lines in pool.imap_unordered(_scan_chunk, tasks):
+                ready[index] = lines
+                # 先完成的后续分片暂存，等前面的分片到齐后按顺序写出
+                while next_index in ready:
+                    chunk_lines = ready.pop(next_index)
+                    if chunk_lines:
+                        output.write(("\n".join(chunk_lines) + "\n").encode("utf-8"))
+                    output.flush()
+                    written += len(chunk_lines)
+                    next_index += 1
+                    if checkpoint is not None:
+                        checkpoint.chunks_done = next_index
+                        checkpoint.output_bytes = output.tell()
+                        checkpoint.save()
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+        if checkpoint is not None:
+            checkpoint.remove()
+        return written
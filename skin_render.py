@@ -0,0 +1,190 @@
+"""皮肤预览渲染
+
+从皮肤贴图中取出头部正面、外层（帽子、外套、袖子、裤腿）和身体各部分的正面，
+拼成头像和平面的全身正面图，再按最近邻放大。全部用 NumPy 的切片完成，
+一批贴图叠成 (N, 高, 宽, 4) 的数组一次处理，列表视图可以一次渲染很多玩家。
+
+贴图为 RGBA 的 uint8 数组，支持 64×64 和旧版 64×32 两种尺寸，以及 classic（4像素宽手臂）
+和 slim（3像素宽手臂）两种模型。渲染结果按贴图哈希记忆。
+"""
+import numpy as np
+
+import skins
+
+BODY_SHAPE = (32, 16)
+DEFAULT_HEAD_SCALE = 8
+DEFAULT_BODY_SCALE = 4
+DEFAULT_MEMORY_ENTRIES = 256
+
+# 各部分正面在贴图中的位置 (y, x, 高, 宽)，手臂宽度按模型另算
+HEAD = (8, 8, 8, 8)
+HAT = (8, 40, 8, 8)
+BODY = (20, 20, 12, 8)
+JACKET = (36, 20, 12, 8)
+RIGHT_ARM = (20, 44, 12, 4)
+RIGHT_SLEEVE = (36, 44, 12, 4)
+LEFT_ARM = (52, 36, 12, 4)
+LEFT_SLEEVE = (52, 52, 12, 4)
+RIGHT_LEG = (20, 4, 12, 4)
+RIGHT_PANTS = (36, 4, 12, 4)
+LEFT_LEG = (52, 20, 12, 4)
+LEFT_PANTS = (52, 4, 12, 4)
+
+# 旧版贴图没有左手左脚，按游戏的做法把右边的各个面水平翻转后复制过去：(x, y, 宽, 高, dx, dy)
+_LEGACY_COPIES = (
+    (4, 16, 4, 4, 16, 32), (8, 16, 4, 4, 16, 32),
+    (0, 20, 4, 12, 24, 32), (4, 20, 4, 12, 16, 32), (8, 20, 4, 12, 8, 32), (12, 20, 4, 12, 16, 32),
+    (44, 16, 4, 4, -8, 32), (48, 16, 4, 4, -8, 32),
+    (40, 20, 4, 12, 0, 32), (44, 20, 4, 12, -8, 32), (48, 20, 4, 12, -16, 32), (52, 20, 4, 12, -8, 32),
+)
+# 底层各部分不透明：(x0, y0, x1, y1)
+_OPAQUE_REGIONS = ((0, 0, 32, 16), (0, 16, 64, 32), (16, 48, 48, 64))
+
+
+def _part(textures, rect, width=None):
+    y, x, h, w = rect
+    return textures[:, y:y + h, x:x + (width or w)]
+
+
+def _over(base, overlay):
+    """把外层按透明度叠加到底层上（两者形状相同）"""
+    alpha = overlay[..., 3:4].astype(np.uint16)
+    rgb = (overlay[..., :3] * alpha + base[..., :3] * (255 - alpha) + 127) // 255
+    out_alpha = alpha + (base[..., 3:4] * (255 - alpha) + 127) // 255
+    return np.concatenate((rgb, out_alpha), axis=-1).astype(np.uint8)
+
+
+def from_rgba_bytes(data, width, height, stride=None):
+    """把按行存放的RGBA字节（例如 QImage 的像素数据）转换成 (高, 宽, 4) 数组"""
+    rows = np.frombuffer(data, np.uint8).reshape(height, stride or width * 4)
+    return rows[:, :width * 4].reshape(height, width, 4)
+
+
+def upscale(images, scale):
+    """最近邻放大，images 的形状为 (..., 高, 宽, 4)"""
+    if scale == 1:
+        return images
+    return images.repeat(scale, axis=-3).repeat(scale, axis=-2)
+
+
+def detect_slim(texture):
+    """按右臂背面多出的一列是否完全透明判断是否为 slim 模型；旧版贴图总是 classic"""
+    if texture.shape[0] != 64:
+        return False
+    return not texture[20:32, 54:56, 3].any()
+
+
+def normalize(texture):
+    """把一张贴图转换成 64×64 格式，并按游戏的规则处理透明度，返回新数组"""
+    if texture.ndim != 3 or texture.shape[1] != 64 or texture.shape[0] not in (32, 64) or texture.shape[2] != 4:
+        raise ValueError(f"不支持的皮肤尺寸: {texture.shape}")
+    legacy = texture.shape[0] == 32
+    if legacy:
+        result = np.zeros((64, 64, 4), np.uint8)
+        result[:32] = texture
+        for x, y, w, h, dx, dy in _LEGACY_COPIES:
+            result[y + dy:y + dy + h, x + dx:x + dx + w] = result[y:y + h, x:x + w][:, ::-1]
+        # 旧版皮肤常把整个帽子区域涂成不透明的颜色，这种情况游戏会忽略帽子
+        hat = result[0:16, 32:64, 3]
+        if (hat >= 128).all():
+            result[0:16, 32:64] = 0
+    else:
+        result = texture.copy()
+    for x0, y0, x1, y1 in _OPAQUE_REGIONS:
+        result[y0:y1, x0:x1, 3] = 255
+    return result
+
+
+def render_heads(textures):
+    """textures: (N, 64, 64, 4)，返回加上帽子层的头像 (N, 8, 8, 4)"""
+    return _over(_part(textures, HEAD), _part(textures, HAT))
+
+
+def render_bodies(textures, slim):
+    """textures: (N, 64, 64, 4)，slim: (N,) 布尔数组，返回平面的全身正面图 (N, 32, 16, 4)
+
+    玩家的右手在图中位于左侧。slim 模型的手臂靠近身体对齐，外侧留空一列。
+    """
+    count = textures.shape[0]
+    canvas = np.zeros((count,) + BODY_SHAPE + (4,), np.uint8)
+    canvas[:, 0:8, 4:12] = render_heads(textures)
+    canvas[:, 8:20, 4:12] = _over(_part(textures, BODY), _part(textures, JACKET))
+    canvas[:, 20:32, 4:8] = _over(_part(textures, RIGHT_LEG), _part(textures, RIGHT_PANTS))
+    canvas[:, 20:32, 8:12] = _over(_part(textures, LEFT_LEG), _part(textures, LEFT_PANTS))
+    for selected, width in ((~slim, 4), (slim, 3)):
+        if not selected.any():
+            continue
+        group = textures[selected]
+        right = _over(_part(group, RIGHT_ARM, width), _part(group, RIGHT_SLEEVE, width))
+        left = _over(_part(group, LEFT_ARM, width), _part(group, LEFT_SLEEVE, width))
+        arms = np.zeros((group.shape[0], 12, 8, 4), np.uint8)
+        arms[:, :, 4 - width:4] = right
+        arms[:, :, 4:4 + width] = left
+        canvas[selected, 8:20, 0:4] = arms[:, :, 0:4]
+        canvas[selected, 8:20, 12:16] = arms[:, :, 4:8]
+    return canvas
+
+
+class SkinRenderer:
+    """带记忆的批量渲染器，结果按贴图哈希和放大倍数索引，可以跨线程共用"""
+
+    def __init__(self, head_scale=DEFAULT_HEAD_SCALE, body_scale=DEFAULT_BODY_SCALE,
+                 max_entries=DEFAULT_MEMORY_ENTRIES):
+        self.head_scale = head_scale
+        self.body_scale = body_scale
+        self._results = skins.LRU(max_entries)
+
+    def render(self, key, texture, slim=None):
+        """渲染一张贴图，返回 (头像, 全身图)"""
+        return self.render_batch([(key, texture, slim)])[0]
+
+    def render_batch(self, items):
+        """items: [(贴图哈希, RGBA数组, slim或None), ...]，按相同顺序返回 [(头像, 全身图), ...]
+
+        slim 为None时根据贴图自动判断。记忆中已有的直接返回，其余叠成一个数组一次渲染。
+        """
+        results = [None] * len(items)
+        pending = {}
+        for index, (key, texture, slim) in enumerate(items):
+            memo_key = (key, slim, self.head_scale, self.body_scale)
+            cached = self._results.get(memo_key)
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.setdefault(memo_key, (texture, slim, []))[2].append(index)
+        if pending:
+            textures = np.stack([normalize(texture) for texture, _, _ in pending.values()])
+            slim_flags = np.array([detect_slim(texture) if slim is None else slim
+                                   for texture, slim, _ in pending.values()], dtype=bool)
+            heads = upscale(render_heads(textures), self.head_scale)
+            bodies = upscale(render_bodies(textures, slim_flags), self.body_scale)
+            for offset, (memo_key, (_, _, indexes)) in enumerate(pending.items()):
+                rendered = (heads[offset].copy(), bodies[offset].copy())
+                self._results.put(memo_key, rendered)
+                for index in indexes:
+                    results[index] = rendered
+        return results
+
+
+_renderers = {}
+
+
+def shared_renderer(head_scale=DEFAULT_HEAD_SCALE, body_scale=DEFAULT_BODY_SCALE):
+    """按放大倍数共用的渲染器"""
+    renderer = _renderers.get((head_scale, body_scale))
+    if renderer is None:
+        renderer = _renderers.setdefault((head_scale, body_scale), SkinRenderer(head_scale, body_scale))
+    return renderer
+
+
+def side_by_side(images, gap=8):
+    """把几张图底部对齐横向拼接，空白处透明"""
+    height = max(image.shape[0] for image in images)
+    width = sum(image.shape[1] for image in images) + gap * (len(images) - 1)
+    sheet = np.zeros((height, width, 4), np.uint8)
+    x = 0
+    for image in images:
+        h, w = image.shape[:2]
+        sheet[height - h:height, x:x + w] = image
+        x += w + gap
+    return sheet
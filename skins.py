@@ -0,0 +1,207 @@
+"""皮肤贴图缓存
+
+两层缓存：内存中按LRU保存最近用到的贴图，磁盘上按内容的SHA-256保存文件（相同的贴图只存一份）。
+索引记录 URL → (内容哈希, ETag, Last-Modified, 上次确认时间)。
+
+textures.minecraft.net 的贴图URL末尾就是贴图哈希，内容不会变化，命中后无需再验证；
+其他URL超过 revalidate_after 秒后发起条件请求，服务器返回304时只更新确认时间。
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import cache
+import core
+import logs
+
+DEFAULT_MEMORY_ENTRIES = 64
+DEFAULT_REVALIDATE_AFTER = 3600
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(cache.DEFAULT_DB_PATH), "skins")
+
+_TEXTURE_URL_RE = re.compile(r"/texture/([0-9a-fA-F]{32,})/?$")
+logger = logs.get_logger("skins")
+
+
+def texture_hash(url):
+    """从贴图URL中取出贴图哈希，不是这种URL时返回None"""
+    match = _TEXTURE_URL_RE.search(url.split("?", 1)[0])
+    return match.group(1).lower() if match else None
+
+
+class LRU:
+    """线程安全的定长LRU映射"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class SkinEntry:
+    """索引中的一条记录"""
+    __slots__ = ("digest", "etag", "last_modified", "checked_at")
+
+    def __init__(self, digest, etag, last_modified, checked_at):
+        self.digest = digest
+        self.etag = etag
+        self.last_modified = last_modified
+        self.checked_at = checked_at
+
+
+class SkinCache:
+    """皮肤贴图缓存，cache_dir为None时只使用内存"""
+
+    def __init__(self, cache_dir=None, memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 revalidate_after=DEFAULT_REVALIDATE_AFTER):
+        self.cache_dir = cache_dir
+        self.revalidate_after = revalidate_after
+        self.stats = cache.CacheStats()
+        self.revalidations = 0
+        self.not_modified = 0
+        self._memory = LRU(memory_entries)
+        self._index = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(cache_dir, "index.db"), check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS skins (
+                    url TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    checked_at REAL NOT NULL
+                )
+            """)
+            self._db.commit()
+
+    def _blob_path(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], digest + ".png")
+
+    def _entry(self, url):
+        with self._lock:
+            entry = self._index.get(url)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT digest, etag, last_modified, checked_at FROM skins WHERE url = ?", (url,)).fetchone()
+                if row is not None:
+                    entry = self._index[url] = SkinEntry(*row)
+            return entry
+
+    def _save_entry(self, url, entry):
+        with self._lock:
+            self._index[url] = entry
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO skins (url, digest, etag, last_modified, checked_at) VALUES (?, ?, ?, ?, ?)",
+                    (url, entry.digest, entry.etag, entry.last_modified, entry.checked_at))
+                self._db.commit()
+
+    def _content(self, digest):
+        """按内容哈希读取贴图：先查内存，再查磁盘"""
+        content = self._memory.get(digest)
+        if content is not None or self.cache_dir is None:
+            return content
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+        if hashlib.sha256(content).hexdigest() != digest:
+            # 文件损坏，当作没有缓存
+            return None
+        self.stats.disk_hits += 1
+        self._memory.put(digest, content)
+        return content
+
+    def _store(self, content):
+        digest = hashlib.sha256(content).hexdigest()
+        self._memory.put(digest, content)
+        if self.cache_dir is not None:
+            path = self._blob_path(digest)
+            if not os.path.exists(path):
+                try:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                    with open(tmp_path, "wb") as f:
+                        f.write(content)
+                    os.replace(tmp_path, path)
+                except OSError as e:
+                    logger.warning("保存皮肤缓存失败: %s", e)
+        return digest
+
+    def _fresh(self, url, entry):
+        return texture_hash(url) is not None or time.time() - entry.checked_at < self.revalidate_after
+
+    def peek(self, url):
+        """不联网时能直接使用的贴图，返回 (内容哈希, 内容)，没有时返回 (None, None)"""
+        entry = self._entry(url)
+        if entry is None or not self._fresh(url, entry):
+            return None, None
+        content = self._content(entry.digest)
+        return (entry.digest, content) if content is not None else (None, None)
+
+    def fetch(self, url, timeout=None):
+        """返回 (内容哈希, 贴图内容)，必要时下载或条件验证；失败时抛出 core.FetchError
+
+        验证失败但有旧贴图时返回旧贴图。
+        """
+        entry = self._entry(url)
+        content = self._content(entry.digest) if entry is not None else None
+        if content is not None and self._fresh(url, entry):
+            self.stats.hits += 1
+            return entry.digest, content
+        if content is None:
+            self.stats.misses += 1
+            new_content, etag, last_modified = core.revalidate_skin(url, timeout=timeout)
+        else:
+            self.revalidations += 1
+            try:
+                new_content, etag, last_modified = core.revalidate_skin(
+                    url, entry.etag, entry.last_modified, timeout)
+            except core.FetchError as e:
+                logger.warning("皮肤验证失败，使用缓存: %s", e)
+                return entry.digest, content
+        if new_content is None:
+            if content is None:
+                # 没有发送验证信息却得到304，只能重新完整下载
+                new_content, etag, last_modified = core.revalidate_skin(url, timeout=timeout)
+            else:
+                self.not_modified += 1
+                self._save_entry(url, SkinEntry(entry.digest, etag, last_modified, time.time()))
+                return entry.digest, content
+        if not new_content:
+            # 重新下载仍然得到304或空响应，没有可以保存的贴图
+            logger.warning("皮肤下载失败: %s 没有返回内容", url)
+            raise core.FetchError("皮肤下载失败: 服务器没有返回图片内容")
+        digest = self._store(new_content)
+        self._save_entry(url, SkinEntry(digest, etag, last_modified, time.time()))
+        return digest, new_content
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
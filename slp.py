@@ -0,0 +1,326 @@
+"""Minecraft Java版 Server List Ping (SLP) 协议实现
+
+直接通过TCP向目标服务器发送握手包和状态请求，不经过第三方API。地址的SRV/A解析
+由 resolver 完成并缓存。返回的字典字段与 uapis.cn serverstatus 接口保持一致，
+可直接交给 display_result 显示。
+"""
+import asyncio
+import json
+import socket
+import struct
+import time
+
+import metrics
+import motd
+import records
+import resolver
+from resolver import DEFAULT_PORT
+
+# 状态查询阶段服务器不校验协议版本，使用1.8的47即可兼容所有版本
+PROTOCOL_VERSION = 47
+# 单个数据包最大长度（协议规定为 2^21 - 1）
+MAX_PACKET_LENGTH = 2097151
+
+class SLPError(Exception):
+    """协议交互出错（数据包格式不正确、连接被提前关闭等）"""
+
+
+def pack_varint(value):
+    """将整数编码为VarInt"""
+    if value < 0:
+        value += 1 << 32
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def unpack_varint(data, offset=0):
+    """从字节串中解码VarInt，返回 (数值, 新偏移量)"""
+    result = 0
+    for i in range(5):
+        if offset >= len(data):
+            raise SLPError("VarInt数据不完整")
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << (7 * i)
+        if not byte & 0x80:
+            if result & (1 << 31):
+                result -= 1 << 32
+            return result, offset
+    raise SLPError("VarInt过长")
+
+
+def pack_string(text):
+    """编码带VarInt长度前缀的UTF-8字符串"""
+    raw = text.encode("utf-8")
+    return pack_varint(len(raw)) + raw
+
+
+def pack_packet(packet_id, payload=b""):
+    """组装带长度前缀的数据包"""
+    body = pack_varint(packet_id) + payload
+    return pack_varint(len(body)) + body
+
+
+def build_handshake(host, port, protocol=PROTOCOL_VERSION):
+    """握手包，下一状态为1（status）"""
+    payload = pack_varint(protocol) + pack_string(host) + struct.pack(">H", port) + pack_varint(1)
+    return pack_packet(0x00, payload)
+
+
+def build_status_request():
+    """状态请求包"""
+    return pack_packet(0x00)
+
+
+def build_ping(token):
+    """Ping包，载荷为8字节的长整数"""
+    return pack_packet(0x01, struct.pack(">q", token))
+
+
+def parse_status_packet(body):
+    """解析状态响应包体（不含长度前缀），返回服务器返回的JSON对象"""
+    packet_id, offset = unpack_varint(body)
+    if packet_id != 0x00:
+        raise SLPError(f"意外的数据包ID: {packet_id}")
+    length, offset = unpack_varint(body, offset)
+    raw = body[offset:offset + length]
+    if len(raw) != length:
+        raise SLPError("状态响应不完整")
+    try:
+        return json.loads(raw.decode("utf-8"))
+    except ValueError as e:
+        raise SLPError(f"状态响应不是合法的JSON: {e}")
+
+
+def parse_pong_packet(body):
+    """解析Pong包体，返回其中的长整数"""
+    packet_id, offset = unpack_varint(body)
+    if packet_id != 0x01 or len(body) - offset != 8:
+        raise SLPError("Pong响应格式错误")
+    return struct.unpack(">q", body[offset:])[0]
+
+
+def split_address(address, default_port=DEFAULT_PORT):
+    """把 host 或 host:port 拆分为 (host, port)"""
+    address = address.strip()
+    if address.startswith("["):
+        # [IPv6]:port
+        host, _, rest = address[1:].partition("]")
+        port = rest[1:] if rest.startswith(":") else ""
+    elif address.count(":") == 1:
+        host, port = address.split(":")
+    else:
+        host, port = address, ""
+    if port:
+        try:
+            port = int(port)
+        except ValueError:
+            raise ValueError(f"端口格式错误: {port}")
+        if not 0 < port < 65536:
+            raise ValueError(f"端口超出范围: {port}")
+    else:
+        port = default_port
+    return host, port
+
+
+def status_to_result(status, ip, port, latency=None):
+    """把SLP状态JSON转换成与uapis.cn一致的 records.ServerStatus，字段类型不对时抛出 records.DecodeError"""
+    if not isinstance(status, dict):
+        raise records.DecodeError("状态响应不是JSON对象")
+    players = status.get("players") or {}
+    version = status.get("version") or {}
+    for name, value in (("players", players), ("version", version)):
+        if not isinstance(value, dict):
+            raise records.DecodeError(f"{name} 应为JSON对象，实际为 {type(value).__name__}")
+    motd_html, motd_clean = motd.render(status.get("description", ""))
+    return records.ServerStatus.decode({
+        "online": True,
+        "ip": ip,
+        "port": port,
+        "players": players.get("online", 0),
+        "max_players": players.get("max", 0),
+        "version": version.get("name", "未知"),
+        "protocol": version.get("protocol"),
+        "motd_clean": motd_clean,
+        "motd_html": motd_html,
+        "latency": latency,
+    })
+
+
+def offline_result(host, port):
+    """服务器无法连接时返回的结果"""
+    return records.ServerStatus(online=False, ip=host, port=port, players=0, max_players=0, version="未知")
+
+
+def _recv_exact(sock, length):
+    data = bytearray()
+    while len(data) < length:
+        chunk = sock.recv(length - len(data))
+        if not chunk:
+            raise SLPError("连接被服务器关闭")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def _recv_varint(sock):
+    result = 0
+    for i in range(5):
+        byte = _recv_exact(sock, 1)[0]
+        result |= (byte & 0x7F) << (7 * i)
+        if not byte & 0x80:
+            return result
+    raise SLPError("VarInt过长")
+
+
+def recv_packet(sock):
+    """从套接字读取一个完整的数据包，返回包体（不含长度前缀）"""
+    length = _recv_varint(sock)
+    if length <= 0 or length > MAX_PACKET_LENGTH:
+        raise SLPError(f"数据包长度异常: {length}")
+    return _recv_exact(sock, length)
+
+
+def _connect(host, port, timeout, addresses=None):
+    """依次尝试 addresses 中的IP建立TCP连接，没有给出时先解析 host，分别记录DNS和连接耗时"""
+    if addresses is None:
+        with metrics.phase("dns"):
+            addresses = resolver.shared_resolver().addresses(host)
+    with metrics.phase("connect"):
+        error = OSError(f"无法解析地址: {host}")
+        for ip in addresses:
+            sock = socket.socket(socket.AF_INET6 if ":" in ip else socket.AF_INET, socket.SOCK_STREAM)
+            try:
+                sock.settimeout(timeout)
+                sock.connect((ip, port))
+                return sock
+            except OSError as e:
+                sock.close()
+                error = e
+        raise error
+
+
+def ping(host, port=DEFAULT_PORT, timeout=5, addresses=None):
+    """完成一次 握手 -> 状态请求 -> Ping/Pong 交互
+
+    addresses 为已经解析好的IP列表。返回 (状态JSON, 对端IP, 延迟毫秒)，连接失败时抛出 OSError。
+    """
+    with _connect(host, port, timeout, addresses) as sock:
+        ip = sock.getpeername()[0]
+        # 握手与状态请求合并为一次发送
+        sock.sendall(build_handshake(host, port) + build_status_request())
+        with metrics.phase("ttfb"):
+            body = recv_packet(sock)
+        with metrics.phase("json"):
+            status = parse_status_packet(body)
+
+        token = int(time.time() * 1000)
+        start = time.perf_counter()
+        try:
+            sock.sendall(build_ping(token))
+            if parse_pong_packet(recv_packet(sock)) != token:
+                raise SLPError("Pong载荷与Ping不一致")
+            latency = round((time.perf_counter() - start) * 1000, 1)
+        except (SLPError, OSError):
+            # 部分服务器在返回状态后直接断开，不回应Ping，此时不影响状态结果
+            latency = None
+    return status, ip, latency
+
+
+def query_status(address, timeout=5):
+    """直连查询服务器状态，返回与uapis.cn serverstatus接口相同格式的字典"""
+    server = resolver.normalize(address)
+    port = server.port
+    try:
+        endpoint = resolver.shared_resolver().resolve(server)
+        port = endpoint.port
+        status, ip, latency = ping(server.host, port, timeout, endpoint.addresses)
+    except OSError:
+        # 包括DNS解析失败、连接被拒绝和超时
+        return offline_result(server.host, port)
+    return status_to_result(status, ip, port, latency)
+
+
+async def _recv_varint_async(reader):
+    result = 0
+    for i in range(5):
+        byte = (await reader.readexactly(1))[0]
+        result |= (byte & 0x7F) << (7 * i)
+        if not byte & 0x80:
+            return result
+    raise SLPError("VarInt过长")
+
+
+async def recv_packet_async(reader):
+    """recv_packet 的asyncio版本"""
+    try:
+        length = await _recv_varint_async(reader)
+        if length <= 0 or length > MAX_PACKET_LENGTH:
+            raise SLPError(f"数据包长度异常: {length}")
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise SLPError("连接被服务器关闭")
+
+
+async def _open_connection(host, port, addresses=None):
+    """_connect 的asyncio版本"""
+    if addresses is None:
+        addresses = (await resolver.shared_resolver().resolve_async(resolver.ServerAddress(host, port))).addresses
+    with metrics.phase("connect"):
+        error = OSError(f"无法解析地址: {host}")
+        for ip in addresses:
+            try:
+                return await asyncio.open_connection(ip, port)
+            except OSError as e:
+                error = e
+        raise error
+
+
+async def _ping_async(host, port, addresses=None):
+    reader, writer = await _open_connection(host, port, addresses)
+    try:
+        ip = writer.get_extra_info("peername")[0]
+        writer.write(build_handshake(host, port) + build_status_request())
+        await writer.drain()
+        with metrics.phase("ttfb"):
+            body = await recv_packet_async(reader)
+        with metrics.phase("json"):
+            status = parse_status_packet(body)
+
+        token = int(time.time() * 1000)
+        start = time.perf_counter()
+        try:
+            writer.write(build_ping(token))
+            await writer.drain()
+            if parse_pong_packet(await recv_packet_async(reader)) != token:
+                raise SLPError("Pong载荷与Ping不一致")
+            latency = round((time.perf_counter() - start) * 1000, 1)
+        except (SLPError, OSError):
+            latency = None
+        return status, ip, latency
+    finally:
+        writer.close()
+
+
+async def ping_async(host, port=DEFAULT_PORT, timeout=5, addresses=None):
+    """ping 的asyncio版本，用于批量扫描"""
+    return await asyncio.wait_for(_ping_async(host, port, addresses), timeout)
+
+
+async def query_status_async(address, timeout=5):
+    """query_status 的asyncio版本"""
+    server = resolver.normalize(address)
+    port = server.port
+    try:
+        endpoint = await resolver.shared_resolver().resolve_async(server)
+        port = endpoint.port
+        status, ip, latency = await ping_async(server.host, port, timeout, endpoint.addresses)
+    except (OSError, asyncio.TimeoutError):
+        return offline_result(server.host, port)
+    return status_to_result(status, ip, port, latency)
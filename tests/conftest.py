@@ -0,0 +1,30 @@
+"""测试共用的夹具：把项目根目录加入导入路径，启动进程内的模拟服务器"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_servers  # noqa: E402
+
+
+@pytest.fixture
+def game_server():
+    server = fake_servers.FakeMinecraftServer(fake_servers.FaultProfile()).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def dns_server(game_server):
+    server = fake_servers.FakeDNSServer(game_server).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def udp_server():
+    server = fake_servers.FakeUDPServer(fake_servers.FaultProfile()).start()
+    yield server
+    server.stop()
@@ -0,0 +1,221 @@
+"""resolver：地址规范化、DNS报文编解码，以及通过模拟DNS服务器的SRV解析和 getaddrinfo 的缓存"""
+import asyncio
+import socket
+import struct
+import threading
+
+import pytest
+
+import resolver
+
+
+@pytest.mark.parametrize("address, host, port, explicit", [
+    ("Mc.Example.COM.", "mc.example.com", 25565, False),
+    (" mc.example.com:25566 ", "mc.example.com", 25566, True),
+    ("[2001:DB8::1]:19132", "2001:db8::1", 19132, True),
+    ("2001:db8:0:0::1", "2001:db8::1", 25565, False),
+    ("例子.中国", "xn--fsqu00a.xn--fiqs8s", 25565, False),
+])
+def test_normalize(address, host, port, explicit):
+    server = resolver.normalize(address)
+    assert (server.host, server.port, server.explicit_port) == (host, port, explicit)
+
+
+@pytest.mark.parametrize("address", ["", " : ", "a.com:port", "a.com:0", "a.com:65536", "[::1]x", "[zz::1]"])
+def test_normalize_invalid(address):
+    with pytest.raises(ValueError):
+        resolver.normalize(address)
+
+
+def test_server_address_text():
+    assert resolver.normalize("a.com").text == "a.com"
+    assert resolver.normalize("a.com:25565").text == "a.com:25565"
+    assert resolver.normalize("[::1]:1").text == "[::1]:1"
+
+
+def test_read_addresses():
+    lines = ["a.com  # 注释", "", "# 整行注释", "b.com:1", "a.com"]
+    assert resolver.read_addresses(lines) == ["a.com", "b.com:1"]
+
+
+def test_build_query():
+    query = resolver.build_query("mc.example.com", resolver.TYPE_SRV, 0x1234)
+    assert query[:12] == struct.pack(">HHHHHH", 0x1234, 0x0100, 1, 0, 0, 0)
+    assert query[12:] == b"\x02mc\x07example\x03com\x00" + struct.pack(">HH", resolver.TYPE_SRV, 1)
+    with pytest.raises(ValueError):
+        resolver.encode_name("a" * 64 + ".com")
+
+
+def _response(query_id, answers=(), authority=(), rcode=0, flags=0x8180):
+    """question 为 mc.example.com，记录的名字都用指向它的压缩指针"""
+    question = resolver.encode_name("mc.example.com") + struct.pack(">HH", resolver.TYPE_A, 1)
+    records = b"".join(struct.pack(">HHHIH", 0xC00C, rtype, 1, ttl, len(rdata)) + rdata
+                       for rtype, ttl, rdata in list(answers) + list(authority))
+    header = struct.pack(">HHHHHH", query_id, flags | rcode, 1, len(answers), len(authority), 0)
+    return header + question + records
+
+
+def test_parse_response_records():
+    # SRV目标使用指向问题中 example.com 的压缩指针
+    srv = struct.pack(">HHH", 10, 5, 25566) + b"\x04game\xc0\x0f"
+    message = _response(7, [
+        (resolver.TYPE_SRV, 300, srv),
+        (resolver.TYPE_A, 120, socket.inet_aton("192.0.2.1")),
+        (resolver.TYPE_AAAA, 60, socket.inet_pton(socket.AF_INET6, "2001:db8::1")),
+        (resolver.TYPE_CNAME, 60, b"\xc0\x0c"),
+    ])
+    rcode, truncated, answers, negative_ttl = resolver.parse_response(message, 7)
+    assert (rcode, truncated, negative_ttl) == (0, False, None)
+    assert answers == [
+        ("mc.example.com", resolver.TYPE_SRV, 300, (10, 5, 25566, "game.example.com")),
+        ("mc.example.com", resolver.TYPE_A, 120, "192.0.2.1"),
+        ("mc.example.com", resolver.TYPE_AAAA, 60, "2001:db8::1"),
+        ("mc.example.com", resolver.TYPE_CNAME, 60, "mc.example.com"),
+    ]
+
+
+def test_parse_response_negative_ttl():
+    soa = b"\x02ns\xc0\x0f\x05admin\xc0\x0f" + struct.pack(">IIIII", 1, 3600, 600, 86400, 30)
+    message = _response(9, authority=[(resolver.TYPE_SOA, 120, soa)], rcode=resolver.RCODE_NXDOMAIN)
+    rcode, _, answers, negative_ttl = resolver.parse_response(message, 9)
+    # 取SOA记录TTL与minimum字段中较小的一个
+    assert (rcode, answers, negative_ttl) == (resolver.RCODE_NXDOMAIN, [], 30)
+
+
+def test_parse_response_mismatch():
+    message = _response(1, [(resolver.TYPE_A, 60, socket.inet_aton("192.0.2.1"))])
+    with pytest.raises(resolver.DNSError):
+        resolver.parse_response(message, 2)
+    with pytest.raises(resolver.DNSError):
+        resolver.parse_response(_response(1, flags=0x0100), 1)
+
+
+def test_parse_response_truncated():
+    message = _response(3, [(resolver.TYPE_A, 60, socket.inet_aton("192.0.2.1")),
+                            (resolver.TYPE_SRV, 60, struct.pack(">HHH", 0, 0, 1) + b"\xc0\x0c")])
+    for length in range(len(message)):
+        with pytest.raises(resolver.DNSError):
+            resolver.parse_response(message[:length], 3)
+
+
+def test_parse_response_pointer_loop():
+    message = struct.pack(">HHHHHH", 5, 0x8180, 1, 0, 0, 0) + b"\xc0\x0c"
+    with pytest.raises(resolver.DNSError):
+        resolver.parse_response(message, 5)
+
+
+@pytest.fixture
+def stub(dns_server):
+    stub = resolver.Resolver(nameservers=[dns_server.address], timeout=0.5)
+    yield stub
+    stub.close()
+
+
+def test_resolve_srv(stub, dns_server, game_server):
+    endpoint = stub.resolve("MC0.bench.local.")
+    assert (endpoint.host, endpoint.port) == ("localhost", game_server.ports[0])
+    assert "127.0.0.1" in endpoint.addresses
+    # 只有SRV查询发给DNS服务器，localhost 由 getaddrinfo 解析
+    assert dns_server.queries == 1
+    # 第二次完全来自缓存
+    assert stub.resolve("mc0.bench.local").port == game_server.ports[0]
+    assert dns_server.queries == 1 and stub.hits == 2
+
+
+def test_explicit_port_skips_srv(stub, dns_server):
+    endpoint = stub.resolve("localhost:1234")
+    assert (endpoint.host, endpoint.port) == ("localhost", 1234)
+    assert "127.0.0.1" in endpoint.addresses
+    assert dns_server.queries == 0
+
+
+def test_ip_address_needs_no_query(stub, dns_server):
+    assert stub.resolve("127.0.0.1").addresses == ["127.0.0.1"]
+    assert stub.resolve("[::1]:25565").addresses == ["::1"]
+    assert dns_server.queries == 0
+
+
+def test_srv_dot_target_means_no_service(stub, dns_server):
+    dns_server.add("_minecraft._tcp.localhost", resolver.TYPE_SRV, struct.pack(">HHH", 0, 0, 1) + b"\x00")
+    endpoint = stub.resolve("localhost")
+    assert (endpoint.host, endpoint.port) == ("localhost", 25565)
+
+
+def test_addresses_use_getaddrinfo(stub, dns_server, monkeypatch):
+    calls = []
+
+    def getaddrinfo(host, *args):
+        calls.append(host)
+        return [(socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("::1", 0, 0, 0)),
+                (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", 0)),
+                (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("::1", 0, 0, 0))]
+
+    # 模拟DNS服务器上的A记录不会被使用
+    dns_server.add("web.bench.local", resolver.TYPE_A, socket.inet_aton("192.0.2.1"))
+    monkeypatch.setattr(resolver.socket, "getaddrinfo", getaddrinfo)
+    for _ in range(2):
+        assert stub.addresses("web.bench.local") == ["::1", "127.0.0.1"]
+    assert calls == ["web.bench.local"] and dns_server.queries == 0
+
+
+def test_unresolvable_host_is_cached(stub, monkeypatch):
+    calls = []
+
+    def getaddrinfo(host, *args):
+        calls.append(host)
+        raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+
+    monkeypatch.setattr(resolver.socket, "getaddrinfo", getaddrinfo)
+    for _ in range(2):
+        with pytest.raises(resolver.DNSError):
+            stub.addresses("missing.bench.local")
+    assert calls == ["missing.bench.local"]
+
+
+def test_nxdomain_is_cached(stub, dns_server):
+    for _ in range(2):
+        assert stub.srv_target("missing.bench.local") == (None, None)
+    # 第二次来自否定缓存
+    assert dns_server.queries == 1
+
+
+def test_malformed_reply(stub, dns_server):
+    dns_server.mangle = lambda reply: reply[:-3]
+    for _ in range(2):
+        assert stub.srv_target("mc0.bench.local") == (None, None)
+    # 查询失败的结果也短暂缓存
+    assert dns_server.queries == 1
+
+
+def test_no_reply():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as silent:
+        silent.bind(("127.0.0.1", 0))
+        stub = resolver.Resolver(nameservers=[silent.getsockname()], timeout=0.2)
+        assert stub.srv_target("mc0.bench.local") == (None, None)
+        assert stub.queries == 1
+
+
+def test_concurrent_lookups_share_one_query(stub, dns_server, game_server):
+    dns_server.delay = 0.1
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(stub.srv_target("mc0.bench.local")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [("localhost", game_server.ports[0])] * 8
+    assert dns_server.queries == 1
+
+
+def test_resolve_async(stub, dns_server, game_server):
+    async def main():
+        first = await stub.resolve_async("mc0.bench.local")
+        # 命中缓存时不经过线程池
+        second = await stub.resolve_async("mc0.bench.local")
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first.port == second.port == game_server.ports[0]
+    assert first.addresses == second.addresses and "127.0.0.1" in first.addresses
+    assert dns_server.queries == 1
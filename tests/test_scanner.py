@@ -0,0 +1,32 @@
+"""scanner：批量扫描在单个服务器出错时仍然产出全部结果"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("requests")
+
+import scanner  # noqa: E402
+import slp  # noqa: E402
+
+
+def _scan(addresses, **kwargs):
+    results = []
+    batch = scanner.BatchScanner(concurrency=4, timeout=5, direct=True, **kwargs)
+    asyncio.run(asyncio.wait_for(batch.scan_all(addresses, results.append), 10))
+    return results
+
+
+def test_scan_direct(game_server):
+    results = _scan([game_server.address] * 5)
+    assert len(results) == 5
+    assert all(item["success"] and item["data"].players == 42 for item in results)
+
+
+def test_unexpected_error_does_not_stop_scan(game_server, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(slp, "status_to_result", broken)
+    results = _scan([game_server.address] * 6)
+    assert len(results) == 6
+    assert all(not item["success"] and "boom" in item["error"] for item in results)
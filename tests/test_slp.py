@@ -0,0 +1,193 @@
+"""slp：VarInt、数据包编解码，以及对模拟服务器的完整查询"""
+import asyncio
+import json
+import socket
+import threading
+
+import pytest
+
+import records
+import slp
+
+
+@pytest.mark.parametrize("value, encoded", [
+    (0, b"\x00"),
+    (1, b"\x01"),
+    (127, b"\x7f"),
+    (128, b"\x80\x01"),
+    (255, b"\xff\x01"),
+    (25565, b"\xdd\xc7\x01"),
+    (2097151, b"\xff\xff\x7f"),
+    (2147483647, b"\xff\xff\xff\xff\x07"),
+    (-1, b"\xff\xff\xff\xff\x0f"),
+    (-2147483648, b"\x80\x80\x80\x80\x08"),
+])
+def test_varint_round_trip(value, encoded):
+    assert slp.pack_varint(value) == encoded
+    assert slp.unpack_varint(encoded) == (value, len(encoded))
+    assert slp.unpack_varint(b"\x00" + encoded + b"\x00", 1) == (value, len(encoded) + 1)
+
+
+@pytest.mark.parametrize("data", [b"", b"\x80", b"\xff\xff\xff"])
+def test_varint_truncated(data):
+    with pytest.raises(slp.SLPError):
+        slp.unpack_varint(data)
+
+
+def test_varint_too_long():
+    with pytest.raises(slp.SLPError):
+        slp.unpack_varint(b"\x80\x80\x80\x80\x80\x01")
+
+
+def test_handshake_layout():
+    packet = slp.build_handshake("mc.example.com", 25565)
+    length, offset = slp.unpack_varint(packet)
+    body = packet[offset:]
+    assert len(body) == length
+    packet_id, offset = slp.unpack_varint(body)
+    protocol, offset = slp.unpack_varint(body, offset)
+    host_length, offset = slp.unpack_varint(body, offset)
+    assert (packet_id, protocol) == (0x00, slp.PROTOCOL_VERSION)
+    assert body[offset:offset + host_length] == b"mc.example.com"
+    assert body[offset + host_length:] == b"\x63\xdd\x01"
+
+
+def test_status_and_pong_packets():
+    status = {"version": {"name": "1.20.1", "protocol": 763}}
+    raw = json.dumps(status).encode()
+    assert slp.parse_status_packet(slp.pack_varint(0) + slp.pack_varint(len(raw)) + raw) == status
+    ping = slp.build_ping(1234567890123)
+    assert slp.parse_pong_packet(ping[1:]) == 1234567890123
+
+
+@pytest.mark.parametrize("body", [
+    b"\x01\x02{}",                      # 数据包ID不对
+    b"\x00\x0a{}",                      # 声明的长度超过实际内容
+    b"\x00\x03{x}",                     # 不是合法的JSON
+    b"\x00\x02\xff\xfe",                # 不是UTF-8
+    b"\x00",                            # 缺少长度
+])
+def test_parse_status_packet_malformed(body):
+    with pytest.raises(slp.SLPError):
+        slp.parse_status_packet(body)
+
+
+@pytest.mark.parametrize("body", [b"\x00" + b"\x00" * 8, b"\x01\x00\x00", b"\x01" + b"\x00" * 9])
+def test_parse_pong_packet_malformed(body):
+    with pytest.raises(slp.SLPError):
+        slp.parse_pong_packet(body)
+
+
+@pytest.mark.parametrize("address, expected", [
+    ("mc.example.com", ("mc.example.com", 25565)),
+    ("mc.example.com:25566", ("mc.example.com", 25566)),
+    ("[::1]:19132", ("::1", 19132)),
+    ("[::1]", ("::1", 25565)),
+    ("::1", ("::1", 25565)),
+])
+def test_split_address(address, expected):
+    assert slp.split_address(address) == expected
+
+
+@pytest.mark.parametrize("address", ["a.com:port", "a.com:0", "a.com:65536"])
+def test_split_address_invalid(address):
+    with pytest.raises(ValueError):
+        slp.split_address(address)
+
+
+@pytest.mark.parametrize("status", [
+    ["not", "an", "object"],
+    {"players": {"online": "many"}},
+    {"players": "42/200"},
+    {"players": [42, 200]},
+    {"version": "1.20"},
+    {"version": ["1.20", 763]},
+])
+def test_status_to_result_rejects_wrong_types(status):
+    with pytest.raises(records.DecodeError):
+        slp.status_to_result(status, "127.0.0.1", 25565)
+
+
+def test_query_status_wrong_field_type(game_server):
+    game_server.status = json.dumps({"version": "1.20", "players": {"online": 1, "max": 2}}).encode()
+    with pytest.raises(records.DecodeError):
+        slp.query_status(game_server.address, timeout=5)
+
+
+def test_query_status(game_server):
+    result = slp.query_status(game_server.address, timeout=5)
+    assert result.online
+    assert (result.players, result.max_players, result.version, result.protocol) == (42, 200, "1.20.1", 763)
+    assert result.motd_clean == "A Minecraft Server"
+    assert result.port == game_server.ports[0]
+    assert result.latency is not None
+
+
+def test_query_status_async(game_server):
+    result = asyncio.run(slp.query_status_async(game_server.address, timeout=5))
+    assert result.online and result.players == 42
+
+
+def test_query_status_closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    result = slp.query_status(f"127.0.0.1:{port}", timeout=2)
+    assert not result.online and result.port == port
+
+
+class RawServer:
+    """读取握手和状态请求后原样返回 reply 并关闭连接的TCP服务器"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.address = "127.0.0.1:%d" % self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        try:
+            conn, _ = self.sock.accept()
+        except OSError:
+            return
+        with conn:
+            conn.settimeout(2)
+            slp.recv_packet(conn)
+            slp.recv_packet(conn)
+            conn.sendall(self.reply)
+
+    def close(self):
+        self.sock.close()
+
+
+def _status_packet(raw):
+    return slp.pack_packet(0x00, slp.pack_varint(len(raw)) + raw)
+
+
+@pytest.mark.parametrize("reply", [
+    b"",                                             # 直接断开
+    _status_packet(b'{"version": {}}')[:-3],          # 状态响应被截断
+    slp.pack_varint(slp.MAX_PACKET_LENGTH + 1),      # 长度超出协议上限
+    b"\x80\x80\x80\x80\x80\x01",                     # 长度VarInt过长
+    _status_packet(b"not json"),
+    slp.pack_packet(0x05, b"\x00"),                  # 数据包ID不对
+])
+def test_query_status_malformed_response(reply):
+    server = RawServer(reply)
+    try:
+        with pytest.raises(slp.SLPError):
+            slp.query_status(server.address, timeout=2)
+    finally:
+        server.close()
+
+
+def test_query_status_without_pong():
+    """返回状态后不回应Ping的服务器：结果正常，延迟为空"""
+    server = RawServer(_status_packet(json.dumps({"players": {"online": 3, "max": 10}}).encode()))
+    try:
+        result = slp.query_status(server.address, timeout=2)
+    finally:
+        server.close()
+    assert result.online and result.players == 3 and result.latency is None
@@ -0,0 +1,192 @@
+"""udp_probe：RakNet Unconnected Pong 与 GameSpy4 Query 的解析，以及对模拟UDP服务器的探测"""
+import asyncio
+import socket
+import struct
+
+import pytest
+
+import slp
+import udp_probe
+
+
+def _pong(token, text):
+    raw = text.encode("utf-8")
+    return (bytes([udp_probe.UNCONNECTED_PONG]) + struct.pack(">QQ", token, 1) + udp_probe.RAKNET_MAGIC
+            + struct.pack(">H", len(raw)) + raw)
+
+
+def test_unconnected_ping_layout():
+    packet = udp_probe.build_unconnected_ping(0x0102030405060708)
+    assert len(packet) == 33
+    assert packet[0] == udp_probe.UNCONNECTED_PING
+    assert packet[1:9] == bytes(range(1, 9))
+    assert packet[9:25] == udp_probe.RAKNET_MAGIC
+
+
+def test_parse_unconnected_pong():
+    token, fields = udp_probe.parse_unconnected_pong(_pong(42, "MCPE;§aHello;622;1.20.40;3;10;1;World;Creative;"))
+    assert token == 42
+    result = udp_probe.bedrock_to_result(fields, "127.0.0.1", 19132, 1.5)
+    assert (result.players, result.max_players, result.version, result.protocol) == (3, 10, "1.20.40", 622)
+    assert (result.motd_clean, result.edition, result.gamemode, result.map) == ("Hello", "bedrock", "Creative",
+                                                                              "World")
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    _pong(1, "MCPE;a;1;1;1;1")[:34],                          # 没有长度字段
+    _pong(1, "MCPE;a;1;1;1;1")[:-2],                          # 内容被截断
+    b"\x1d" + _pong(1, "MCPE;a;1;1;1;1")[1:],                  # 类型不对
+    _pong(1, "MCPE;a;1;1;1;1").replace(udp_probe.RAKNET_MAGIC, b"\x00" * 16),
+])
+def test_parse_unconnected_pong_malformed(data):
+    with pytest.raises(udp_probe.ProbeError):
+        udp_probe.parse_unconnected_pong(data)
+
+
+@pytest.mark.parametrize("text", ["MCPE;too;few", "MCPE;motd;1;1.0;many;10", "MCPE;motd;x;1.0;1;10"])
+def test_bedrock_to_result_malformed(text):
+    with pytest.raises(udp_probe.ProbeError):
+        udp_probe.bedrock_to_result(text.split(";"), "127.0.0.1", 19132)
+
+
+def test_query_packets():
+    assert udp_probe.build_query_handshake(0x01020304) == b"\xfe\xfd\x09\x01\x02\x03\x04"
+    assert udp_probe.build_full_stat(1, 2) == b"\xfe\xfd\x00" + struct.pack(">II", 1, 2) + b"\x00" * 4
+    assert udp_probe.parse_query_handshake(b"\x09\x00\x00\x00\x01-9513307\x00") == (-9513307) & 0xFFFFFFFF
+
+
+@pytest.mark.parametrize("data", [b"", b"\x09\x00\x00\x00\x01", b"\x00\x00\x00\x00\x0112\x00",
+                                  b"\x09\x00\x00\x00\x01abc\x00"])
+def test_parse_query_handshake_malformed(data):
+    with pytest.raises(udp_probe.ProbeError):
+        udp_probe.parse_query_handshake(data)
+
+
+def test_parse_full_stat(udp_server):
+    data = b"\x00\x00\x00\x00\x01" + udp_server.full_stat
+    values, players = udp_probe.parse_full_stat(data)
+    assert values["hostname"] == "A Minecraft Server" and values["numplayers"] == "3"
+    assert players == ["Alice", "Bob", "Carol"]
+    result = udp_probe.full_stat_to_result(values, players, "127.0.0.1", 25565)
+    assert (result.software, result.plugins) == ("Paper on 1.20.1", ("Essentials 2.20", "LuckPerms 5.4"))
+
+
+def test_parse_full_stat_truncated(udp_server):
+    data = b"\x00\x00\x00\x00\x01" + udp_server.full_stat
+    for length in range(len(data)):
+        with pytest.raises(udp_probe.ProbeError):
+            udp_probe.parse_full_stat(data[:length])
+    with pytest.raises(udp_probe.ProbeError):
+        udp_probe.parse_full_stat(b"\x00\x00\x00\x00\x01hostname\x00x\x00\x00")
+    with pytest.raises(udp_probe.ProbeError):
+        udp_probe.full_stat_to_result({"numplayers": "lots"}, [], "127.0.0.1", 25565)
+
+
+def test_parse_full_stat_no_players():
+    data = (b"\x00\x00\x00\x00\x01" + udp_probe.QUERY_KV_PADDING + b"numplayers\x000\x00\x00"
+            + udp_probe.QUERY_PLAYER_PADDING + b"\x00")
+    assert udp_probe.parse_full_stat(data) == ({"numplayers": "0"}, [])
+
+
+def test_split_plugins():
+    assert udp_probe.split_plugins("") == (None, [])
+    assert udp_probe.split_plugins("CraftBukkit on Bukkit 1.20") == ("CraftBukkit on Bukkit 1.20", [])
+    assert udp_probe.split_plugins("Paper: A 1; B 2;") == ("Paper", ["A 1", "B 2"])
+
+
+def test_query_bedrock(udp_server):
+    result = udp_probe.query_bedrock(udp_server.address, timeout=1)
+    assert result.online and result.edition == "bedrock"
+    assert (result.players, result.max_players, result.version) == (42, 200, "1.20.40")
+    assert result.latency is not None
+
+
+def test_query_full_stat(udp_server):
+    result = udp_probe.query_full_stat(udp_server.address, timeout=1)
+    assert result.online and result.edition == "java"
+    assert result.player_list == ("Alice", "Bob", "Carol")
+    # port 是服务器报告的游戏端口
+    assert result.port == 25565
+
+
+def _closed_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_no_reply_is_offline():
+    port = _closed_udp_port()
+    for probe in (udp_probe.query_bedrock, udp_probe.query_full_stat):
+        result = probe(f"127.0.0.1:{port}", timeout=0.2)
+        assert not result.online and result.port == port
+
+
+def test_retransmit_after_lost_reply(udp_server):
+    dropped = []
+
+    def drop_first(message, reply):
+        if not dropped:
+            dropped.append(message)
+            return None
+        return reply
+
+    udp_server.mangle = drop_first
+    assert udp_probe.query_bedrock(udp_server.address, timeout=1).online
+    assert udp_server.requests == 2
+
+
+def test_mismatched_token_is_ignored(udp_server):
+    # 令牌不符的应答不能当作本次探测的结果
+    udp_server.mangle = lambda message, reply: reply[:1] + b"\x00" * 8 + reply[9:]
+    assert not udp_probe.query_bedrock(udp_server.address, timeout=0.2).online
+
+
+@pytest.mark.parametrize("mangle", [
+    lambda message, reply: reply[:20],                                              # Pong被截断
+    lambda message, reply: reply[:35] + b"MCPE;only;three",                        # 字段不足
+])
+def test_malformed_pong(udp_server, mangle):
+    udp_server.mangle = mangle
+    with pytest.raises(slp.SLPError):
+        udp_probe.query_bedrock(udp_server.address, timeout=1)
+
+
+def test_malformed_handshake(udp_server):
+    udp_server.mangle = lambda message, reply: reply[:5] + b"token\x00" if reply[0] == 0x09 else reply
+    with pytest.raises(udp_probe.ProbeError):
+        udp_probe.query_full_stat(udp_server.address, timeout=1)
+
+
+def test_prober_shares_one_socket(udp_server):
+    async def main():
+        prober = udp_probe.UDPProber()
+        try:
+            results = await asyncio.gather(*[prober.bedrock(udp_server.address, 1) for _ in range(20)],
+                                           *[prober.full_stat(udp_server.address, 1) for _ in range(20)])
+            return results, len(prober._transports)
+        finally:
+            prober.close()
+
+    results, transports = asyncio.run(main())
+    assert all(result.online for result in results)
+    assert [result.edition for result in results] == ["bedrock"] * 20 + ["java"] * 20
+    assert transports == 1
+
+
+def test_prober_offline_and_malformed(udp_server):
+    port = _closed_udp_port()
+
+    async def main():
+        prober = udp_probe.UDPProber()
+        try:
+            offline = await prober.full_stat(f"127.0.0.1:{port}", 0.2)
+            udp_server.mangle = lambda message, reply: reply[:20]
+            with pytest.raises(udp_probe.ProbeError):
+                await prober.bedrock(udp_server.address, 1)
+            return offline
+        finally:
+            prober.close()
+
+    assert not asyncio.run(main()).online
@@ -0,0 +1,332 @@
+"""基于UDP的服务器状态探测
+
+- 基岩版：RakNet Unconnected Ping，一次往返得到MOTD、版本、玩家数；
+- Java版：GameSpy4 Query（server.properties 中 enable-query=true），握手取得令牌后
+  发送 full stat 请求，一次应答中包含玩家列表和插件列表。
+
+两种探测都只交换一两个数据报，不需要TCP握手或TLS，批量扫描时每个目标的开销远小于
+Server List Ping 和HTTPS接口。结果与 slp.query_status 相同，是 records.ServerStatus，
+另外带有 edition、player_list、plugins 等字段；没有应答时返回离线结果。
+
+批量扫描使用 UDPProber：整个扫描共用一个UDP套接字，按来源地址和会话号分发应答。
+"""
+import asyncio
+import random
+import socket
+import struct
+import time
+
+import motd
+import records
+import resolver
+import slp
+
+BEDROCK_PORT = 19132
+QUERY_PORT = 25565
+DEFAULT_TIMEOUT = 2.0
+# 每次探测最多发送的次数，超时时间平均分配给每次发送
+DEFAULT_ATTEMPTS = 2
+RAKNET_MAGIC = bytes.fromhex("00ffff00fefefefefdfdfdfd12345678")
+UNCONNECTED_PING = 0x01
+UNCONNECTED_PONG = 0x1C
+QUERY_MAGIC = b"\xfe\xfd"
+QUERY_HANDSHAKE = 0x09
+QUERY_STAT = 0x00
+# full stat 应答中键值对之前和玩家列表之前的固定填充
+QUERY_KV_PADDING = b"splitnum\x00\x80\x00"
+QUERY_PLAYER_PADDING = b"\x01player_\x00\x00"
+MAX_DATAGRAM = 65535
+
+_CLIENT_GUID = random.getrandbits(63)
+
+
+class ProbeError(slp.SLPError):
+    """应答格式不正确"""
+
+
+def build_unconnected_ping(token):
+    """token 为8字节的时间戳字段，服务器会原样放回应答中，用来匹配请求"""
+    return struct.pack(">BQ", UNCONNECTED_PING, token) + RAKNET_MAGIC + struct.pack(">Q", _CLIENT_GUID)
+
+
+def parse_unconnected_pong(data):
+    """解析 Unconnected Pong，返回 (token, 服务器信息字段列表)"""
+    if len(data) < 35 or data[0] != UNCONNECTED_PONG or data[17:33] != RAKNET_MAGIC:
+        raise ProbeError("不是RakNet Unconnected Pong")
+    token = struct.unpack(">Q", data[1:9])[0]
+    length = struct.unpack(">H", data[33:35])[0]
+    raw = data[35:35 + length]
+    if len(raw) != length:
+        raise ProbeError("Unconnected Pong不完整")
+    return token, raw.decode("utf-8", "replace").split(";")
+
+
+def bedrock_to_result(fields, ip, port, latency=None):
+    """MCPE;MOTD;协议号;版本;在线人数;最大人数;服务器ID;世界名;游戏模式;... 转换成 records.ServerStatus"""
+    if len(fields) < 6:
+        raise ProbeError("基岩版服务器信息字段不足")
+    motd_html, motd_clean = motd.render(fields[1])
+    try:
+        return records.ServerStatus.decode({
+            "online": True,
+            "ip": ip,
+            "port": port,
+            "players": fields[4],
+            "max_players": fields[5],
+            "version": fields[3],
+            "protocol": fields[2] or None,
+            "motd_clean": motd_clean,
+            "motd_html": motd_html,
+            "latency": latency,
+            "edition": "bedrock",
+            "map": fields[7] if len(fields) > 7 else None,
+            "gamemode": fields[8] if len(fields) > 8 else None,
+        })
+    except records.DecodeError as e:
+        raise ProbeError(f"基岩版服务器信息格式错误: {e}")
+
+
+def build_query_handshake(session_id):
+    return QUERY_MAGIC + struct.pack(">BI", QUERY_HANDSHAKE, session_id)
+
+
+def parse_query_handshake(data):
+    """握手应答中是以\\0结尾的十进制令牌"""
+    if len(data) < 6 or data[0] != QUERY_HANDSHAKE:
+        raise ProbeError("Query握手应答格式错误")
+    try:
+        return int(data[5:].split(b"\x00", 1)[0]) & 0xFFFFFFFF
+    except ValueError:
+        raise ProbeError("Query握手令牌不是数字")
+
+
+def build_full_stat(session_id, token):
+    """full stat 请求：在 basic stat 的基础上多4个字节的填充"""
+    return QUERY_MAGIC + struct.pack(">BII", QUERY_STAT, session_id, token) + b"\x00" * 4
+
+
+def parse_full_stat(data):
+    """返回 (键值字典, 玩家名列表)"""
+    if len(data) < 5 or data[0] != QUERY_STAT:
+        raise ProbeError("Query应答格式错误")
+    body = data[5:]
+    if not body.startswith(QUERY_KV_PADDING):
+        raise ProbeError("不是Query full stat应答")
+    section, found, player_section = body[len(QUERY_KV_PADDING):].partition(QUERY_PLAYER_PADDING)
+    # 键值部分和玩家列表都以空字符串结束（没有玩家时只有一个\0），缺少时说明应答被截断
+    if not found or not section.endswith(b"\x00\x00") or not (
+            player_section == b"\x00" or player_section.endswith(b"\x00\x00")):
+        raise ProbeError("Query应答不完整")
+    parts = section.split(b"\x00")
+    values = {}
+    for index in range(0, len(parts) - 1, 2):
+        key = parts[index].decode("utf-8", "replace")
+        if not key:
+            break
+        values[key] = parts[index + 1].decode("utf-8", "replace")
+    players = [name.decode("utf-8", "replace") for name in player_section.split(b"\x00") if name]
+    return values, players
+
+
+def split_plugins(value):
+    """"Paper on 1.20.4: A 1.0; B 2.0" -> ("Paper on 1.20.4", ["A 1.0", "B 2.0"])，原版服务器没有插件"""
+    software, _, plugins = value.partition(":")
+    return software.strip() or None, [plugin.strip() for plugin in plugins.split(";") if plugin.strip()]
+
+
+def full_stat_to_result(values, players, ip, port, latency=None):
+    motd_html, motd_clean = motd.render(values.get("hostname", ""))
+    software, plugins = split_plugins(values.get("plugins", ""))
+    try:
+        return records.ServerStatus.decode({
+            "online": True,
+            "ip": ip,
+            # hostport 是游戏（TCP）端口，server.properties 中的 query.port 可以与之不同
+            "port": values.get("hostport") or port,
+            "players": values.get("numplayers") or 0,
+            "max_players": values.get("maxplayers") or 0,
+            "version": values.get("version") or "未知",
+            "motd_clean": motd_clean,
+            "motd_html": motd_html,
+            "latency": latency,
+            "edition": "java",
+            "map": values.get("map"),
+            "software": software,
+            "plugins": plugins,
+            "player_list": players,
+        })
+    except records.DecodeError as e:
+        raise ProbeError(f"Query应答格式错误: {e}")
+
+
+def _session_id():
+    # 协议只使用每个字节的低4位
+    return random.getrandbits(32) & 0x0F0F0F0F
+
+
+def _reply_key(data, address):
+    """应答的匹配键：(来源IP, 来源端口, 类型, 会话号或时间戳)"""
+    if len(data) >= 9 and data[0] == UNCONNECTED_PONG:
+        return address[0], address[1], UNCONNECTED_PONG, data[1:9]
+    if len(data) >= 5 and data[0] in (QUERY_HANDSHAKE, QUERY_STAT):
+        return address[0], address[1], data[0], data[1:5]
+    return None
+
+
+def _exchange(ip, port, packet, key, timeout, attempts=DEFAULT_ATTEMPTS):
+    """阻塞版本：发送并等待匹配的应答，返回 (数据, 往返毫秒)，超时抛出 socket.timeout"""
+    family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+    with socket.socket(family, socket.SOCK_DGRAM) as sock:
+        for _ in range(attempts):
+            started = time.perf_counter()
+            deadline = started + timeout / attempts
+            sock.sendto(packet, (ip, port))
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                sock.settimeout(remaining)
+                try:
+                    data, address = sock.recvfrom(MAX_DATAGRAM)
+                except socket.timeout:
+                    break
+                if _reply_key(data, address) == key:
+                    return data, round((time.perf_counter() - started) * 1000, 1)
+    raise socket.timeout("UDP探测没有应答")
+
+
+def _first_address(server):
+    """UDP探测不查SRV记录（SRV只描述TCP服务）"""
+    return resolver.shared_resolver().resolve(server, srv=False).addresses[0]
+
+
+def query_bedrock(address, timeout=DEFAULT_TIMEOUT):
+    """向基岩版服务器发送 Unconnected Ping（默认端口19132）"""
+    server = resolver.normalize(address, BEDROCK_PORT)
+    try:
+        ip = _first_address(server)
+        token = random.getrandbits(64)
+        data, latency = _exchange(ip, server.port, build_unconnected_ping(token),
+                                  (ip, server.port, UNCONNECTED_PONG, struct.pack(">Q", token)), timeout)
+    except OSError:
+        return slp.offline_result(server.host, server.port)
+    return bedrock_to_result(parse_unconnected_pong(data)[1], ip, server.port, latency)
+
+
+def query_full_stat(address, timeout=DEFAULT_TIMEOUT):
+    """通过GameSpy4 Query获取完整状态（默认端口25565的UDP）"""
+    server = resolver.normalize(address, QUERY_PORT)
+    try:
+        ip = _first_address(server)
+        session_id = _session_id()
+        session = struct.pack(">I", session_id)
+        data, _ = _exchange(ip, server.port, build_query_handshake(session_id),
+                            (ip, server.port, QUERY_HANDSHAKE, session), timeout / 2)
+        token = parse_query_handshake(data)
+        data, latency = _exchange(ip, server.port, build_full_stat(session_id, token),
+                                  (ip, server.port, QUERY_STAT, session), timeout / 2)
+    except OSError:
+        return slp.offline_result(server.host, server.port)
+    return full_stat_to_result(*parse_full_stat(data), ip, server.port, latency)
+
+
+class _ProbeProtocol(asyncio.DatagramProtocol):
+    def __init__(self, prober):
+        self.prober = prober
+
+    def datagram_received(self, data, address):
+        self.prober._received(data, address)
+
+    def error_received(self, exc):
+        # ICMP端口不可达等错误无法对应到具体的请求，由超时处理
+        pass
+
+
+class UDPProber:
+    """asyncio中共用一个UDP套接字的探测器，供批量扫描使用；需要在同一个事件循环中使用并最后 close()"""
+
+    def __init__(self, attempts=DEFAULT_ATTEMPTS):
+        self.attempts = attempts
+        self._transports = {}
+        self._waiters = {}
+
+    async def _transport(self, family):
+        transport = self._transports.get(family)
+        if transport is None:
+            loop = asyncio.get_running_loop()
+            local = ("::", 0) if family == socket.AF_INET6 else ("0.0.0.0", 0)
+            transport, _ = await loop.create_datagram_endpoint(lambda: _ProbeProtocol(self), local_addr=local,
+                                                               family=family)
+            self._transports[family] = transport
+        return transport
+
+    def _received(self, data, address):
+        waiter = self._waiters.pop(_reply_key(data, address), None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result((data, time.perf_counter()))
+
+    async def _exchange(self, ip, port, packet, key, timeout):
+        transport = await self._transport(socket.AF_INET6 if ":" in ip else socket.AF_INET)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[key] = waiter
+        try:
+            for _ in range(self.attempts):
+                started = time.perf_counter()
+                transport.sendto(packet, (ip, port))
+                try:
+                    data, received = await asyncio.wait_for(asyncio.shield(waiter), timeout / self.attempts)
+                except asyncio.TimeoutError:
+                    continue
+                return data, round((received - started) * 1000, 1)
+            raise asyncio.TimeoutError
+        finally:
+            if self._waiters.get(key) is waiter:
+                del self._waiters[key]
+            waiter.cancel()
+
+    def _unique_session(self, ip, port):
+        # 会话号只有16位有效，同一目标同时进行的探测不能重复
+        while True:
+            session = struct.pack(">I", _session_id())
+            if (ip, port, QUERY_HANDSHAKE, session) not in self._waiters and \
+                    (ip, port, QUERY_STAT, session) not in self._waiters:
+                return session
+
+    async def bedrock(self, address, timeout=DEFAULT_TIMEOUT):
+        """query_bedrock 的asyncio版本"""
+        server = resolver.normalize(address, BEDROCK_PORT)
+        try:
+            endpoint = await resolver.shared_resolver().resolve_async(server, srv=False)
+            ip = endpoint.addresses[0]
+            token = random.getrandbits(64)
+            data, latency = await self._exchange(ip, server.port, build_unconnected_ping(token),
+                                                 (ip, server.port, UNCONNECTED_PONG, struct.pack(">Q", token)),
+                                                 timeout)
+        except (OSError, asyncio.TimeoutError):
+            return slp.offline_result(server.host, server.port)
+        return bedrock_to_result(parse_unconnected_pong(data)[1], ip, server.port, latency)
+
+    async def full_stat(self, address, timeout=DEFAULT_TIMEOUT):
+        """query_full_stat 的asyncio版本"""
+        server = resolver.normalize(address, QUERY_PORT)
+        try:
+            endpoint = await resolver.shared_resolver().resolve_async(server, srv=False)
+            ip = endpoint.addresses[0]
+            session = self._unique_session(ip, server.port)
+            session_id = struct.unpack(">I", session)[0]
+            data, _ = await self._exchange(ip, server.port, build_query_handshake(session_id),
+                                           (ip, server.port, QUERY_HANDSHAKE, session), timeout / 2)
+            token = parse_query_handshake(data)
+            data, latency = await self._exchange(ip, server.port, build_full_stat(session_id, token),
+                                                 (ip, server.port, QUERY_STAT, session), timeout / 2)
+        except (OSError, asyncio.TimeoutError):
+            return slp.offline_result(server.host, server.port)
+        return full_stat_to_result(*parse_full_stat(data), ip, server.port, latency)
+
+    def close(self):
+        for transport in self._transports.values():
+            transport.close()
+        self._transports.clear()
+        for waiter in self._waiters.values():
+            waiter.cancel()
+        self._waiters.clear()
@@ -0,0 +1,462 @@
+"""可复用的结果视图
+
+查询结果区域只创建一次控件，新结果到来时只更新发生变化的字段；
+大量服务器使用基于模型的表格显示，只有可见的行才会被绘制。
+"""
+from datetime import datetime
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QTextEdit, QFrame
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, QPointF, QRectF
+from PyQt5.QtGui import QFont, QColor, QPainter, QPen, QPolygonF
+
+ONLINE_COLOR = "#2ecc71"
+OFFLINE_COLOR = "#e74c3c"
+
+
+def _title_label(text, point_size=16, color="#2c3e50"):
+    label = QLabel(text)
+    font = QFont()
+    font.setPointSize(point_size)
+    font.setBold(True)
+    label.setFont(font)
+    label.setStyleSheet(f"color: {color};")
+    return label
+
+
+def _field_label(font_size=14):
+    label = QLabel()
+    label.setStyleSheet(f"font-size: {font_size}px;")
+    return label
+
+
+def _set_text(label, text):
+    """只在文本变化时更新标签"""
+    if label.text() != text:
+        label.setText(text)
+
+
+class ErrorFrame(QFrame):
+    """错误提示"""
+
+    def __init__(self, point_size=14, font_size=13):
+        super().__init__()
+        layout = QVBoxLayout(self)
+        layout.addWidget(_title_label("错误", point_size, OFFLINE_COLOR))
+        self.message_label = QLabel()
+        self.message_label.setStyleSheet(f"color: {OFFLINE_COLOR}; font-size: {font_size}px;")
+        self.message_label.setWordWrap(True)
+        layout.addWidget(self.message_label)
+
+    def set_message(self, message):
+        _set_text(self.message_label, message)
+
+
+class ServerResultView(QWidget):
+    """服务器状态结果视图"""
+
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(10)
+
+        # 结果的时效说明（例如显示的是缓存中的旧结果）
+        self.note_label = QLabel()
+        self.note_label.setStyleSheet("color: #7f8c8d; font-size: 12px;")
+        layout.addWidget(self.note_label)
+
+        # 基本信息
+        self.info_frame = QFrame()
+        info_layout = QVBoxLayout(self.info_frame)
+        info_layout.addWidget(_title_label("服务器信息"))
+        self.status_label = _field_label()
+        self.address_label = _field_label()
+        self.players_label = _field_label()
+        self.version_label = _field_label()
+        self.latency_label = _field_label()
+        for label in (self.status_label, self.address_label, self.players_label,
+                      self.version_label, self.latency_label):
+            info_layout.addWidget(label)
+        layout.addWidget(self.info_frame)
+
+        # MOTD信息
+        self.motd_frame = QFrame()
+        motd_layout = QVBoxLayout(self.motd_frame)
+        motd_layout.addWidget(_title_label("MOTD信息"))
+        motd_html_label = _field_label()
+        motd_html_label.setText("带格式MOTD:")
+        motd_layout.addWidget(motd_html_label)
+        self.motd_html_display = QTextEdit()
+        self.motd_html_display.setMaximumHeight(100)
+        self.motd_html_display.setReadOnly(True)
+        motd_layout.addWidget(self.motd_html_display)
+        motd_clean_label = _field_label()
+        motd_clean_label.setText("纯文本MOTD:")
+        motd_layout.addWidget(motd_clean_label)
+        self.motd_clean_display = QTextEdit()
+        self.motd_clean_display.setMaximumHeight(100)
+        self.motd_clean_display.setReadOnly(True)
+        motd_layout.addWidget(self.motd_clean_display)
+        layout.addWidget(self.motd_frame)
+
+        self.error_frame = ErrorFrame()
+        layout.addWidget(self.error_frame)
+
+        # 上一次写入 QTextEdit 的内容，避免重复解析HTML
+        self._motd_html = None
+        self._motd_clean = None
+        self.clear()
+
+    def clear(self):
+        """隐藏所有内容"""
+        self.note_label.hide()
+        self.info_frame.hide()
+        self.motd_frame.hide()
+        self.error_frame.hide()
+
+    def set_note(self, text):
+        _set_text(self.note_label, text)
+        self.note_label.setVisible(bool(text))
+
+    def show_result(self, result):
+        """显示服务器状态，result为接口返回的data部分"""
+        online_status = result.get("online", False)
+        status_text = "在线" if online_status else "离线"
+        status_color = ONLINE_COLOR if online_status else OFFLINE_COLOR
+        _set_text(self.status_label,
+                  f"服务器状态: <span style='color: {status_color}; font-weight: bold;'>{status_text}</span>")
+        _set_text(self.address_label, f"服务器地址: {result.get('ip', '未知')}:{result.get('port', '未知')}")
+        _set_text(self.players_label, f"玩家数量: {result.get('players', 0)} / {result.get('max_players', 0)}")
+        _set_text(self.version_label, f"游戏版本: {result.get('version', '未知')}")
+
+        # 延迟（仅直连模式提供）
+        latency = result.get("latency")
+        if latency is not None:
+            _set_text(self.latency_label, f"延迟: {latency} ms")
+        self.latency_label.setVisible(latency is not None)
+
+        if online_status:
+            motd_html = result.get("motd_html") or "无"
+            if motd_html != self._motd_html:
+                self.motd_html_display.setHtml(motd_html)
+                self._motd_html = motd_html
+            motd_clean = result.get("motd_clean") or "无"
+            if motd_clean != self._motd_clean:
+                self.motd_clean_display.setPlainText(motd_clean)
+                self._motd_clean = motd_clean
+
+        self.error_frame.hide()
+        self.info_frame.show()
+        self.motd_frame.setVisible(online_status)
+
+    def show_error(self, message):
+        self.error_frame.set_message(message)
+        self.note_label.hide()
+        self.info_frame.hide()
+        self.motd_frame.hide()
+        self.error_frame.show()
+
+
+class PlayerResultView(QWidget):
+    """玩家信息结果视图"""
+
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.info_frame = QFrame()
+        info_layout = QVBoxLayout(self.info_frame)
+        info_layout.addWidget(_title_label("玩家信息"))
+        self.code_label = _field_label()
+        self.username_label = _field_label()
+        self.uuid_label = _field_label()
+        for label in (self.code_label, self.username_label, self.uuid_label):
+            info_layout.addWidget(label)
+
+        skin_title = QLabel("皮肤信息:")
+        skin_title.setStyleSheet("font-size: 14px; font-weight: bold; margin-top: 10px;")
+        info_layout.addWidget(skin_title)
+        self.skin_url_label = _field_label(12)
+        self.skin_url_label.setWordWrap(True)
+        info_layout.addWidget(self.skin_url_label)
+
+        self.skin_display_label = QLabel("皮肤预览:")
+        self.skin_display_label.setStyleSheet("font-size: 14px; font-weight: bold; margin-top: 10px;")
+        info_layout.addWidget(self.skin_display_label)
+        self.skin_label = QLabel()
+        self.skin_label.setStyleSheet("QLabel {background-color: #ecf0f1; border: 1px solid #bdc3c7; padding: 5px; min-height: 128px; min-width: 128px;}")
+        self.skin_label.setAlignment(Qt.AlignCenter)
+        info_layout.addWidget(self.skin_label)
+        layout.addWidget(self.info_frame)
+
+        self.error_frame = ErrorFrame(16, 14)
+        layout.addWidget(self.error_frame)
+        self.clear()
+
+    def clear(self):
+        self.info_frame.hide()
+        self.error_frame.hide()
+
+    def show_result(self, result):
+        """显示玩家信息，返回是否需要加载皮肤"""
+        _set_text(self.code_label, f"状态码: {result.get('code', '未知')}")
+        _set_text(self.username_label, f"玩家名称: {result.get('username', '未知')}")
+        _set_text(self.uuid_label, f"玩家UUID: {result.get('uuid', '未知')}")
+        skin_url = result.get("skin_url", "无")
+        _set_text(self.skin_url_label, f"皮肤URL: {skin_url}")
+
+        has_skin = bool(skin_url) and skin_url != "无"
+        self.skin_display_label.setVisible(has_skin)
+        self.skin_label.setVisible(has_skin)
+        if has_skin:
+            self.skin_label.clear()
+            self.skin_label.setText("正在加载皮肤...")
+        self.error_frame.hide()
+        self.info_frame.show()
+        return has_skin
+
+    def set_skin_pixmap(self, pixmap):
+        self.skin_label.setPixmap(pixmap)
+
+    def set_skin_text(self, text):
+        self.skin_label.setText(text)
+
+    def show_error(self, message):
+        self.error_frame.set_message(message)
+        self.info_frame.hide()
+        self.error_frame.show()
+
+
+class ServerListModel(QAbstractTableModel):
+    """多个服务器结果的表格模型
+
+    每行保存一条扫描结果（scanner.BatchScanner 产出的字典），显示文本在绘制时才计算。
+    同一地址再次出现时原地更新该行。
+    """
+    COLUMNS = ["地址", "状态", "玩家", "版本", "延迟(ms)", "耗时(ms)"]
+    # 用来识别同一行的字段
+    KEY = "address"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items = []
+        self._rows = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return QVariant()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        item = self._items[index.row()]
+        result = item.get("data") or {}
+        online = bool(item.get("success")) and result.get("online", False)
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return item.get("address", "")
+            if column == 1:
+                if not item.get("success"):
+                    return item.get("error") or "查询失败"
+                return "在线" if online else "离线"
+            if column == 2:
+                return f"{result.get('players', 0)} / {result.get('max_players', 0)}" if item.get("success") else ""
+            if column == 3:
+                return str(result.get("version", ""))
+            if column == 4:
+                latency = result.get("latency")
+                return "" if latency is None else str(latency)
+            if column == 5:
+                return str(item.get("elapsed", ""))
+        elif role == Qt.ForegroundRole and column == 1:
+            return QColor(ONLINE_COLOR if online else OFFLINE_COLOR)
+        return QVariant()
+
+    def item(self, row):
+        return self._items[row]
+
+    def items(self):
+        return list(self._items)
+
+    def clear(self):
+        self.beginResetModel()
+        self._items = []
+        self._rows = {}
+        self.endResetModel()
+
+    def upsert_many(self, items):
+        """批量写入结果：已有地址原地更新，新地址追加到末尾"""
+        new_items = []
+        for item in items:
+            row = self._rows.get(item[self.KEY])
+            if row is None:
+                new_items.append(item)
+                continue
+            if self._items[row] != item:
+                self._items[row] = item
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+        if new_items:
+            first = len(self._items)
+            # 同一批中重复的地址只保留最后一条
+            unique = {}
+            for item in new_items:
+                unique[item[self.KEY]] = item
+            self.beginInsertRows(QModelIndex(), first, first + len(unique) - 1)
+            for offset, (key, item) in enumerate(unique.items()):
+                self._rows[key] = first + offset
+                self._items.append(item)
+            self.endInsertRows()
+
+    def upsert(self, item):
+        self.upsert_many([item])
+
+
+class WatchListModel(ServerListModel):
+    """监控列表模型，额外显示每个服务器当前的轮询间隔"""
+    COLUMNS = ServerListModel.COLUMNS + ["轮询间隔(s)"]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and index.column() == len(ServerListModel.COLUMNS):
+            if role != Qt.DisplayRole:
+                return QVariant()
+            interval = self._items[index.row()].get("interval")
+            return "" if interval is None else str(int(interval))
+        return super().data(index, role)
+
+    def remove(self, address):
+        """从列表中移除一个地址"""
+        row = self._rows.get(address)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._items[row]
+        self._rows = {item[self.KEY]: i for i, item in enumerate(self._items)}
+        self.endRemoveRows()
+
+
+class PlayerListModel(ServerListModel):
+    """批量玩家查询结果（players.PlayerResolver 产出的字典）的表格模型"""
+    COLUMNS = ["查询", "玩家名称", "UUID", "状态", "耗时(ms)"]
+    KEY = "query"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._icons = {}
+
+    def set_skin_icons(self, icons):
+        """icons: {皮肤URL: QPixmap}，显示在玩家名称一列"""
+        self._icons.update(icons)
+        if self._items:
+            self.dataChanged.emit(self.index(0, 1), self.index(len(self._items) - 1, 1), [Qt.DecorationRole])
+
+    def clear(self):
+        self._icons = {}
+        super().clear()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        item = self._items[index.row()]
+        result = item.get("data") or {}
+        column = index.column()
+        if role == Qt.DecorationRole and column == 1:
+            icon = self._icons.get(result.get("skin_url"))
+            return icon if icon is not None else QVariant()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return item.get("query", "")
+            if column == 1:
+                return str(result.get("username", ""))
+            if column == 2:
+                return str(result.get("uuid", ""))
+            if column == 3:
+                return "找到" if item.get("success") else (item.get("error") or "查询失败")
+            if column == 4:
+                return "缓存" if item.get("cached") else str(item.get("elapsed", ""))
+        elif role == Qt.ForegroundRole and column == 3:
+            return QColor(ONLINE_COLOR if item.get("success") else OFFLINE_COLOR)
+        return QVariant()
+
+
+class HistoryChart(QWidget):
+    """玩家数历史折线图，离线的时间段在底部标红，延迟以橙色虚线按右侧刻度绘制"""
+
+    def __init__(self):
+        super().__init__()
+        self.setMinimumHeight(160)
+        self._points = []
+        self._start = 0
+        self._end = 1
+
+    def set_points(self, points, start, end):
+        """points 为 history.HistoryStore.query 的返回值"""
+        self._points = points
+        self._start = start
+        self._end = max(end, start + 1)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QColor("#ffffff"))
+        plot = QRectF(40, 10, max(1, self.width() - 90), max(1, self.height() - 35))
+        painter.setPen(QPen(QColor("#cccccc")))
+        painter.drawRect(plot)
+
+        if not self._points:
+            painter.setPen(QColor("#7f8c8d"))
+            painter.drawText(plot, Qt.AlignCenter, "暂无历史数据")
+            return
+
+        max_players = max(1, max(point[1] for point in self._points))
+        latencies = [point[3] for point in self._points if point[3] is not None]
+        max_latency = max(latencies) if latencies else 0
+        span = self._end - self._start
+
+        def x_of(timestamp):
+            return plot.left() + (timestamp - self._start) / span * plot.width()
+
+        # 离线时间段
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(OFFLINE_COLOR))
+        for timestamp, _, online, _ in self._points:
+            if online < 50:
+                painter.drawRect(QRectF(x_of(timestamp) - 1, plot.bottom() - 4, 3, 4))
+
+        # 玩家数
+        players_line = QPolygonF([QPointF(x_of(t), plot.bottom() - players / max_players * plot.height())
+                                  for t, players, _, _ in self._points])
+        painter.setBrush(Qt.NoBrush)
+        painter.setPen(QPen(QColor("#3498db"), 2))
+        painter.drawPolyline(players_line)
+
+        # 延迟
+        if max_latency:
+            latency_pen = QPen(QColor("#e67e22"), 1)
+            latency_pen.setStyle(Qt.DashLine)
+            painter.setPen(latency_pen)
+            painter.drawPolyline(QPolygonF([QPointF(x_of(t), plot.bottom() - latency / max_latency * plot.height())
+                                            for t, _, _, latency in self._points if latency is not None]))
+
+        # 刻度
+        painter.setPen(QColor("#2c3e50"))
+        painter.drawText(QRectF(0, plot.top() - 6, 36, 14), Qt.AlignRight, str(max_players))
+        painter.drawText(QRectF(0, plot.bottom() - 8, 36, 14), Qt.AlignRight, "0")
+        if max_latency:
+            painter.setPen(QColor("#e67e22"))
+            painter.drawText(QRectF(plot.right() + 4, plot.top() - 6, 46, 14), Qt.AlignLeft, f"{max_latency}ms")
+        painter.setPen(QColor("#7f8c8d"))
+        time_format = "%H:%M" if span <= 86400 else "%m-%d"
+        painter.drawText(QRectF(plot.left(), plot.bottom() + 4, 80, 16), Qt.AlignLeft,
+                         datetime.fromtimestamp(self._start).strftime(time_format))
+        painter.drawText(QRectF(plot.right() - 80, plot.bottom() + 4, 80, 16), Qt.AlignRight,
+                         datetime.fromtimestamp(self._end).strftime(time_format))
@@ -0,0 +1,92 @@
+"""可复用的后台请求线程池
+
+相同key的请求在进行中时只会执行一次（single-flight），后来的调用者共享同一个结果。
+每个调用者拿到一张 Ticket，可以单独取消；当所有调用者都取消且任务尚未开始时，任务本身也会被取消。
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = 4
+
+
+class Ticket:
+    """一次请求的凭据"""
+
+    def __init__(self, pool, key, future):
+        self._pool = pool
+        self.key = key
+        self.future = future
+        self.cancelled = False
+        # 调用方可以在这里挂上自己的回调等上下文
+        self.context = None
+
+    def cancel(self):
+        """放弃这次请求的结果"""
+        self._pool._cancel(self)
+
+    def add_done_callback(self, callback):
+        """请求完成时调用 callback(ticket)，已取消的凭据不会收到回调"""
+        def on_done(future):
+            if not self.cancelled and not future.cancelled():
+                callback(self)
+        self.future.add_done_callback(on_done)
+
+
+class _Flight:
+    __slots__ = ("future", "subscribers")
+
+    def __init__(self, future):
+        self.future = future
+        self.subscribers = 0
+
+
+class SingleFlightPool:
+    """有界线程池，并对进行中的相同请求去重"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="request")
+        # Future完成或取消时回调可能在持锁的线程中同步执行，因此使用可重入锁
+        self._lock = threading.RLock()
+        self._flights = {}
+        self.submitted = 0
+        self.coalesced = 0
+
+    def submit(self, key, fn, *args):
+        """提交请求，key相同且仍在进行中的请求会被合并"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight(self._executor.submit(fn, *args))
+                self._flights[key] = flight
+                self.submitted += 1
+                flight.future.add_done_callback(lambda future: self._forget(key, future))
+            else:
+                self.coalesced += 1
+            flight.subscribers += 1
+            return Ticket(self, key, flight.future)
+
+    def _forget(self, key, future):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.future is future:
+                del self._flights[key]
+
+    def _cancel(self, ticket):
+        with self._lock:
+            if ticket.cancelled:
+                return
+            ticket.cancelled = True
+            flight = self._flights.get(ticket.key)
+            if flight is None or flight.future is not ticket.future:
+                return
+            flight.subscribers -= 1
+            if flight.subscribers == 0:
+                # 已经开始执行的请求无法中断，只能丢弃结果
+                ticket.future.cancel()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)